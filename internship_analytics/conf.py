@@ -27,6 +27,28 @@ MARKET_NEWS_OUTPUT_DIR = os.path.join(RUN_DIR, "search_api_news_market")
 
 FINAL_REPORTS_OUTPUT_DIR = os.path.join(RUN_DIR, "summaries")
 
+# Файлы заданий и результатов офлайн-режима (Gemini Batch API)
+BATCH_JOBS_DIR = os.path.join(RUN_DIR, "gemini_batch")
+
+# Кэши, переживающие отдельный запуск
+CACHE_DIR = os.path.join(BASE_OUTPUT_DIR, "cache")
+
+ARTICLE_CACHE_PATH = os.path.join(CACHE_DIR, "articles.sqlite3")
+ARTICLE_CACHE_FRESH_SECONDS = 24 * 60 * 60
+ARTICLE_CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+ARTICLE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm.sqlite3")
+LLM_CACHE_ENABLED = True
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+SEARCH_CACHE_PATH = os.path.join(CACHE_DIR, "search.sqlite3")
+# Сколько результат поиска считается свежим и сколько ещё может отдаваться устаревшим,
+# пока в фоне идёт его обновление (stale-while-revalidate)
+SEARCH_CACHE_TTL_SECONDS = 12 * 60 * 60
+SEARCH_CACHE_STALE_SECONDS = 3 * 24 * 60 * 60
+
 DOMAIN_WEIGHTS = {
     "interfax.ru": 1.00,
     "rbc.ru": 0.95,
@@ -41,6 +63,137 @@ DOMAIN_WEIGHTS = {
     "ria.ru": 0.90
 }
 
+# Ограничения на скачивание страницы статьи
+ARTICLE_MAX_BYTES = 2 * 1024 * 1024
+ARTICLE_ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Квоты Gemini по моделям: запросов и входных токенов в минуту
+GEMINI_MODEL_QUOTAS = {
+    "models/gemini-1.5-flash-latest": {"rpm": 1000, "tpm": 4_000_000},
+    "models/gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000},
+    "models/gemini-2.5-pro": {"rpm": 150, "tpm": 2_000_000},
+}
+GEMINI_DEFAULT_QUOTA = {"rpm": 60, "tpm": 1_000_000}
+
+# Каскад моделей от дешёвой к сильной: маршрутизатор начинает с уровня этапа и поднимается,
+# только если ответ не прошёл проверку. Уверенность модели в маршрутизации не участвует — вместо неё
+# разбор ответа этапа (см. ModelRouter)
+GEMINI_MODEL_CASCADE = [
+    "models/gemini-1.5-flash-latest",
+    "models/gemini-2.5-flash",
+    "models/gemini-2.5-pro",
+]
+
+# Политики этапов: first_tier/last_tier — диапазон уровней каскада; large_input_tokens — с какого
+# размера промпта сразу начинать уровнем выше; min_output_chars — короче этого ответ считается неудачным
+GEMINI_STAGE_POLICIES = {
+    "clean": {"first_tier": 0, "last_tier": 1, "large_input_tokens": None, "min_output_chars": 1},
+    "relevance": {"first_tier": 0, "last_tier": 1, "large_input_tokens": None, "min_output_chars": 1},
+    "map": {"first_tier": 0, "last_tier": 1, "large_input_tokens": None, "min_output_chars": 200},
+    "reduce": {"first_tier": 0, "last_tier": 1, "large_input_tokens": None, "min_output_chars": 200},
+    "final_summary": {"first_tier": 1, "last_tier": 2, "large_input_tokens": 30_000, "min_output_chars": 1500},
+    "fuse": {"first_tier": 1, "last_tier": 2, "large_input_tokens": 12_000, "min_output_chars": 2000,
+             "max_output_tokens": 10_000},
+    "market_query": {"first_tier": 0, "last_tier": 1, "large_input_tokens": None, "min_output_chars": 10},
+}
+
+# Бюджет одного запуска: после его исчерпания запросы идут только на первый уровень этапа, без эскалации.
+# Время считается по часам от начала запуска, а не суммой длительностей параллельных вызовов
+GEMINI_RUN_BUDGET_USD = 2.0
+GEMINI_RUN_BUDGET_SECONDS = 30 * 60
+
+# Модели с «размышлением» и минимальный допустимый для них thinking_budget: токены размышлений
+# входят в max_output_tokens, поэтому короткие ответы (вердикты релевантности) просят без них
+GEMINI_THINKING_MODELS = {
+    "models/gemini-2.5-flash": 0,
+    "models/gemini-2.5-pro": 128,
+}
+
+# Цены моделей (USD за 1M токенов) для оценки расхода бюджета
+GEMINI_MODEL_PRICES = {
+    "models/gemini-1.5-flash-latest": {"input": 0.075, "output": 0.30},
+    "models/gemini-2.5-flash": {"input": 0.30, "output": 2.50},
+    "models/gemini-2.5-pro": {"input": 1.25, "output": 10.00},
+}
+GEMINI_DEFAULT_PRICE = {"input": 1.25, "output": 10.00}
+
+# Таймаут одного асинхронного запроса к Gemini (секунды, None — без ограничения)
+GEMINI_CALL_TIMEOUT_SECONDS = 180
+
+# Явный кэш контекста Gemini для повторяющихся system_instruction (живёт до конца запуска).
+# Минимальный размер инструкции для кэширования по моделям — порог API; модели без записи
+# (алиасы -latest) получают инструкцию в каждом запросе.
+# Сейчас явный кэш не создаётся: первый уровень каскада (gemini-1.5-flash-latest) здесь не указан,
+# а инструкции этапов — ~150-430 оценочных токенов, меньше порога 1024. Экономия пока идёт только
+# от стабильного префикса system_instruction (неявное кэширование Gemini); путь через client.caches
+# включится сам, если инструкции вырастут выше порога
+GEMINI_CONTEXT_CACHE_ENABLED = True
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = {
+    "models/gemini-2.5-flash": 1024,
+    "models/gemini-2.5-pro": 4096,
+}
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = 60 * 60
+
+# Финальная сводка Уровня 3 и итоговый отчёт пишутся в файл по мере генерации (потоковый ответ Gemini)
+GEMINI_STREAMING_OUTPUT = True
+
+# Офлайн-режим (Gemini Batch API): интервал опроса задания и предельное время ожидания, секунды
+GEMINI_BATCH_POLL_SECONDS = 60
+GEMINI_BATCH_DEADLINE_SECONDS = 24 * 60 * 60
+
+# Повторы временных ошибок Gemini (429, 5xx, таймауты): число попыток на один вызов
+GEMINI_RETRY_MAX_ATTEMPTS = 5
+
+# Адаптивный (AIMD) лимит одновременных запросов к одной модели: стартовое значение и границы
+GEMINI_INITIAL_CONCURRENCY = 4
+GEMINI_MIN_CONCURRENCY = 1
+GEMINI_MAX_CONCURRENCY = 64
+
+# Сколько статей одновременно очищается на Уровне 1
+LEVEL_1_MAX_CONCURRENCY = 8
+
+# Локальная предочистка Уровня 1: текст с оценкой качества не ниже PRECLEAN_BYPASS_SCORE с домена
+# весом не ниже PRECLEAN_BYPASS_MIN_WEIGHT в Gemini не отправляется; остальные уходят предочищенными
+PRECLEAN_ENABLED = True
+PRECLEAN_BYPASS_SCORE = 0.8
+PRECLEAN_BYPASS_MIN_WEIGHT = 0.9
+LEVEL_1_MAX_INPUT_TOKENS = 8000
+
+# Уровень 1 на asyncio-клиенте Gemini вместо пула потоков; в полёте может быть намного больше запросов
+LEVEL_1_ASYNC_MODE = False
+LEVEL_1_ASYNC_MAX_CONCURRENCY = 64
+
+# Пакетная проверка релевантности на Уровне 2: несколько статей в одном запросе
+LEVEL_2_BATCH_MODE = True
+LEVEL_2_BATCH_MAX_ITEMS = 10
+LEVEL_2_BATCH_MAX_TOKENS = 12_000
+
+# Порог оценочного сходства Жаккара, начиная с которого статьи считаются перепечатками одной новости
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+# Уровень 3 (MAP): оценочный бюджет входных токенов на один запрос и предел на одну статью
+LEVEL_3_MAP_TOKEN_BUDGET = 30_000
+LEVEL_3_MAX_ARTICLE_TOKENS = 6_000
+LEVEL_3_MAP_MAX_CONCURRENCY = 4
+# Уровень 3 (REDUCE): если промежуточные сводки не помещаются в бюджет, они сводятся группами
+LEVEL_3_REDUCE_TOKEN_BUDGET = 40_000
+
+# Потоковый режим пайплайна Gemini: уровни связаны ограниченными очередями и работают одновременно.
+# Выключен по умолчанию: в потоке из почти-дубликатов остаётся первая встреченная статья,
+# а пакетный режим оставляет статью с наибольшим весом домена
+PIPELINE_STREAMING_MODE = False
+PIPELINE_QUEUE_SIZE = 16
+
+# Локальный предфильтр релевантности перед Уровнем 2: оценка >= ACCEPT — принять без LLM,
+# <= REJECT — отбросить без LLM, между ними — спросить Gemini.
+# В теневом режиме в LLM идёт всё, а решения предфильтра только попадают в отчёт для настройки порогов.
+PREFILTER_ACCEPT_SCORE = 0.95
+PREFILTER_REJECT_SCORE = 0.05
+# Без совпадения ИНН/ОГРН статья принимается без LLM, только если в ней полностью найдено наименование
+# хотя бы из стольких значимых слов: однословное «Ромашка» слишком часто означает что-то другое
+PREFILTER_ACCEPT_MIN_NAME_TERMS = 2
+PREFILTER_SHADOW_MODE = False
+
 PAGES_TO_SEARCH_COMPANY = 1
 PAGES_TO_SEARCH_SEO = 1
 PAGES_TO_SEARCH_MARKET = 1
@@ -53,6 +206,7 @@ for d in [
     PYDOLL_SCRAPED_DATA_DIR,
     COMPANY_NEWS_OUTPUT_DIR,
     SEO_NEWS_OUTPUT_DIR,
+    CACHE_DIR,
 ]:
     os.makedirs(d, exist_ok=True)
 
@@ -1,6 +1,5 @@
 import re
 import tempfile
-import time
 from dataclasses import dataclass
 from typing import Any, Optional
 
@@ -10,8 +9,16 @@ from conf import *
 from internship_analytics.modules.egrul_parser_json import run_egrul_parser_task
 from internship_analytics.modules.gemini_3_factor_process_data import run_gemini_processing_pipeline
 from internship_analytics.modules.market_digest import get_market_digest
-from internship_analytics.modules.news import run_full_search_and_parse
+from internship_analytics.modules.ndjson_stream import remove_stream, wait_for_first_record
+from internship_analytics.modules.news import start_full_search_and_parse
 from internship_analytics.modules.pandas_processor import *
+from internship_analytics.modules.relevance_prefilter import RelevanceHints
+from internship_analytics.modules.gemini_context_cache import reset_context_cache_registry
+from internship_analytics.modules.gemini_retry import reset_gemini_call_stats
+from internship_analytics.modules.llm_cache import get_llm_cache
+from internship_analytics.modules.model_router import reset_model_router
+from internship_analytics.modules.run_registry import reset_run_registry
+from internship_analytics.modules.streaming_output import log_progress
 from modules.config.logger_config import get_logger
 from modules.merge_summary import fuse_summaries
 
@@ -134,7 +141,8 @@ def _process_news_block(*,
                         context_query: str,
                         domains: list[str],
                         num_pages: int,
-                        output_dir: str) -> dict[str, Optional[str]]:
+                        output_dir: str,
+                        relevance_hints: Optional[RelevanceHints] = None) -> dict[str, Optional[str]]:
     """
     Универсальная обёртка: поиск новостей + пайплайн Gemini.
     Возвращает пути ко всем уровням, если они были созданы.
@@ -146,15 +154,18 @@ def _process_news_block(*,
         "level_3_summary_path": None,
     }
 
-    raw_path = run_full_search_and_parse(
+    # Сырые статьи пишутся в NDJSON по мере извлечения, Уровень 1 читает их, не дожидаясь конца поиска
+    raw_path, search_future = start_full_search_and_parse(
         user_search_query=user_search_query,
         domains_to_search=domains,
         num_pages=num_pages,
         path_to_output=output_dir
     )
-    paths["raw_json_path"] = raw_path
 
-    if not raw_path:
+    # Пайплайн запускается, только когда появилась первая статья; пустой поиск — как и раньше, без обработки
+    if not wait_for_first_record(raw_path):
+        search_future.result()
+        remove_stream(raw_path)
         logger.info(f"По запросу '{user_search_query}' сырые новости не получены.")
         return paths
 
@@ -162,8 +173,16 @@ def _process_news_block(*,
     summary_path = run_gemini_processing_pipeline(
         raw_json_file_path=raw_path,
         context_query=context_query,
-        processed_data_dir=output_dir
+        processed_data_dir=output_dir,
+        relevance_hints=relevance_hints,
+        progress_listeners=[log_progress(f"Сводка '{context_query}'")]
     )
+
+    if not search_future.result():
+        logger.info(f"По запросу '{user_search_query}' сырые новости не получены.")
+        return paths
+
+    paths["raw_json_path"] = raw_path
     paths["level_3_summary_path"] = summary_path
 
     # Предсказуемые имена файлов для уровней 1/2
@@ -187,7 +206,11 @@ def process_company_news(ctx: CompanyContext) -> dict[str, Optional[str]]:
         context_query=query,
         domains=ctx.domains,
         num_pages=PAGES_TO_SEARCH_COMPANY,
-        output_dir=COMPANY_NEWS_OUTPUT_DIR
+        output_dir=COMPANY_NEWS_OUTPUT_DIR,
+        relevance_hints=RelevanceHints(
+            identifiers=[ctx.inn, ctx.egrul_json["company_info"].get("ogrn")],
+            names=[ctx.company_full_name, ctx.egrul_json["company_info"].get("short_name")],
+        )
     )
 
 
@@ -201,7 +224,11 @@ def process_seo_news(ctx: CompanyContext) -> dict[str, Optional[str]]:
         context_query=query,
         domains=ctx.domains,
         num_pages=PAGES_TO_SEARCH_SEO,
-        output_dir=SEO_NEWS_OUTPUT_DIR
+        output_dir=SEO_NEWS_OUTPUT_DIR,
+        relevance_hints=RelevanceHints(
+            identifiers=[ctx.egrul_json["director"].get("inn")],
+            names=[ctx.seo_full_name],
+        )
     )
 
 
@@ -219,6 +246,13 @@ def start_internship_analytics(target_inn: str) -> str:
         return json.dumps({"error": valid_inn}, ensure_ascii=False, indent=2)
 
     ctx = collect_company_context(valid_inn)
+    # Статьи и их очистка Уровня 1 переиспользуются блоками компании, руководителя и рынка
+    registry = reset_run_registry()
+    gemini_call_stats = reset_gemini_call_stats()
+    model_router = reset_model_router()
+    llm_cache = get_llm_cache()
+    llm_cache.reset_stats()
+    context_cache = reset_context_cache_registry()
 
     # Новости
     company_news = process_company_news(ctx)
@@ -240,12 +274,9 @@ def start_internship_analytics(target_inn: str) -> str:
         company_full_name=ctx.company_full_name,
         seo_full_name=ctx.seo_full_name,
         city=ctx.city,
-        model="models/gemini-2.5-pro",
-        max_output_tokens=10000,
+        progress_listeners=[log_progress("Отчёт компания + руководитель")],
     )
 
-    time.sleep(20)
-
     with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as tmp:
         json.dump(ctx.csv_json, tmp, ensure_ascii=False, indent=2)
         tmp_path = tmp.name
@@ -259,12 +290,9 @@ def start_internship_analytics(target_inn: str) -> str:
         company_full_name=ctx.company_full_name,
         seo_full_name=ctx.seo_full_name,
         city=ctx.city,
-        model="models/gemini-2.5-pro",
-        max_output_tokens=10000,
+        progress_listeners=[log_progress("Отчёт с данными CSV")],
     )
 
-    time.sleep(20)
-
     market_digest_path = ""
     if company_seo_fused_path and os.path.exists(company_seo_fused_path):
         with open(company_seo_fused_path, "r", encoding="utf-8") as f:
@@ -276,6 +304,13 @@ def start_internship_analytics(target_inn: str) -> str:
 
 
 
+    logger.info(
+        f"Переиспользовано в рамках запуска: {registry.fetch_hits} загрузок статей, "
+        f"{registry.clean_hits} очисток Уровня 1."
+    )
+    # Кэши контекста нужны только на время запуска; если запуск оборвётся, их удалит ttl
+    context_cache.clear()
+
     result = {
         "inn": ctx.inn,
         "company_full_name": ctx.company_full_name,
@@ -287,7 +322,11 @@ def start_internship_analytics(target_inn: str) -> str:
         "seo_news": seo_news,
         "final_fused_summary_path": company_seo_fused_path,
         "csv_fused_summary_path": csv_company_seo_fused_path,
-        "market_digest_path": market_digest_path
+        "market_digest_path": market_digest_path,
+        "llm_cache": llm_cache.stats(),
+        "gemini_calls": gemini_call_stats.snapshot(),
+        "model_routing": model_router.stats(),
+        "context_cache": context_cache.stats(),
     }
     return json.dumps(result, ensure_ascii=False, indent=2)
 
@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from internship_analytics.conf import (
+    ARTICLE_CACHE_FRESH_SECONDS,
+    ARTICLE_CACHE_MAX_AGE_SECONDS,
+    ARTICLE_CACHE_MAX_BYTES,
+    ARTICLE_CACHE_PATH,
+)
+from .config.logger_config import get_logger
+
+logger = get_logger("article_cache")
+
+# Вытеснение запускается после стольких записей или после записи 1/20 лимита размера
+EVICT_EVERY_PUTS = 200
+
+
+@dataclass
+class CachedArticle:
+    url: str
+    html: str
+    text: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    extraction_version: int
+
+    def is_fresh(self, fresh_seconds: float = ARTICLE_CACHE_FRESH_SECONDS) -> bool:
+        return time.time() - self.fetched_at < fresh_seconds
+
+
+class ArticleCache:
+    """
+    Дисковый кэш статей по URL (SQLite): сырой HTML, извлечённый текст, ETag/Last-Modified
+    и версия экстрактора. Старые записи удаляются по возрасту, при превышении лимита по размеру
+    вытесняются давно не использованные (при открытии и периодически при записи).
+    """
+
+    def __init__(self,
+                 path: str = ARTICLE_CACHE_PATH,
+                 max_age_seconds: float = ARTICLE_CACHE_MAX_AGE_SECONDS,
+                 max_bytes: int = ARTICLE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self._bytes_since_evict = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                html TEXT NOT NULL,
+                text TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                extraction_version INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, url: str) -> Optional[CachedArticle]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, html, text, etag, last_modified, fetched_at, extraction_version "
+                "FROM articles WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE articles SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        return CachedArticle(*row)
+
+    def put(self, article: CachedArticle) -> None:
+        size = len(article.html.encode("utf-8")) + len((article.text or "").encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles "
+                "(url, html, text, etag, last_modified, fetched_at, accessed_at, extraction_version, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (article.url, article.html, article.text, article.etag, article.last_modified,
+                 article.fetched_at, time.time(), article.extraction_version, size)
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            self._bytes_since_evict += size
+            evict_now = (self._puts_since_evict >= EVICT_EVERY_PUTS
+                         or self._bytes_since_evict * 20 >= self.max_bytes)
+        if evict_now:
+            self.evict()
+
+    def touch(self, url: str) -> None:
+        """Отмечает запись как подтверждённую сервером (ответ 304)."""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("UPDATE articles SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def evict(self) -> None:
+        with self._lock:
+            self._puts_since_evict = 0
+            self._bytes_since_evict = 0
+            removed = self._conn.execute(
+                "DELETE FROM articles WHERE fetched_at < ?",
+                (time.time() - self.max_age_seconds,)
+            ).rowcount
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+            if total > self.max_bytes:
+                for url, size in self._conn.execute(
+                        "SELECT url, size FROM articles ORDER BY accessed_at ASC").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM articles WHERE url = ?", (url,))
+                    total -= size
+                    removed += 1
+            self._conn.commit()
+
+        if removed:
+            logger.info(f"Из кэша статей удалено {removed} записей.")
+
+
+_article_cache: Optional[ArticleCache] = None
+_article_cache_lock = threading.Lock()
+
+
+def get_article_cache() -> ArticleCache:
+    global _article_cache
+    with _article_cache_lock:
+        if _article_cache is None:
+            _article_cache = ArticleCache()
+        return _article_cache
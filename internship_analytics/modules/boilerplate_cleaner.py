@@ -0,0 +1,207 @@
+import os
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from internship_analytics.conf import PRECLEAN_BYPASS_SCORE
+from .config.logger_config import get_logger
+from .token_budget import estimate_tokens
+
+logger = get_logger("boilerplate_cleaner")
+
+# Пункты меню и служебные подписи, которые встречаются отдельной строкой
+NAVIGATION_LINES = {
+    "описание", "похожие компании", "контакты", "арбитражные дела", "главная", "меню", "поиск",
+    "новости", "войти", "регистрация", "подписаться", "поделиться", "читать также", "читайте также",
+    "популярное", "реклама", "комментарии", "наверх", "еще", "ещё", "показать еще", "показать ещё",
+    "финансы", "реквизиты", "учредители", "руководство", "связи", "выписка из егрюл", "о проекте",
+}
+
+DISCLAIMER_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"задержк\w* публикации .*(фнс|отчетност|отчётност)",
+        r"(фнс|росстат) .*публику\w* .*с задержкой",
+        r"информация (носит|предоставлена в) .*справочн",
+        r"все права защищены",
+        r"при (использовании|цитировании) материалов .*ссылка .*обязательна",
+        r"(мы )?использу\w* (файлы )?cookie",
+        r"^\s*\d{1,2}\+\s*$",
+        r"сообщить об ошибке",
+    )
+]
+
+_REQUISITES_RE = re.compile(r"\b(ИНН|ОГРН|ОГРНИП|КПП|ОКПО)\b\s*:?\s*\d{9,15}", re.IGNORECASE)
+_URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_END = (".", "!", "?", "…", "»", "\"", ")")
+# Знаки, после которых строка продолжается или начинает список: такие строки — содержимое, а не меню
+_LIST_PUNCTUATION = (":", ";", ",", "—", "-")
+_LIST_MARKERS = ("-", "—", "–", "•", "*", "·")
+_DIGIT_RE = re.compile(r"\d")
+
+SHORT_LINE_WORDS = 4
+LINK_LIST_MIN_LINES = 5
+REQUISITES_LISTING_MIN_LINES = 3
+PROSE_LINE_MIN_WORDS = 8
+MIN_CLEAN_CHARS = 300
+
+
+@dataclass
+class PreCleanResult:
+    text: str
+    score: float
+    original_tokens: int
+    cleaned_tokens: int
+    removed: Dict[str, int] = field(default_factory=dict)
+
+
+def _normalize(line: str) -> str:
+    return " ".join(_WORD_RE.findall(line.lower().replace("ё", "е")))
+
+
+def _is_short(line: str) -> bool:
+    return len(_WORD_RE.findall(line)) <= SHORT_LINE_WORDS and not line.rstrip().endswith(_SENTENCE_END)
+
+
+def _is_navigation_like(line: str) -> bool:
+    """
+    Короткая строка, похожая на пункт меню или заголовок ссылки: без цифр (строки таблиц, даты,
+    подписи к рисункам), без маркера списка и без знака, продолжающего фразу.
+    """
+    stripped = line.strip()
+    return (_is_short(stripped)
+            and not _DIGIT_RE.search(stripped)
+            and not stripped.startswith(_LIST_MARKERS)
+            and not stripped.endswith(_LIST_PUNCTUATION))
+
+
+def _is_prose(line: str) -> bool:
+    return len(_WORD_RE.findall(line)) >= PROSE_LINE_MIN_WORDS and line.rstrip().endswith(_SENTENCE_END)
+
+
+def quality_score(text: str) -> float:
+    """Доля текста в связных предложениях (0–1); слишком короткий текст — 0."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    total = sum(len(line) for line in lines)
+    if total < MIN_CLEAN_CHARS:
+        return 0.0
+    return sum(len(line) for line in lines if _is_prose(line)) / total
+
+
+def pre_clean(text: str) -> PreCleanResult:
+    """
+    Детерминированно убирает типовой мусор страниц до отправки в Gemini: повторяющиеся строки,
+    пункты навигации, блоки ссылок (не меньше LINK_LIST_MIN_LINES подряд идущих строк, похожих
+    на меню, если перед ними нет строки с двоеточием), строки-адреса,
+    длинные списки реквизитов ИНН/ОГРН и известные оговорки. Одиночные реквизиты остаются —
+    они помогают опознать компанию.
+    """
+    lines = [line.strip() for line in (text or "").splitlines()]
+    lines = [line for line in lines if line]
+    removed = Counter()
+    keep = [True] * len(lines)
+
+    normalized = [_normalize(line) for line in lines]
+    counts = Counter(normalized)
+    seen = set()
+    for i, (line, norm) in enumerate(zip(lines, normalized)):
+        if not norm:
+            keep[i] = False
+            removed["empty"] += 1
+        elif norm in NAVIGATION_LINES:
+            keep[i] = False
+            removed["navigation"] += 1
+        elif any(pattern.search(line) for pattern in DISCLAIMER_PATTERNS):
+            keep[i] = False
+            removed["disclaimer"] += 1
+        elif norm in seen or (counts[norm] > 2 and _is_short(line)):
+            keep[i] = False
+            removed["repeated"] += 1
+        elif _URL_RE.sub("", line).strip() == "":
+            keep[i] = False
+            removed["links"] += 1
+        seen.add(norm)
+
+    def _drop_runs(predicate, min_length: int, reason: str):
+        start = None
+        for i in range(len(lines) + 1):
+            if i < len(lines) and keep[i] and predicate(lines[i]):
+                start = i if start is None else start
+                continue
+            introduced = start is not None and start > 0 and lines[start - 1].rstrip().endswith(":")
+            if start is not None and i - start >= min_length and not introduced:
+                for j in range(start, i):
+                    keep[j] = False
+                removed[reason] += i - start
+            start = None
+
+    _drop_runs(_is_navigation_like, LINK_LIST_MIN_LINES, "link_list")
+
+    # Список реквизитов других компаний: оставляем только первое упоминание (обычно сам объект)
+    requisites = [i for i, line in enumerate(lines) if keep[i] and _REQUISITES_RE.search(line)]
+    if len(requisites) >= REQUISITES_LISTING_MIN_LINES:
+        for i in requisites[1:]:
+            keep[i] = False
+        removed["requisites"] += len(requisites) - 1
+
+    cleaned = "\n".join(line for line, kept in zip(lines, keep) if kept)
+    return PreCleanResult(
+        text=cleaned,
+        score=quality_score(cleaned),
+        original_tokens=estimate_tokens(text or ""),
+        cleaned_tokens=estimate_tokens(cleaned),
+        removed=dict(removed),
+    )
+
+
+def _word_f1(actual: str, expected: str) -> float:
+    actual_words = Counter(_WORD_RE.findall(actual.lower()))
+    expected_words = Counter(_WORD_RE.findall(expected.lower()))
+    overlap = sum((actual_words & expected_words).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(actual_words.values())
+    recall = overlap / sum(expected_words.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def benchmark_pre_clean(fixtures_dir: str, bypass_score: float = PRECLEAN_BYPASS_SCORE) -> Dict[str, float]:
+    """
+    Оценивает предочистку на фикстурах: '<имя>.raw.txt' — сырой текст статьи,
+    '<имя>.expected.txt' — эталонный cleaned_text (например, ответ Gemini Уровня 1).
+
+    :return: средняя доля сэкономленных токенов, средний F1 по словам относительно эталона
+             и доля текстов со score не ниже bypass_score
+    """
+    names = sorted(f[:-len(".raw.txt")] for f in os.listdir(fixtures_dir) if f.endswith(".raw.txt"))
+    results: List[Dict[str, float]] = []
+    for name in names:
+        expected_path = os.path.join(fixtures_dir, f"{name}.expected.txt")
+        if not os.path.exists(expected_path):
+            continue
+        with open(os.path.join(fixtures_dir, f"{name}.raw.txt"), "r", encoding="utf-8") as f:
+            raw = f.read()
+        with open(expected_path, "r", encoding="utf-8") as f:
+            expected = f.read()
+
+        result = pre_clean(raw)
+        f1 = _word_f1(result.text, expected)
+        saved = 1 - result.cleaned_tokens / result.original_tokens if result.original_tokens else 0.0
+        logger.info(f"{name}: score {result.score:.2f}, F1 {f1:.2f}, сэкономлено {saved:.0%} токенов, "
+                    f"удалено {result.removed}")
+        results.append({"saved": saved, "f1": f1, "bypass": float(result.score >= bypass_score)})
+
+    if not results:
+        logger.warning(f"В {fixtures_dir} нет пар *.raw.txt / *.expected.txt.")
+        return {}
+
+    summary = {key: sum(r[key] for r in results) / len(results) for key in ("saved", "f1", "bypass")}
+    logger.info(f"Итого по {len(results)} фикстурам: сэкономлено {summary['saved']:.0%} токенов, "
+                f"F1 {summary['f1']:.2f}, без LLM {summary['bypass']:.0%}")
+    return summary
+
+
+if __name__ == "__main__":
+    benchmark_pre_clean(sys.argv[1])
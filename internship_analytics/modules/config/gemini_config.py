@@ -1,5 +1,5 @@
 import os
-import sys
+import threading
 
 from dotenv import load_dotenv
 from google import genai
@@ -11,23 +11,62 @@ load_dotenv()
 logger = get_logger("gemini_config")
 
 
+class GeminiConfigError(RuntimeError):
+    """Клиент Gemini не может быть создан: нет ключа или ошибка инициализации."""
+
+
+_clients: dict[str, Client] = {}
+# Клиент, подставленный через set_gemini_client без ключа: используется вместо клиента по умолчанию
+_injected_client: Client | None = None
+_clients_lock = threading.Lock()
+
+
 def get_gemini_config(api_key: str | None = None) -> Client:
     """
-    Возвращает сконфигурированный клиент Gemini.
+    Возвращает общий клиент Gemini для ключа: создаётся один раз и переиспользуется всеми вызовами
+    и потоками, поэтому HTTP-соединения (keep-alive) не открываются заново на каждый запрос.
 
-    :param api_key: API-ключ (по умолчанию берётся из переменной окружения GENAI_API_KEY)
+    :param api_key: API-ключ (по умолчанию — подставленный клиент или переменная окружения GENAI_API_KEY)
     :return: экземпляр google.genai.Client
+    :raises GeminiConfigError: ключ не задан или клиент не удалось создать
+    """
+    if api_key is None:
+        with _clients_lock:
+            if _injected_client is not None:
+                return _injected_client
+
+    key = api_key or os.environ.get("GENAI_API_KEY")
+    if not key:
+        logger.critical("GENAI_API_KEY пуст или не задан.")
+        raise GeminiConfigError("GENAI_API_KEY пуст или не задан.")
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            try:
+                client = genai.Client(api_key=key)
+            except Exception as e:
+                logger.critical(f"Ошибка инициализации Gemini Client: {e}")
+                raise GeminiConfigError(f"Ошибка инициализации Gemini Client: {e}") from e
+            _clients[key] = client
+        return client
+
+
+def set_gemini_client(client: Client, api_key: str | None = None) -> None:
     """
-    try:
-        key = api_key or os.environ.get("GENAI_API_KEY")
-        if not key:
-            raise KeyError("GENAI_API_KEY пуст или не задан.")
-
-        return genai.Client(api_key=key)
-
-    except KeyError as e:
-        logger.critical(f"{e} Завершение работы.")
-        sys.exit(1)
-    except Exception as e:
-        logger.critical(f"Ошибка инициализации Gemini Client: {e}")
-        sys.exit(1)
+    Подменяет клиент, например фейковым в тестах. Без ключа подставленный клиент возвращается
+    вызовами get_gemini_config() без ключа, даже если GENAI_API_KEY не задан.
+    """
+    global _injected_client
+    with _clients_lock:
+        if api_key:
+            _clients[api_key] = client
+        else:
+            _injected_client = client
+
+
+def reset_gemini_clients() -> None:
+    global _injected_client
+    with _clients_lock:
+        _clients.clear()
+        _injected_client = None
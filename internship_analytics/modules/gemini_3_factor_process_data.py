@@ -1,24 +1,52 @@
+import asyncio
 import json
 import os
-import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 import ijson
 from dotenv import load_dotenv
 
+from internship_analytics.conf import (
+    GEMINI_STREAMING_OUTPUT,
+    LEVEL_1_ASYNC_MAX_CONCURRENCY,
+    LEVEL_1_ASYNC_MODE,
+    LEVEL_1_MAX_CONCURRENCY,
+    LEVEL_1_MAX_INPUT_TOKENS,
+    LEVEL_2_BATCH_MAX_ITEMS,
+    LEVEL_2_BATCH_MAX_TOKENS,
+    LEVEL_2_BATCH_MODE,
+    LEVEL_3_MAP_MAX_CONCURRENCY,
+    LEVEL_3_MAP_TOKEN_BUDGET,
+    LEVEL_3_MAX_ARTICLE_TOKENS,
+    LEVEL_3_REDUCE_TOKEN_BUDGET,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_STREAMING_MODE,
+    PRECLEAN_BYPASS_MIN_WEIGHT,
+    PRECLEAN_BYPASS_SCORE,
+    PRECLEAN_ENABLED,
+)
+from .boilerplate_cleaner import pre_clean
 from .config.logger_config import get_logger
-from .request_to_gemini_api import call_to_gemini_api
+from .model_router import routed_call, routed_call_async, routed_call_stream
+from .ndjson_stream import follow_records
+from .near_duplicates import NearDuplicateIndex, find_near_duplicate_clusters
+from .relevance_prefilter import ACCEPT, REJECT, RelevanceHints, RelevancePrefilter
+from .run_registry import get_run_registry
+from .streaming_output import ProgressListener, stream_to_file
+from .token_budget import estimate_tokens, truncate_to_tokens
 
 load_dotenv()
 logger = get_logger("gemini_data_processor")
 
+# Статические инструкции вынесены в system_instruction (кэш контекста), в промпт идёт только переменная часть
 PROMPT_1 = """
 Ты — редактор-экстрактор. Твоя задача — очистить предоставленный сырой текст, извлекая из него только связный и осмысленный контент, относящийся к основной теме документа.
-
-Метаданные источника:
-- Домен: {source_domain}
-- Вес источника (0–1): {source_weight}
-- URL: {url}
+Вместе с текстом передаются метаданные источника: домен, вес источника (0–1) и URL.
 
 Инструкции по очистке:
 1) Внимательно проанализируй весь текст.
@@ -33,19 +61,22 @@ PROMPT_1 = """
 6) Объедини оставшийся контент в единый, гладкий и читаемый фрагмент без добавления новой информации.
 
 Важно: верни ТОЛЬКО очищенный связный текст без заголовков, без метаданных и без упоминания веса.
-Сырой текст для очистки:
----
 """
 
-PROMPT_2_TEMPLATE = """
-Определи, содержит ли предоставленный текст информацию, связанную с запросом '{context_query}'.
-Если запрос связан с состоянием рынка или какой-то аналитикой - оставь, так же если в запросе просится предоставить что то на тему (рынок, конкуренты, тренды, регуляции) оставляй это и пиши одним словом 'да'
-
+PROMPT_1_INPUT_TEMPLATE = """
 Метаданные источника:
 - Домен: {source_domain}
 - Вес источника (0–1): {source_weight}
 - URL: {url}
-- Дата: {date}
+
+Сырой текст для очистки:
+---
+{text_content}"""
+
+PROMPT_2_SYSTEM_TEMPLATE = """
+Определи, содержит ли предоставленный текст информацию, связанную с запросом '{context_query}'.
+Если запрос связан с состоянием рынка или какой-то аналитикой - оставь, так же если в запросе просится предоставить что то на тему (рынок, конкуренты, тренды, регуляции) оставляй это и пиши одним словом 'да'
+Вместе с текстом передаются метаданные источника: домен, вес источника (0–1), URL и дата.
 
 Критерии релевантности (с учётом веса):
 A) Прямая релевантность → 'да':
@@ -59,6 +90,14 @@ B) Косвенная релевантность (контекст/связи) 
 C) Полное отсутствие связи → 'нет'.
 
 Ответь ОДНИМ СЛОВОМ на русском: 'да' или 'нет'.
+"""
+
+PROMPT_2_TEMPLATE = """
+Метаданные источника:
+- Домен: {source_domain}
+- Вес источника (0–1): {source_weight}
+- URL: {url}
+- Дата: {date}
 
 Текст для анализа:
 ---
@@ -66,7 +105,50 @@ C) Полное отсутствие связи → 'нет'.
 ---
 """
 
-PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE = """
+PROMPT_2_BATCH_SYSTEM_TEMPLATE = """
+Для КАЖДОЙ статьи ниже определи, содержит ли она информацию, связанную с запросом '{context_query}'.
+Если запрос связан с состоянием рынка или какой-то аналитикой - статья релевантна, так же если в запросе просится предоставить что то на тему (рынок, конкуренты, тренды, регуляции) — статья релевантна.
+
+Критерии релевантности (с учётом веса источника W):
+A) Прямая релевантность → true:
+   - Прямое упоминание '{context_query}' или его официальных/юридических/брендовых наименований (включая транслитерации и распространённые сокращения),
+   - Совпадение уникальных идентификаторов (ИНН/ОГРН/адрес/учредители/бенефициары), явные упоминания проектов/подразделений/брендов, принадлежащих '{context_query}'.
+
+B) Косвенная релевантность (контекст/связи) →
+   - Если связь подтверждается фактами (партнёрства, судебные дела, один адрес/учредитель, принадлежность к группе, участие в одном проекте) и W ≥ 0.90 → true.
+   - Если присутствуют ТОЛЬКО слабые/намёчные совпадения (без явной связи) и W < 0.90 → false.
+
+C) Полное отсутствие связи → false.
+
+Верни ТОЛЬКО JSON-массив, по одному объекту на каждую статью, без пояснений:
+[{{"id": "<ID статьи>", "relevant": true|false}}]
+"""
+
+PROMPT_2_BATCH_TEMPLATE = """
+Статьи для анализа:
+{articles}
+"""
+
+PROMPT_2_BATCH_ARTICLE_TEMPLATE = """=== ID: {article_id} | SRC: {source_domain} | W: {source_weight} | URL: {url} | DATE: {date} ===
+{text_content}
+"""
+
+RELEVANCE_BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "STRING"},
+            "relevant": {"type": "BOOLEAN"},
+        },
+        "required": ["id", "relevant"],
+    },
+}
+
+# Бюджет ответа на одну статью в пакете: {"id": "A10", "relevant": false},
+RELEVANCE_BATCH_OUTPUT_TOKENS_PER_ITEM = 16
+
+PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE = """
 Ты — аналитик. Сформируй краткую, ёмкую выжимку по теме '{context_query}' из набора источников.
 Каждый источник передан в формате:
 [SRC:{{source_domain}} | W:{{source_weight}} | URL:{{url}} | DATE:{{date}}]
@@ -82,14 +164,16 @@ PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE = """
 
 Выведи результат в виде маркированного списка тезисов. Каждый тезис оканчивай блоком:
 [evidence: ...] [support: 0.xx]
+"""
 
+PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE = """
 Источники (блоки) для анализа:
 ---
 {chunk_texts}
 ---
 """
 
-PROMPT_3_FINAL_SUMMARY_TEMPLATE = """
+PROMPT_3_FINAL_SUMMARY_SYSTEM_TEMPLATE = """
 Ты — экспертный аналитик. На основе всех промежуточных отчётов подготовь развернутую итоговую сводку по теме '{context_query}' с учётом весов источников.
 
 Инструкции:
@@ -109,15 +193,36 @@ PROMPT_3_FINAL_SUMMARY_TEMPLATE = """
 |---|---|---|---|---|
 
 6) Пиши чётко, по делу, аналитическим стилем. Язык — русский.
+"""
 
+PROMPT_3_FINAL_SUMMARY_TEMPLATE = """
 Промежуточные отчёты (с тезисами, evidence и support):
 ---
 {combined_summaries}
 ---
 """
-GEMINI_MODEL_1 = 'models/gemini-1.5-flash-latest'
-GEMINI_MODEL_2 = 'models/gemini-1.5-flash-latest'
-GEMINI_MODEL_3 = 'models/gemini-2.5-pro'
+
+PROMPT_3_MERGE_SUMMARIES_SYSTEM_TEMPLATE = """
+Ты — аналитик. Объедини промежуточные выжимки по теме '{context_query}' в одну выжимку того же формата.
+
+Инструкции:
+1) Объедини дублирующиеся тезисы, сохрани все уникальные факты, даты и цифры.
+2) Для каждого тезиса объедини списки evidence (уникальные домены с весами) и пересчитай
+   support = min(1.00, сумма весов уникальных источников), округли до 2 знаков.
+3) Конфликтующие версии отметь явно.
+
+Выведи маркированный список тезисов, каждый тезис оканчивай блоком:
+[evidence: ...] [support: 0.xx]
+"""
+
+PROMPT_3_MERGE_SUMMARIES_TEMPLATE = """
+Промежуточные выжимки:
+---
+{combined_summaries}
+---
+"""
+
+SUMMARY_SEPARATOR = "\n\n===\n\n"
 
 
 def json_serializer(obj):
@@ -126,7 +231,36 @@ def json_serializer(obj):
     raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
+class _JsonArrayWriter:
+    """
+    Пишет JSON-массив по одной записи. Запись сериализуется целиком до записи в файл, поэтому
+    ошибка на ней не портит файл, а close() закрывает массив и после сбоя посреди запуска.
+    """
+
+    def __init__(self, f_out):
+        self._f_out = f_out
+        self.count = 0
+        f_out.write('[')
+
+    def write(self, item: dict) -> None:
+        data = json.dumps(item, ensure_ascii=False, indent=2, default=json_serializer)
+        self._f_out.write(data if not self.count else ',' + data)
+        self._f_out.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        self._f_out.write(']')
+
+
 def stream_json_objects(file_path: str):
+    """
+    Потоково читает записи из JSON-массива или из NDJSON-файла; NDJSON читается по мере
+    дописывания, пока писатель не отметит файл завершённым.
+    """
+    if file_path.endswith('.ndjson'):
+        yield from follow_records(file_path)
+        return
+
     try:
         with open(file_path, 'rb') as f:
             parser = ijson.items(f, 'item')
@@ -138,99 +272,458 @@ def stream_json_objects(file_path: str):
         logger.error(f"Ошибка при потоковом чтении файла {file_path}: {e}")
 
 
-def clean_raw_data(input_file_path: str, output_file_path: str):
+def _source_weight(item: dict) -> float:
+    try:
+        return float(item.get('weight', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def prepare_cleaning(item: dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Возвращает (cleaned_text, None), если локальная предочистка справилась сама, или (None, промпт)
+    с уже предочищенным и обрезанным текстом; (None, None) — очищать нечего.
+    Инструкции очистки передаются отдельно, как system_instruction=PROMPT_1.
+    """
+    content_to_clean = "\n".join(filter(None, [
+        item.get('title', ''),
+        item.get('summary', ''),
+        item.get('full_text', '')
+    ]))
+
+    if not content_to_clean.strip():
+        logger.warning(f"Пропуск записи с URL {item.get('url')} из-за отсутствия текстового контента.")
+        return None, None
+
+    if PRECLEAN_ENABLED:
+        pre_cleaned = pre_clean(content_to_clean)
+        item['preclean_score'] = round(pre_cleaned.score, 3)
+        if pre_cleaned.score >= PRECLEAN_BYPASS_SCORE and _source_weight(item) >= PRECLEAN_BYPASS_MIN_WEIGHT:
+            logger.info(f"Очистка без LLM: {item.get('url', 'N/A')} (оценка {pre_cleaned.score:.2f}).")
+            return pre_cleaned.text, None
+        content_to_clean = pre_cleaned.text or content_to_clean
+
+    logger.info(f"Очистка записи: {item.get('url', 'N/A')}")
+    return None, PROMPT_1_INPUT_TEMPLATE.format(
+        source_domain=item.get('source', ''),
+        source_weight=item.get('weight', 0),
+        url=item.get('url', ''),
+        text_content=truncate_to_tokens(content_to_clean, LEVEL_1_MAX_INPUT_TOKENS)
+    )
+
+
+def clean_item(item: dict) -> Optional[dict]:
+    cleaned_text, prompt = prepare_cleaning(item)
+    if prompt is not None:
+        # Очистка не зависит от контекста блока, поэтому переиспользуется между блоками по URL
+        if item.get('url'):
+            cleaned_text = get_run_registry().cleaned_text(
+                item['url'], lambda: routed_call(prompt, "clean", system_instruction=PROMPT_1)
+            )
+        else:
+            cleaned_text = routed_call(prompt, "clean", system_instruction=PROMPT_1)
+    elif cleaned_text is None:
+        return None
+
+    item['cleaned_text'] = cleaned_text
+    return item
+
+
+async def clean_item_async(item: dict) -> Optional[dict]:
+    cleaned_text, prompt = prepare_cleaning(item)
+    if prompt is not None:
+        if item.get('url'):
+            cleaned_text = await get_run_registry().cleaned_text_async(
+                item['url'], lambda: routed_call_async(prompt, "clean", system_instruction=PROMPT_1)
+            )
+        else:
+            cleaned_text = await routed_call_async(prompt, "clean", system_instruction=PROMPT_1)
+    elif cleaned_text is None:
+        return None
+
+    item['cleaned_text'] = cleaned_text
+    return item
+
+
+def clean_raw_data(input_file_path: str, output_file_path: str, max_concurrency: int = LEVEL_1_MAX_CONCURRENCY,
+                   on_item: Optional[Callable[[dict], None]] = None):
+    """
+    Уровень 1: до max_concurrency статей очищаются параллельно (квоты модели соблюдает
+    call_to_gemini_api), в выходной файл записи попадают в исходном порядке.
+    Ошибка на одной записи пропускает только её; при сбое посреди запуска уже очищенные
+    записи остаются в выходном файле.
+
+    :param on_item: вызывается для каждой записанной записи (потоковый режим пайплайна)
+    """
     logger.info("--- НАЧАЛО УРОВНЯ 1: Потоковая очистка сырых данных ---")
 
     processed_count = 0
+    failed_count = 0
     try:
-        with open(output_file_path, 'w', encoding='utf-8') as f_out:
-            f_out.write('[')
-            is_first_item = True
+        with open(output_file_path, 'w', encoding='utf-8') as f_out, \
+                ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="level_1") as executor:
+            writer = _JsonArrayWriter(f_out)
+            in_flight: deque = deque()
+
+            def _write_completed(max_in_flight: int):
+                # Пишет готовые записи из головы очереди; если в работе больше max_in_flight — ждёт голову
+                nonlocal processed_count, failed_count
+                while in_flight and (in_flight[0][1].done() or len(in_flight) > max_in_flight):
+                    url, future = in_flight.popleft()
+                    try:
+                        item = future.result()
+                        if item is None:
+                            continue
+                        writer.write(item)
+                    except Exception as e:
+                        logger.error(f"Ошибка очистки записи {url}: {e}")
+                        failed_count += 1
+                        continue
+
+                    processed_count += 1
+                    if on_item is not None:
+                        on_item(item)
+
+            try:
+                for item in stream_json_objects(input_file_path):
+                    in_flight.append((item.get('url', 'N/A'), executor.submit(clean_item, item)))
+                    # Окно ограничено, чтобы не вычитывать весь входной поток в память
+                    _write_completed(max_in_flight=max_concurrency * 2)
+                _write_completed(max_in_flight=0)
+            finally:
+                for _, future in in_flight:
+                    future.cancel()
+                writer.close()
 
-            for item in stream_json_objects(input_file_path):
-                content_to_clean = "\n".join(filter(None, [
-                    item.get('title', ''),
-                    item.get('summary', ''),
-                    item.get('full_text', '')
-                ]))
+    except Exception as e:
+        logger.error(f"Критическая ошибка на Уровне 1: {e}. "
+                     f"Сохранено {processed_count} уже очищенных записей в: {output_file_path}")
+        return
 
-                if not content_to_clean.strip():
-                    logger.warning(f"Пропуск записи с URL {item.get('url')} из-за отсутствия текстового контента.")
-                    continue
+    if failed_count:
+        logger.warning(f"Уровень 1: {failed_count} записей не удалось очистить.")
+    logger.info(f"Уровень 1 завершен. Очищено и сохранено {processed_count} записей в: {output_file_path}")
+    logger.info("--- КОНЕЦ УРОВНЯ 1 ---")
 
-                logger.info(f"Очистка записи: {item.get('url', 'N/A')}")
-                prompt = PROMPT_1.format(
-                    source_domain=item.get('source', ''),
-                    source_weight=item.get('weight', 0),
-                    url=item.get('url', '')
-                ) + "\n" + content_to_clean
-                cleaned_text = call_to_gemini_api(prompt, GEMINI_MODEL_1)
 
-                item['cleaned_text'] = cleaned_text
+async def clean_raw_data_async(input_file_path: str, output_file_path: str,
+                               max_concurrency: int = LEVEL_1_ASYNC_MAX_CONCURRENCY,
+                               on_item: Optional[Callable[[dict], None]] = None):
+    """
+    Уровень 1 на асинхронном клиенте Gemini: то же, что clean_raw_data, но до max_concurrency
+    запросов держит в полёте один событийный цикл. Входной поток читается в отдельном потоке,
+    так как NDJSON дочитывается с ожиданием писателя.
+    """
+    logger.info("--- НАЧАЛО УРОВНЯ 1: Потоковая очистка сырых данных (asyncio) ---")
 
-                if not is_first_item:
-                    f_out.write(',')
-                json.dump(item, f_out, ensure_ascii=False, indent=2, default=json_serializer)
-                is_first_item = False
-                processed_count += 1
-                time.sleep(1)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    processed_count = 0
+    failed_count = 0
 
-            f_out.write(']')
+    async def _clean(item: dict) -> Optional[dict]:
+        async with semaphore:
+            return await clean_item_async(item)
+
+    in_flight: deque = deque()
+    try:
+        with open(output_file_path, 'w', encoding='utf-8') as f_out:
+            writer = _JsonArrayWriter(f_out)
+
+            async def _write_completed(max_in_flight: int):
+                nonlocal processed_count, failed_count
+                while in_flight and (in_flight[0][1].done() or len(in_flight) > max_in_flight):
+                    url, task = in_flight.popleft()
+                    try:
+                        item = await task
+                        if item is None:
+                            continue
+                        writer.write(item)
+                    except Exception as e:
+                        logger.error(f"Ошибка очистки записи {url}: {e}")
+                        failed_count += 1
+                        continue
+
+                    processed_count += 1
+                    if on_item is not None:
+                        # on_item может ждать (очередь потокового режима): ждём в потоке, не останавливая цикл
+                        await asyncio.to_thread(on_item, item)
+
+            try:
+                records = stream_json_objects(input_file_path)
+                while (item := await asyncio.to_thread(next, records, None)) is not None:
+                    in_flight.append((item.get('url', 'N/A'), asyncio.create_task(_clean(item))))
+                    await _write_completed(max_in_flight=max_concurrency * 2)
+                await _write_completed(max_in_flight=0)
+            finally:
+                writer.close()
 
     except Exception as e:
-        logger.error(f"Критическая ошибка на Уровне 1: {e}")
-        if os.path.exists(output_file_path):
-            os.remove(output_file_path)
+        logger.error(f"Критическая ошибка на Уровне 1: {e}. "
+                     f"Сохранено {processed_count} уже очищенных записей в: {output_file_path}")
         return
+    finally:
+        for _, task in in_flight:
+            task.cancel()
 
+    if failed_count:
+        logger.warning(f"Уровень 1: {failed_count} записей не удалось очистить.")
     logger.info(f"Уровень 1 завершен. Очищено и сохранено {processed_count} записей в: {output_file_path}")
     logger.info("--- КОНЕЦ УРОВНЯ 1 ---")
 
 
-def filter_and_deduplicate_data(input_file_path: str, output_file_path: str, context_query: str):
+def _run_level_1(input_file_path: str, output_file_path: str,
+                 on_item: Optional[Callable[[dict], None]] = None):
+    if LEVEL_1_ASYNC_MODE:
+        asyncio.run(clean_raw_data_async(input_file_path, output_file_path, on_item=on_item))
+    else:
+        clean_raw_data(input_file_path, output_file_path, on_item=on_item)
+
+
+def relevance_prompt(item: dict, context_query: str) -> Tuple[str, str]:
+    """Переменная часть запроса и system_instruction с критериями для контекста."""
+    return PROMPT_2_TEMPLATE.format(
+        text_content=item.get('cleaned_text', ''),
+        source_domain=item.get('source', ''),
+        source_weight=item.get('weight', 0),
+        url=item.get('url', ''),
+        date=item.get('date', '')
+    ), PROMPT_2_SYSTEM_TEMPLATE.format(context_query=context_query)
+
+
+def _is_relevance_answer(response: str) -> bool:
+    response = response.lower()
+    return 'да' in response or 'нет' in response
+
+
+def relevance_verdict(item: dict, relevance_response: str) -> bool:
+    relevant = bool(relevance_response) and 'да' in relevance_response.lower()
+    if not relevant:
+        logger.info(f"НЕСООТВЕТСТВИЕ: {item.get('url')} отфильтрован (Ответ: '{relevance_response}').")
+    return relevant
+
+
+def check_relevance_single(item: dict, context_query: str) -> bool:
+    prompt, system_instruction = relevance_prompt(item, context_query)
+    relevance_response = routed_call(prompt, "relevance", validate=_is_relevance_answer,
+                                     system_instruction=system_instruction)
+    return relevance_verdict(item, relevance_response)
+
+
+def parse_batch_verdicts(response: str, article_ids: List[str]) -> Optional[List[bool]]:
+    """
+    Строго проверяет ответ пакетной классификации: JSON-массив объектов {id, relevant: bool},
+    ровно по одному на каждую статью пакета. При любом несоответствии возвращает None.
+    """
+    try:
+        verdicts = json.loads(response)
+    except (TypeError, json.JSONDecodeError):
+        return None
+
+    if not isinstance(verdicts, list):
+        return None
+
+    by_id = {}
+    for verdict in verdicts:
+        if not isinstance(verdict, dict) or not isinstance(verdict.get('relevant'), bool):
+            return None
+        by_id[verdict.get('id')] = verdict['relevant']
+
+    if set(by_id) != set(article_ids):
+        return None
+    return [by_id[article_id] for article_id in article_ids]
+
+
+def relevance_batch_request(items: List[dict], context_query: str) -> Tuple[str, List[str], dict]:
+    """Промпт пакетной проверки, ID статей в нём и параметры генерации со строгой JSON-схемой."""
+    article_ids = [f"A{i + 1}" for i in range(len(items))]
+    articles = "\n".join(
+        PROMPT_2_BATCH_ARTICLE_TEMPLATE.format(
+            article_id=article_id,
+            source_domain=item.get('source', ''),
+            source_weight=item.get('weight', 0),
+            url=item.get('url', ''),
+            date=item.get('date', ''),
+            text_content=item.get('cleaned_text', '')
+        ) for article_id, item in zip(article_ids, items)
+    )
+    prompt = PROMPT_2_BATCH_TEMPLATE.format(articles=articles)
+    generation = {
+        "system_instruction": PROMPT_2_BATCH_SYSTEM_TEMPLATE.format(context_query=context_query),
+        "max_output_tokens": RELEVANCE_BATCH_OUTPUT_TOKENS_PER_ITEM * len(items) + 16,
+        "temperature": 0.0,
+        "response_mime_type": "application/json",
+        "response_schema": RELEVANCE_BATCH_SCHEMA,
+        # Лимит рассчитан только на JSON с вердиктами: размышления модели в него не поместятся
+        "thinking_budget": 0,
+    }
+    logger.info(f"Пакетная проверка релевантности {len(items)} статей...")
+    return prompt, article_ids, generation
+
+
+def log_batch_verdicts(items: List[dict], verdicts: List[bool]) -> None:
+    for item, relevant in zip(items, verdicts):
+        if not relevant:
+            logger.info(f"НЕСООТВЕТСТВИЕ: {item.get('url')} отфильтрован (пакетная проверка).")
+
+
+def check_relevance_batch(items: List[dict], context_query: str) -> List[bool]:
+    """
+    Проверяет релевантность нескольких статей одним запросом со строгой JSON-схемой ответа.
+    Если ответ не прошёл проверку, статьи пакета проверяются по одной.
+    """
+    if len(items) == 1:
+        return [check_relevance_single(items[0], context_query)]
+
+    prompt, article_ids, generation = relevance_batch_request(items, context_query)
+    response = routed_call(prompt, "relevance",
+                           validate=lambda r: parse_batch_verdicts(r, article_ids) is not None, **generation)
+
+    verdicts = parse_batch_verdicts(response, article_ids)
+    if verdicts is None:
+        logger.warning(f"Некорректный ответ пакетной проверки ('{response[:200]}'), проверяю статьи по одной.")
+        return [check_relevance_single(item, context_query) for item in items]
+
+    log_batch_verdicts(items, verdicts)
+    return verdicts
+
+
+def filter_and_deduplicate_data(input_file_path: str, output_file_path: str, context_query: str,
+                                batch_mode: bool = LEVEL_2_BATCH_MODE,
+                                batch_max_items: int = LEVEL_2_BATCH_MAX_ITEMS,
+                                batch_max_tokens: int = LEVEL_2_BATCH_MAX_TOKENS,
+                                items: Optional[Iterable[dict]] = None,
+                                on_item: Optional[Callable[[dict], None]] = None,
+                                relevance_hints: Optional[RelevanceHints] = None,
+                                relevance_checker: Optional[Callable[[List[dict], str], List[bool]]] = None):
+    """
+    Уровень 2. В пакетном режиме статьи упаковываются в запросы до batch_max_items штук
+    и batch_max_tokens оценочных токенов; иначе каждая проверяется отдельным запросом.
+
+    Если передан items (потоковый режим), записи берутся из него, а не из input_file_path.
+    Второго прохода по потоку нет, поэтому из почти-дубликатов остаётся первая встреченная статья,
+    а не статья с наибольшим весом домена. on_item вызывается для каждой релевантной записи.
+
+    Если переданы relevance_hints, статьи сначала оцениваются локальным предфильтром (ИНН/ОГРН,
+    наименования, BM25), и в Gemini идут только неоднозначные; отчёт предфильтра пишется рядом
+    с выходным файлом.
+
+    relevance_checker заменяет запросы к Gemini: получает статьи одного пакета и контекст, возвращает
+    вердикты (так работает офлайн-режим через Batch API).
+    """
     logger.info("--- НАЧАЛО УРОВНЯ 2: Потоковая фильтрация и дедупликация ---")
     logger.info(f"Контекст для фильтрации: '{context_query}'")
 
     seen_contents = set()
     relevant_count = 0
+    prefilter = RelevancePrefilter(relevance_hints, context_query) if relevance_hints else None
 
     try:
+        if items is None:
+            # Первый проход: кластеры перепечаток одной новости, от каждого остаётся статья с самым весомым доменом
+            sources: List[dict] = []
+
+            def _texts_for_clustering():
+                for item in stream_json_objects(input_file_path):
+                    if item.get('cleaned_text'):
+                        sources.append(
+                            {"source": item.get('source'), "url": item.get('url'), "weight": item.get('weight')}
+                        )
+                        yield item['cleaned_text'], item.get('weight', 0)
+
+            clusters = find_near_duplicate_clusters(_texts_for_clustering())
+            cluster_of = {index: representative
+                          for representative, members in clusters.items() for index in members}
+            logger.info(f"Найдено {len(clusters)} уникальных сюжетов среди {len(sources)} статей.")
+            items = stream_json_objects(input_file_path)
+            online_index = None
+        else:
+            sources = []
+            clusters = {}
+            cluster_of = {}
+            online_index = NearDuplicateIndex()
+
         with open(output_file_path, 'w', encoding='utf-8') as f_out:
             f_out.write('[')
             is_first_item = True
+            batch: List[dict] = []
+            batch_tokens = 0
 
-            for item in stream_json_objects(input_file_path):
+            def _write_relevant(item: dict):
+                nonlocal is_first_item, relevant_count
+                logger.info(f"СООТВЕТСТВИЕ: {item.get('url')} добавлен.")
+                if not is_first_item:
+                    f_out.write(',')
+                json.dump(item, f_out, ensure_ascii=False, indent=2, default=json_serializer)
+                f_out.flush()
+                is_first_item = False
+                relevant_count += 1
+                if on_item is not None:
+                    on_item(item)
+
+            def _flush_batch():
+                nonlocal batch, batch_tokens
+                if not batch:
+                    return
+                if relevance_checker is not None:
+                    verdicts = relevance_checker(batch, context_query)
+                elif batch_mode:
+                    verdicts = check_relevance_batch(batch, context_query)
+                else:
+                    verdicts = [check_relevance_single(batch[0], context_query)]
+
+                for item, relevant in zip(batch, verdicts):
+                    if prefilter is not None:
+                        prefilter.record_llm_verdict(item.get('url'), relevant)
+                    if relevant:
+                        _write_relevant(item)
+                batch = []
+                batch_tokens = 0
+
+            # Из каждого кластера почти-дубликатов дальше идёт только представитель
+            index = -1
+            for item in items:
                 content = item.get('cleaned_text', '')
                 if not content:
                     continue
 
+                index += 1
+                if online_index is not None:
+                    sources.append({"source": item.get('source'), "url": item.get('url'), "weight": item.get('weight')})
+                    matches = online_index.add(content)
+                    cluster_of[index] = cluster_of[matches[0]] if matches else index
+                    clusters.setdefault(cluster_of[index], []).append(index)
+
+                if cluster_of[index] != index:
+                    logger.info(f"ПОЧТИ ДУБЛИКАТ: {item.get('url')} пропущен "
+                                f"(сохранён {sources[cluster_of[index]]['url']}).")
+                    continue
+                if len(clusters[index]) > 1:
+                    item['near_duplicates'] = [sources[i] for i in clusters[index] if i != index]
+
                 if content in seen_contents:
                     logger.info(f"ДУБЛИКАТ: {item.get('url')} пропущен.")
                     continue
-
-                prompt = PROMPT_2_TEMPLATE.format(
-                    context_query=context_query,
-                    text_content=content,
-                    source_domain=item.get('source', ''),
-                    source_weight=item.get('weight', 0),
-                    url=item.get('url', ''),
-                    date=item.get('date', '')
-                )
-                relevance_response = call_to_gemini_api(prompt, GEMINI_MODEL_2)
-
-                if relevance_response and 'да' in relevance_response.lower():
-                    logger.info(f"СООТВЕТСТВИЕ: {item.get('url')} добавлен.")
-                    seen_contents.add(content)
-
-                    if not is_first_item:
-                        f_out.write(',')
-                    json.dump(item, f_out, ensure_ascii=False, indent=2, default=json_serializer)
-                    is_first_item = False
-                    relevant_count += 1
-                else:
-                    logger.info(f"НЕСООТВЕТСТВИЕ: {item.get('url')} отфильтрован (Ответ: '{relevance_response}').")
-
-                time.sleep(1)
+                seen_contents.add(content)
+
+                if prefilter is not None:
+                    decision = prefilter.decide(item)
+                    if decision == ACCEPT:
+                        logger.info(f"ПРЕДФИЛЬТР: {item.get('url')} принят без LLM.")
+                        _write_relevant(item)
+                        continue
+                    if decision == REJECT:
+                        logger.info(f"ПРЕДФИЛЬТР: {item.get('url')} отклонён без LLM.")
+                        continue
+
+                item_tokens = estimate_tokens(content)
+                if batch and (not batch_mode
+                              or len(batch) >= batch_max_items
+                              or batch_tokens + item_tokens > batch_max_tokens):
+                    _flush_batch()
+                batch.append(item)
+                batch_tokens += item_tokens
+
+            _flush_batch()
 
             f_out.write(']')
 
@@ -240,71 +733,185 @@ def filter_and_deduplicate_data(input_file_path: str, output_file_path: str, con
             os.remove(output_file_path)
         return
 
+    if prefilter is not None:
+        try:
+            prefilter.write_report(os.path.splitext(output_file_path)[0] + "_prefilter_report.json")
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить отчёт предфильтра: {e}")
+
     logger.info(f"Уровень 2 завершен. Отфильтровано {relevant_count} уникальных релевантных статей.")
     logger.info(f"Итоговые данные сохранены в: {output_file_path}")
     logger.info("--- КОНЕЦ УРОВНЯ 2 ---")
 
 
-def summarize_final_data(input_file_path: str, output_file_path: str, context_query: str, chunk_size: int = 10):
-    logger.info("--- НАЧАЛО УРОВНЯ 3: Создание итоговой сводки (Map-Reduce) ---")
-    logger.info(f"Фаза MAP: создание промежуточных сводок по чанкам размером {chunk_size}...")
-    intermediate_summaries = []
-    chunk = []
+CHUNK_SOURCE_SEPARATOR = "\n\n---\n\n"
 
-    try:
-        for item in stream_json_objects(input_file_path):
-            chunk.append(item)
-            if len(chunk) >= chunk_size:
-                chunk_texts = "\n\n---\n\n".join([
-                    "[SRC:{src} | W:{w} | URL:{u} | DATE:{d}]\n{txt}".format(
-                        src=c.get('source', ''),
-                        w=c.get('weight', 0),
-                        u=c.get('url', ''),
-                        d=c.get('date', ''),
-                        txt=c.get('cleaned_text', '')
-                    ) for c in chunk
-                ])
-                prompt = PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE.format(context_query=context_query, chunk_texts=chunk_texts)
-
-                logger.info(f"Обработка чанка из {len(chunk)} статей...")
-                summary = call_to_gemini_api(prompt, GEMINI_MODEL_1)
-                if summary:
-                    intermediate_summaries.append(summary)
-
-                chunk = []
-                time.sleep(2)
-
-        if chunk:
-            chunk_texts = "\n\n---\n\n".join([
-                "[SRC:{src} | W:{w} | URL:{u} | DATE:{d}]\n{txt}".format(
-                    src=c.get('source', ''),
-                    w=c.get('weight', 0),
-                    u=c.get('url', ''),
-                    d=c.get('date', ''),
-                    txt=c.get('cleaned_text', '')
-                ) for c in chunk
-            ])
-            prompt = PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE.format(context_query=context_query, chunk_texts=chunk_texts)
-            logger.info(f"Обработка финального чанка из {len(chunk)} статей...")
-            summary = call_to_gemini_api(prompt, GEMINI_MODEL_1)
-            if summary:
-                intermediate_summaries.append(summary)
 
-    except Exception as e:
-        logger.error(f"Ошибка на фазе MAP: {e}")
-        return
+def _format_chunk_source(item: dict, max_text_tokens: int) -> str:
+    return "[SRC:{src} | W:{w} | URL:{u} | DATE:{d}]\n{txt}".format(
+        src=item.get('source', ''),
+        w=item.get('weight', 0),
+        u=item.get('url', ''),
+        d=item.get('date', ''),
+        txt=truncate_to_tokens(item.get('cleaned_text', ''), max_text_tokens)
+    )
 
-    if not intermediate_summaries:
-        logger.warning("Не удалось создать ни одной промежуточной сводки. Пропускаю Уровень 3.")
-        return
 
-    logger.info(f"Фаза MAP завершена. Создано {len(intermediate_summaries)} промежуточных сводок.")
-    logger.info("Фаза REDUCE: создание финальной сводки из промежуточных...")
-    combined_summaries = "\n\n===\n\n".join(intermediate_summaries)
-    final_prompt = PROMPT_3_FINAL_SUMMARY_TEMPLATE.format(context_query=context_query,
-                                                          combined_summaries=combined_summaries)
+def _chunk_prompt(blocks: List[str], context_query: str) -> Tuple[str, str]:
+    prompt = PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE.format(chunk_texts=CHUNK_SOURCE_SEPARATOR.join(blocks))
+    logger.info(f"Обработка чанка из {len(blocks)} статей (~{estimate_tokens(prompt)} токенов)...")
+    return prompt, PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE.format(context_query=context_query)
+
+
+def _summarize_chunk(blocks: List[str], context_query: str) -> str:
+    prompt, system_instruction = _chunk_prompt(blocks, context_query)
+    return routed_call(prompt, "map", system_instruction=system_instruction)
+
+
+def _group_by_budget(texts: List[str], budget: int) -> List[List[str]]:
+    """Жадно делит тексты на группы суммарным размером не больше budget (в группе минимум два текста)."""
+    groups: List[List[str]] = []
+    group: List[str] = []
+    group_tokens = 0
+    for text in texts:
+        text_tokens = estimate_tokens(text)
+        if len(group) >= 2 and group_tokens + text_tokens > budget:
+            groups.append(group)
+            group = []
+            group_tokens = 0
+        group.append(text)
+        group_tokens += text_tokens
+    if group:
+        if len(group) == 1 and groups:
+            groups[-1].append(group[0])
+        else:
+            groups.append(group)
+    return groups
+
+
+def _merge_prompt(summaries: List[str], context_query: str) -> Tuple[str, str]:
+    return (PROMPT_3_MERGE_SUMMARIES_TEMPLATE.format(combined_summaries=SUMMARY_SEPARATOR.join(summaries)),
+            PROMPT_3_MERGE_SUMMARIES_SYSTEM_TEMPLATE.format(context_query=context_query))
+
+
+def _merge_summaries(summaries: List[str], context_query: str) -> str:
+    prompt, system_instruction = _merge_prompt(summaries, context_query)
+    return routed_call(prompt, "reduce", system_instruction=system_instruction)
+
+
+def _tree_reduce(summaries: List[str], context_query: str, token_budget: int,
+                 executor: ThreadPoolExecutor) -> List[str]:
+    """
+    Пока промежуточные сводки вместе не помещаются в token_budget, параллельно сводит их группами.
+    Каждый уровень как минимум вдвое уменьшает число сводок, поэтому уровней — O(log N).
+    """
+    level = 0
+    while len(summaries) > 1 and estimate_tokens(SUMMARY_SEPARATOR.join(summaries)) > token_budget:
+        level += 1
+        groups = _group_by_budget(summaries, token_budget)
+        logger.info(f"REDUCE, уровень {level}: {len(summaries)} сводок -> {len(groups)} групп.")
+        merged = list(executor.map(lambda group: _merge_summaries(group, context_query), groups))
+        # Если слияние группы не удалось, её сводки идут дальше как есть, но обрезанными,
+        # иначе цикл мог бы не сойтись
+        summaries = []
+        for group, merged_summary in zip(groups, merged):
+            if merged_summary:
+                summaries.append(merged_summary)
+            else:
+                logger.warning(f"Не удалось свести группу из {len(group)} сводок, использую их обрезанными.")
+                summaries.append(truncate_to_tokens(SUMMARY_SEPARATOR.join(group), token_budget // len(groups)))
+
+    if len(summaries) == 1 and estimate_tokens(summaries[0]) > token_budget:
+        summaries = [truncate_to_tokens(summaries[0], token_budget)]
+    return summaries
+
+
+def summarize_final_data(input_file_path: str, output_file_path: str, context_query: str,
+                         chunk_token_budget: int = LEVEL_3_MAP_TOKEN_BUDGET,
+                         max_article_tokens: int = LEVEL_3_MAX_ARTICLE_TOKENS,
+                         max_concurrency: int = LEVEL_3_MAP_MAX_CONCURRENCY,
+                         reduce_token_budget: int = LEVEL_3_REDUCE_TOKEN_BUDGET,
+                         items: Optional[Iterable[dict]] = None,
+                         stream_output: bool = GEMINI_STREAMING_OUTPUT,
+                         progress_listeners: Iterable[ProgressListener] = ()):
+    """
+    Уровень 3 (Map-Reduce). Статьи жадно упаковываются в MAP-запросы по оценочному бюджету
+    chunk_token_budget; текст длиннее max_article_tokens обрезается по границе предложения.
+    MAP-запросы выполняются параллельно (до max_concurrency), а промежуточные сводки, не помещающиеся
+    в reduce_token_budget, сводятся деревом — размер финального промпта ограничен.
+    Если передан items (потоковый режим), статьи берутся из него, а не из input_file_path.
+
+    При stream_output финальная сводка пишется в файл по мере генерации, progress_listeners получают
+    накопленный текст; при обрыве потока частичная сводка остаётся в '<output_file_path>.partial'.
+    """
+    logger.info("--- НАЧАЛО УРОВНЯ 3: Создание итоговой сводки (Map-Reduce) ---")
+    logger.info(f"Фаза MAP: создание промежуточных сводок по чанкам до ~{chunk_token_budget} токенов...")
+    template_tokens = estimate_tokens(
+        PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE.format(chunk_texts="")
+        + PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE.format(context_query=context_query)
+    )
+    blocks_budget = max(1, chunk_token_budget - template_tokens)
+    max_article_tokens = min(max_article_tokens, blocks_budget)
+    separator_tokens = estimate_tokens(CHUNK_SOURCE_SEPARATOR)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="level_3") as executor:
+        map_futures = []
+        blocks: List[str] = []
+        blocks_tokens = 0
+
+        try:
+            for item in (items if items is not None else stream_json_objects(input_file_path)):
+                block = _format_chunk_source(item, max_article_tokens)
+                block_tokens = estimate_tokens(block) + separator_tokens
+                if blocks and blocks_tokens + block_tokens > blocks_budget:
+                    map_futures.append(executor.submit(_summarize_chunk, blocks, context_query))
+                    blocks = []
+                    blocks_tokens = 0
+                blocks.append(block)
+                blocks_tokens += block_tokens
+
+            if blocks:
+                map_futures.append(executor.submit(_summarize_chunk, blocks, context_query))
+
+            # Порядок промежуточных сводок совпадает с порядком чанков
+            intermediate_summaries = [summary for summary in (f.result() for f in map_futures) if summary]
+
+        except Exception as e:
+            logger.error(f"Ошибка на фазе MAP: {e}")
+            return
+
+        if not intermediate_summaries:
+            logger.warning("Не удалось создать ни одной промежуточной сводки. Пропускаю Уровень 3.")
+            return
+
+        logger.info(f"Фаза MAP завершена. Создано {len(intermediate_summaries)} промежуточных сводок.")
+        logger.info("Фаза REDUCE: создание финальной сводки из промежуточных...")
+        reduced_summaries = _tree_reduce(intermediate_summaries, context_query, reduce_token_budget, executor)
+
+    combined_summaries = SUMMARY_SEPARATOR.join(reduced_summaries)
+    final_prompt = PROMPT_3_FINAL_SUMMARY_TEMPLATE.format(combined_summaries=combined_summaries)
+    final_instruction = PROMPT_3_FINAL_SUMMARY_SYSTEM_TEMPLATE.format(context_query=context_query)
+
+    if stream_output:
+        try:
+            final_summary = stream_to_file(
+                output_file_path,
+                lambda on_text, on_restart: routed_call_stream(final_prompt, "final_summary", on_text,
+                                                               on_restart=on_restart,
+                                                               system_instruction=final_instruction),
+                progress_listeners
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении файла {output_file_path}: {e}")
+            return
+        if not final_summary:
+            logger.error("Не удалось сгенерировать финальную сводку.")
+            return
+        logger.info(f"Уровень 3 завершен. Финальная сводка сохранена в: {output_file_path}")
+        logger.info("--- КОНЕЦ УРОВНЯ 3 ---")
+        return
 
-    final_summary = call_to_gemini_api(final_prompt, GEMINI_MODEL_3)
+    final_summary = routed_call(final_prompt, "final_summary", system_instruction=final_instruction)
 
     if not final_summary:
         logger.error("Не удалось сгенерировать финальную сводку.")
@@ -319,7 +926,86 @@ def summarize_final_data(input_file_path: str, output_file_path: str, context_qu
     logger.info("--- КОНЕЦ УРОВНЯ 3 ---")
 
 
-def run_gemini_processing_pipeline(raw_json_file_path: str, context_query: str, processed_data_dir: str):
+_END_OF_STREAM = object()
+
+
+def _iter_queue(q: queue.Queue) -> Iterator[dict]:
+    while True:
+        item = q.get()
+        if item is _END_OF_STREAM:
+            return
+        yield item
+
+
+def _drain_queue(q: queue.Queue) -> None:
+    # Дочитывает очередь до конца, если потребитель завершился раньше, чтобы не заблокировать производителя
+    for _ in _iter_queue(q):
+        pass
+
+
+def _run_streaming_levels(raw_json_file_path: str, level_1_output_file: str, level_2_output_file: str,
+                          level_3_output_file: str, context_query: str,
+                          relevance_hints: Optional[RelevanceHints] = None,
+                          progress_listeners: Iterable[ProgressListener] = ()) -> None:
+    """
+    Уровни 1-3 работают одновременно: очищенные записи сразу идут на проверку релевантности,
+    релевантные — в упаковку MAP-чанков. Очереди ограничены (PIPELINE_QUEUE_SIZE), так что быстрый
+    уровень ждёт медленный. Файлы уровней 1 и 2 по-прежнему пишутся для аудита.
+    """
+    cleaned_queue: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    relevant_queue: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    def _level_1():
+        try:
+            _run_level_1(raw_json_file_path, level_1_output_file, on_item=cleaned_queue.put)
+        except Exception as e:
+            logger.error(f"Критическая ошибка на Уровне 1: {e}")
+        finally:
+            cleaned_queue.put(_END_OF_STREAM)
+
+    def _level_2():
+        try:
+            filter_and_deduplicate_data(
+                level_1_output_file, level_2_output_file, context_query,
+                items=_iter_queue(cleaned_queue), on_item=relevant_queue.put,
+                relevance_hints=relevance_hints
+            )
+        except Exception as e:
+            logger.error(f"Критическая ошибка на Уровне 2: {e}")
+        finally:
+            _drain_queue(cleaned_queue)
+            relevant_queue.put(_END_OF_STREAM)
+
+    threads = [
+        threading.Thread(target=_level_1, name="pipeline_level_1", daemon=True),
+        threading.Thread(target=_level_2, name="pipeline_level_2", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        summarize_final_data(level_2_output_file, level_3_output_file, context_query,
+                             items=_iter_queue(relevant_queue), progress_listeners=progress_listeners)
+    finally:
+        _drain_queue(relevant_queue)
+        for thread in threads:
+            thread.join()
+
+
+def level_output_paths(raw_json_file_path: str, processed_data_dir: str) -> Tuple[str, str, str]:
+    """Пути к результатам уровней 1–3 для сырого файла."""
+    base_name = os.path.splitext(os.path.basename(raw_json_file_path))[0]
+    return (
+        os.path.join(processed_data_dir, f"{base_name}_level_1_cleaned.json"),
+        os.path.join(processed_data_dir, f"{base_name}_level_2_filtered.json"),
+        os.path.join(processed_data_dir, f"{base_name}_level_3_summary.txt"),
+    )
+
+
+def run_gemini_processing_pipeline(raw_json_file_path: str, context_query: str, processed_data_dir: str,
+                                   streaming: bool = PIPELINE_STREAMING_MODE,
+                                   relevance_hints: Optional[RelevanceHints] = None,
+                                   progress_listeners: Iterable[ProgressListener] = ()):
     logger.info(f"--- Запуск пайплайна обработки Gemini с контекстом: '{context_query}' ---")
 
     if not os.path.exists(processed_data_dir):
@@ -330,13 +1016,19 @@ def run_gemini_processing_pipeline(raw_json_file_path: str, context_query: str,
         logger.error(f"Входной файл не найден: {raw_json_file_path}. Пайплайн остановлен.")
         return None
 
-    base_name = os.path.splitext(os.path.basename(raw_json_file_path))[0]
+    level_1_output_file, level_2_output_file, level_3_output_file = level_output_paths(
+        raw_json_file_path, processed_data_dir)
 
-    level_1_output_file = os.path.join(processed_data_dir, f"{base_name}_level_1_cleaned.json")
-    level_2_output_file = os.path.join(processed_data_dir, f"{base_name}_level_2_filtered.json")
-    level_3_output_file = os.path.join(processed_data_dir, f"{base_name}_level_3_summary.txt")
+    if streaming:
+        _run_streaming_levels(raw_json_file_path, level_1_output_file, level_2_output_file,
+                              level_3_output_file, context_query, relevance_hints, progress_listeners)
+        if not os.path.exists(level_3_output_file):
+            logger.error("Потоковый пайплайн не создал итоговую сводку.")
+            return None
+        logger.info(f"--- Пайплайн обработки Gemini завершен для контекста: '{context_query}' ---")
+        return level_3_output_file
 
-    clean_raw_data(input_file_path=raw_json_file_path, output_file_path=level_1_output_file)
+    _run_level_1(raw_json_file_path, level_1_output_file)
     if not os.path.exists(level_1_output_file):
         logger.error("Уровень 1 не создал выходной файл. Пайплайн прерван.")
         return None
@@ -344,7 +1036,8 @@ def run_gemini_processing_pipeline(raw_json_file_path: str, context_query: str,
     filter_and_deduplicate_data(
         input_file_path=level_1_output_file,
         output_file_path=level_2_output_file,
-        context_query=context_query
+        context_query=context_query,
+        relevance_hints=relevance_hints
     )
     if not os.path.exists(level_2_output_file):
         logger.error("Уровень 2 не создал выходной файл. Пайплайн прерван.")
@@ -353,7 +1046,8 @@ def run_gemini_processing_pipeline(raw_json_file_path: str, context_query: str,
     summarize_final_data(
         input_file_path=level_2_output_file,
         output_file_path=level_3_output_file,
-        context_query=context_query
+        context_query=context_query,
+        progress_listeners=progress_listeners
     )
 
     logger.info("Все этапы обработки завершены.")
@@ -0,0 +1,392 @@
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from internship_analytics.conf import BATCH_JOBS_DIR, GEMINI_BATCH_DEADLINE_SECONDS, GEMINI_BATCH_POLL_SECONDS
+from .config.gemini_config import get_gemini_config
+from .config.logger_config import get_logger
+from .gemini_3_factor_process_data import (
+    PROMPT_1,
+    check_relevance_batch,
+    check_relevance_single,
+    clean_item,
+    filter_and_deduplicate_data,
+    json_serializer,
+    level_output_paths,
+    log_batch_verdicts,
+    parse_batch_verdicts,
+    prepare_cleaning,
+    relevance_batch_request,
+    relevance_prompt,
+    relevance_verdict,
+    stream_json_objects,
+    summarize_final_data,
+)
+from .llm_cache import get_llm_cache, make_llm_key
+from .model_router import get_model_router
+from .relevance_prefilter import RelevanceHints
+from .request_to_gemini_api import generation_config
+
+logger = get_logger("gemini_batch")
+
+SUCCEEDED = "JOB_STATE_SUCCEEDED"
+TERMINAL_STATES = {SUCCEEDED, "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+# (ключ, промпт, параметры генерации call_to_gemini_api)
+BatchRequest = Tuple[str, str, dict]
+
+
+@dataclass
+class BulkJob:
+    """Один ИНН офлайн-режима: сырой файл, контекст и папка для результатов уровней."""
+    raw_json_file_path: str
+    context_query: str
+    processed_data_dir: str
+    relevance_hints: Optional[RelevanceHints] = None
+
+
+class GeminiBatchBackend:
+    """Gemini Batch API: JSONL-файл запросов загружается через Files API, результаты скачиваются файлом."""
+
+    def submit(self, requests_path: str, model: str, display_name: str) -> str:
+        client = get_gemini_config()
+        uploaded = client.files.upload(file=requests_path,
+                                       config={"display_name": display_name, "mime_type": "jsonl"})
+        job = client.batches.create(model=model, src=uploaded.name, config={"display_name": display_name})
+        return job.name
+
+    def state(self, job_name: str) -> str:
+        state = get_gemini_config().batches.get(name=job_name).state
+        return getattr(state, "name", str(state))
+
+    def download_results(self, job_name: str, results_path: str) -> None:
+        client = get_gemini_config()
+        job = client.batches.get(name=job_name)
+        content = client.files.download(file=job.dest.file_name)
+        with open(results_path, "wb") as f:
+            f.write(content)
+
+
+def _default_fake_response(key: str, prompt: str) -> str:
+    """Уровень 1 — текст после последнего разделителя промпта, Уровень 2 — все статьи релевантны."""
+    if ":L1:" in key:
+        return prompt.rsplit("---", 1)[-1].strip()
+    article_ids = re.findall(r"^=== ID: (\S+?) \|", prompt, re.MULTILINE)
+    if article_ids:
+        return json.dumps([{"id": article_id, "relevant": True} for article_id in article_ids])
+    return "Да"
+
+
+class FakeBatchBackend:
+    """
+    Локальная замена Batch API для отладки офлайн-режима без сети: ответы даёт responder(ключ, промпт),
+    задание считается выполненным после polls_until_done опросов, ключи из fail_keys возвращаются с ошибкой.
+    """
+
+    def __init__(self, responder: Callable[[str, str], str] = _default_fake_response,
+                 polls_until_done: int = 1, fail_keys: Iterable[str] = ()):
+        self.responder = responder
+        self.polls_until_done = polls_until_done
+        self.fail_keys = set(fail_keys)
+        self._jobs: Dict[str, Dict] = {}
+
+    def submit(self, requests_path: str, model: str, display_name: str) -> str:
+        with open(requests_path, "r", encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        job_name = f"batches/fake-{len(self._jobs) + 1}-{display_name}"
+        self._jobs[job_name] = {"requests": requests, "polls": 0}
+        return job_name
+
+    def state(self, job_name: str) -> str:
+        job = self._jobs[job_name]
+        job["polls"] += 1
+        return SUCCEEDED if job["polls"] >= self.polls_until_done else "JOB_STATE_RUNNING"
+
+    def download_results(self, job_name: str, results_path: str) -> None:
+        with open(results_path, "w", encoding="utf-8") as f:
+            for line in self._jobs[job_name]["requests"]:
+                key = line["key"]
+                if key in self.fail_keys:
+                    result = {"key": key, "error": {"code": 500, "message": "fake batch error"}}
+                else:
+                    prompt = line["request"]["contents"][0]["parts"][0]["text"]
+                    text = self.responder(key, prompt)
+                    result = {"key": key, "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}}
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def _request_line(key: str, prompt: str, config: dict) -> str:
+    request = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    generation = dict(config)
+    system_instruction = generation.pop("system_instruction", None)
+    if system_instruction is not None:
+        request["system_instruction"] = {"parts": [{"text": system_instruction}]}
+    if generation:
+        request["generation_config"] = generation
+    return json.dumps({"key": key, "request": request}, ensure_ascii=False)
+
+
+def _iter_results(results_path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """(ключ, текст ответа); None — запрос завершился ошибкой."""
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            if "error" in result:
+                logger.warning(f"Запрос {result.get('key')} пакетного задания не выполнен: {result['error']}")
+                yield result.get("key"), None
+                continue
+            candidates = (result.get("response") or {}).get("candidates") or [{}]
+            parts = (candidates[0].get("content") or {}).get("parts") or []
+            yield result.get("key"), "".join(part.get("text", "") for part in parts).strip()
+
+
+def _wait_for_job(backend, job_name: str, poll_seconds: float) -> str:
+    started = time.monotonic()
+    while True:
+        state = backend.state(job_name)
+        if state in TERMINAL_STATES:
+            return state
+        if time.monotonic() - started > GEMINI_BATCH_DEADLINE_SECONDS:
+            raise TimeoutError(f"Пакетное задание {job_name} не завершилось за {GEMINI_BATCH_DEADLINE_SECONDS} с.")
+        logger.info(f"Пакетное задание {job_name}: {state}, следующая проверка через {poll_seconds} с.")
+        time.sleep(poll_seconds)
+
+
+def run_batch(backend, requests: Iterable[BatchRequest], model: str, name: str,
+              poll_seconds: float = GEMINI_BATCH_POLL_SECONDS) -> Dict[str, str]:
+    """
+    Отправляет запросы одним пакетным заданием и ждёт его завершения.
+    Ответы кладутся в кэш ответов Gemini под теми же ключами, что и при онлайн-вызове.
+
+    :return: {ключ запроса: текст ответа}; запросы с ошибкой в словарь не попадают
+    """
+    os.makedirs(BATCH_JOBS_DIR, exist_ok=True)
+    requests_path = os.path.join(BATCH_JOBS_DIR, f"{name}_requests.jsonl")
+    results_path = os.path.join(BATCH_JOBS_DIR, f"{name}_results.jsonl")
+
+    cache_keys: Dict[str, str] = {}
+    with open(requests_path, "w", encoding="utf-8") as f:
+        for key, prompt, generation in requests:
+            config = generation_config(
+                generation.get("max_output_tokens"), generation.get("temperature"), generation.get("top_p"),
+                generation.get("top_k"), generation.get("system_instruction"),
+                generation.get("response_mime_type"), generation.get("response_schema"),
+                model, generation.get("thinking_budget"),
+            )
+            f.write(_request_line(key, prompt, config) + "\n")
+            cache_keys[key] = make_llm_key(model, prompt, config)
+
+    if not cache_keys:
+        return {}
+
+    job_name = backend.submit(requests_path, model, name)
+    logger.info(f"Пакетное задание {job_name} ({name}): {len(cache_keys)} запросов к {model}.")
+    state = _wait_for_job(backend, job_name, poll_seconds)
+    if state != SUCCEEDED:
+        logger.error(f"Пакетное задание {job_name} завершилось со статусом {state}.")
+        return {}
+
+    backend.download_results(job_name, results_path)
+    results: Dict[str, str] = {}
+    cache = get_llm_cache()
+    for key, text in _iter_results(results_path):
+        if text is None or key not in cache_keys:
+            continue
+        results[key] = text
+        cache.put(cache_keys[key], model, text)
+
+    logger.info(f"Пакетное задание {job_name}: получено {len(results)} из {len(cache_keys)} ответов.")
+    return results
+
+
+def _level_1_requests(jobs: List[BulkJob]) -> Iterator[BatchRequest]:
+    for job_index, job in enumerate(jobs):
+        for item_index, item in enumerate(stream_json_objects(job.raw_json_file_path)):
+            _, prompt = prepare_cleaning(item)
+            if prompt is not None:
+                yield f"{job_index}:L1:{item_index}", prompt, {"system_instruction": PROMPT_1}
+
+
+def _write_level_1(job_index: int, job: BulkJob, results: Dict[str, str]) -> str:
+    """
+    Пишет результат Уровня 1 в том же формате, что и clean_raw_data.
+    Записи без ответа пакетного задания очищаются онлайн, как в clean_raw_data.
+    """
+    output_file_path = level_output_paths(job.raw_json_file_path, job.processed_data_dir)[0]
+    written = missing = failed = 0
+    with open(output_file_path, "w", encoding="utf-8") as f_out:
+        f_out.write('[')
+        for item_index, item in enumerate(stream_json_objects(job.raw_json_file_path)):
+            cleaned_text, prompt = prepare_cleaning(item)
+            if prompt is not None:
+                cleaned_text = results.get(f"{job_index}:L1:{item_index}")
+            elif cleaned_text is None:
+                continue
+
+            if cleaned_text is None:
+                missing += 1
+                try:
+                    item = clean_item(item)
+                except Exception as e:
+                    logger.error(f"Ошибка очистки записи {item.get('url', 'N/A')}: {e}")
+                    failed += 1
+                    continue
+                if item is None:
+                    continue
+            else:
+                item['cleaned_text'] = cleaned_text
+            if written:
+                f_out.write(',')
+            json.dump(item, f_out, ensure_ascii=False, indent=2, default=json_serializer)
+            written += 1
+        f_out.write(']')
+
+    if missing:
+        logger.warning(f"Уровень 1 ({job.raw_json_file_path}): нет ответа для {missing} записей, "
+                       f"очищены онлайн, не удалось {failed}.")
+    logger.info(f"Уровень 1 завершен. Очищено и сохранено {written} записей в: {output_file_path}")
+    return output_file_path
+
+
+class _RelevanceCollector:
+    """relevance_checker первого прохода: запоминает запросы пакетов и временно отклоняет все статьи."""
+
+    def __init__(self, job_index: int):
+        self.job_index = job_index
+        self.requests: List[BatchRequest] = []
+
+    def __call__(self, items: List[dict], context_query: str) -> List[bool]:
+        key = f"{self.job_index}:L2:{len(self.requests)}"
+        if len(items) == 1:
+            prompt, system_instruction = relevance_prompt(items[0], context_query)
+            self.requests.append((key, prompt, {"system_instruction": system_instruction}))
+        else:
+            prompt, _, generation = relevance_batch_request(items, context_query)
+            self.requests.append((key, prompt, generation))
+        return [False] * len(items)
+
+
+class _RelevanceAnswers:
+    """relevance_checker второго прохода: вердикты из ответов пакетного задания, при их отсутствии — онлайн."""
+
+    def __init__(self, job_index: int, results: Dict[str, str]):
+        self.job_index = job_index
+        self.results = results
+        self.calls = 0
+
+    def __call__(self, items: List[dict], context_query: str) -> List[bool]:
+        key = f"{self.job_index}:L2:{self.calls}"
+        self.calls += 1
+        response = self.results.get(key)
+        if response is None:
+            logger.warning(f"Нет ответа пакетного задания для {key}, проверяю онлайн.")
+            return check_relevance_batch(items, context_query)
+
+        if len(items) == 1:
+            return [relevance_verdict(items[0], response)]
+        verdicts = parse_batch_verdicts(response, [f"A{i + 1}" for i in range(len(items))])
+        if verdicts is None:
+            logger.warning(f"Некорректный ответ пакетной проверки {key}, проверяю статьи по одной.")
+            return [check_relevance_single(item, context_query) for item in items]
+        log_batch_verdicts(items, verdicts)
+        return verdicts
+
+
+def _collect_level_2_requests(job_index: int, job: BulkJob) -> List[BatchRequest]:
+    level_1_file, level_2_file, _ = level_output_paths(job.raw_json_file_path, job.processed_data_dir)
+    collect_file = os.path.join(BATCH_JOBS_DIR, f"{job_index}_{os.path.basename(level_2_file)}")
+    collector = _RelevanceCollector(job_index)
+    filter_and_deduplicate_data(level_1_file, collect_file, job.context_query,
+                                relevance_hints=job.relevance_hints, relevance_checker=collector)
+    return collector.requests
+
+
+def run_bulk_pipeline(jobs: List[BulkJob], backend=None, run_level_3: bool = True,
+                      poll_seconds: float = GEMINI_BATCH_POLL_SECONDS) -> List[Optional[str]]:
+    """
+    Офлайн-режим для ночных выгрузок по многим ИНН: запросы Уровней 1 и 2 всех ИНН собираются
+    в пакетные задания Batch API (одно на уровень), а ответы раскладываются в обычные файлы уровней.
+    Уровень 2 проходит дважды с теми же группировкой, предфильтром и дедупликацией: первый проход
+    собирает запросы, второй применяет ответы. Уровень 3 выполняется онлайн.
+
+    Пакетные задания идут на первую модель этапа (router.plan(stage, 0)[0]) без эскалации
+    по каскаду: ответы приходят разом, когда задание уже завершено. Записи без ответа или
+    с ответом, не прошедшим проверку, досчитываются онлайн через маршрутизатор — уже с эскалацией.
+
+    :param backend: GeminiBatchBackend (по умолчанию) или FakeBatchBackend для локальной отладки
+    :return: для каждого задания путь к итоговому файлу (сводка или файл Уровня 2) или None
+    """
+    backend = backend or GeminiBatchBackend()
+    router = get_model_router()
+    run_name = time.strftime("%Y%m%d_%H%M%S")
+
+    valid_jobs: List[Tuple[int, BulkJob]] = []
+    for job_index, job in enumerate(jobs):
+        if not os.path.exists(job.raw_json_file_path):
+            logger.error(f"Входной файл не найден: {job.raw_json_file_path}. Задание пропущено.")
+            continue
+        os.makedirs(job.processed_data_dir, exist_ok=True)
+        valid_jobs.append((job_index, job))
+
+    logger.info(f"--- ОФЛАЙН-РЕЖИМ: Уровень 1 для {len(valid_jobs)} заданий ---")
+    level_1_results = run_batch(backend, _level_1_requests([job for _, job in valid_jobs]),
+                                router.plan("clean", 0)[0], f"{run_name}_level_1", poll_seconds)
+    for position, (_, job) in enumerate(valid_jobs):
+        _write_level_1(position, job, level_1_results)
+
+    logger.info(f"--- ОФЛАЙН-РЕЖИМ: Уровень 2 для {len(valid_jobs)} заданий ---")
+    level_2_requests: List[BatchRequest] = []
+    for position, (_, job) in enumerate(valid_jobs):
+        level_2_requests.extend(_collect_level_2_requests(position, job))
+    level_2_results = run_batch(backend, level_2_requests, router.plan("relevance", 0)[0],
+                                f"{run_name}_level_2", poll_seconds)
+
+    outputs: List[Optional[str]] = [None] * len(jobs)
+    for position, (job_index, job) in enumerate(valid_jobs):
+        level_1_file, level_2_file, level_3_file = level_output_paths(job.raw_json_file_path,
+                                                                      job.processed_data_dir)
+        filter_and_deduplicate_data(level_1_file, level_2_file, job.context_query,
+                                    relevance_hints=job.relevance_hints,
+                                    relevance_checker=_RelevanceAnswers(position, level_2_results))
+        if not os.path.exists(level_2_file):
+            continue
+        outputs[job_index] = level_2_file
+
+        if run_level_3:
+            summarize_final_data(level_2_file, level_3_file, job.context_query)
+            if os.path.exists(level_3_file):
+                outputs[job_index] = level_3_file
+
+    logger.info(f"--- ОФЛАЙН-РЕЖИМ завершен: готово {sum(o is not None for o in outputs)} из {len(jobs)} ---")
+    return outputs
+
+
+def load_bulk_jobs(jobs_file_path: str) -> List[BulkJob]:
+    """
+    Читает задания офлайн-режима из JSON-списка объектов с полями BulkJob;
+    relevance_hints задаётся объектом {"identifiers": [...], "names": [...]}.
+    """
+    with open(jobs_file_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    jobs = []
+    for entry in entries:
+        hints = entry.get("relevance_hints")
+        jobs.append(BulkJob(
+            raw_json_file_path=entry["raw_json_file_path"],
+            context_query=entry["context_query"],
+            processed_data_dir=entry["processed_data_dir"],
+            relevance_hints=RelevanceHints(**hints) if hints else None,
+        ))
+    return jobs
+
+
+if __name__ == "__main__":
+    # python -m internship_analytics.modules.gemini_batch jobs.json [--fake]
+    bulk_backend = FakeBatchBackend() if "--fake" in sys.argv[2:] else GeminiBatchBackend()
+    print(json.dumps(run_bulk_pipeline(load_bulk_jobs(sys.argv[1]), bulk_backend), ensure_ascii=False, indent=2))
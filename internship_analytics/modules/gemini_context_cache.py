@@ -0,0 +1,123 @@
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from internship_analytics.conf import (
+    GEMINI_CONTEXT_CACHE_ENABLED,
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS,
+)
+from .config.gemini_config import GeminiConfigError, get_gemini_config
+from .config.logger_config import get_logger
+from .token_budget import estimate_tokens
+
+logger = get_logger("gemini_context_cache")
+
+# Кэш пересоздаётся заранее, чтобы запрос не попал на уже истёкший
+TTL_SAFETY_MARGIN = 0.9
+
+
+class ContextCacheRegistry:
+    """
+    Кэши контекста Gemini (client.caches) для повторяющихся system_instruction: инструкция
+    регистрируется один раз на модель, а запросы ссылаются на неё через cached_content и передают
+    только переменную часть. Инструкции короче порога модели остаются обычным system_instruction.
+
+    Кэши живут в пределах запуска: clear() удаляет их, ttl — страховка на случай, если запуск оборвался.
+    """
+
+    def __init__(self,
+                 enabled: bool = GEMINI_CONTEXT_CACHE_ENABLED,
+                 min_tokens: Dict[str, int] = GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+                 ttl_seconds: float = GEMINI_CONTEXT_CACHE_TTL_SECONDS):
+        self.enabled = enabled
+        self.min_tokens = dict(min_tokens)
+        self.ttl_seconds = ttl_seconds
+        self.created = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        # (модель, хэш инструкции) -> (имя кэша или None, если создать не удалось; время создания)
+        self._caches: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+
+    def _cacheable(self, model: str, system_instruction: str) -> bool:
+        min_tokens = self.min_tokens.get(model)
+        return self.enabled and min_tokens is not None and estimate_tokens(system_instruction) >= min_tokens
+
+    def cached_content(self, model: str, system_instruction: str) -> Optional[str]:
+        """Имя кэша с этой инструкцией для модели (создаётся при первом обращении) или None."""
+        if not self._cacheable(model, system_instruction):
+            return None
+
+        key = (model, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+        with self._lock:
+            name, created_at = self._caches.get(key, (None, None))
+            if created_at is not None and (name is None or
+                                           time.monotonic() - created_at < self.ttl_seconds * TTL_SAFETY_MARGIN):
+                self.hits += int(name is not None)
+                return name
+
+            try:
+                cache = get_gemini_config().caches.create(model=model, config={
+                    "system_instruction": system_instruction,
+                    "display_name": f"internship_analytics_{key[1][:12]}",
+                    "ttl": f"{int(self.ttl_seconds)}s",
+                })
+                name = cache.name
+                self.created += 1
+                logger.info(f"Создан кэш контекста {name} для {model} "
+                            f"(~{estimate_tokens(system_instruction)} токенов).")
+            except GeminiConfigError:
+                raise
+            except Exception as e:
+                # Повторно не пробуем: инструкция будет передаваться в каждом запросе
+                logger.warning(f"Не удалось создать кэш контекста для {model}: {e}")
+                name = None
+            self._caches[key] = (name, time.monotonic())
+            return name
+
+    def request_config(self, model: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Параметры запроса, в которых system_instruction по возможности заменён ссылкой на кэш."""
+        system_instruction = config.get("system_instruction")
+        if not system_instruction:
+            return config
+        name = self.cached_content(model, system_instruction)
+        if name is None:
+            return config
+        request = {key: value for key, value in config.items() if key != "system_instruction"}
+        request["cached_content"] = name
+        return request
+
+    def clear(self) -> None:
+        """Удаляет созданные за запуск кэши."""
+        with self._lock:
+            names = [name for name, _ in self._caches.values() if name]
+            self._caches.clear()
+        if not names:
+            return
+        client = get_gemini_config()
+        for name in names:
+            try:
+                client.caches.delete(name=name)
+            except Exception as e:
+                logger.warning(f"Не удалось удалить кэш контекста {name}: {e}")
+        logger.info(f"Удалено кэшей контекста: {len(names)}.")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"created": self.created, "hits": self.hits}
+
+
+_context_cache_registry = ContextCacheRegistry()
+
+
+def get_context_cache_registry() -> ContextCacheRegistry:
+    return _context_cache_registry
+
+
+def reset_context_cache_registry() -> ContextCacheRegistry:
+    """Начинает новый запуск: кэши прошлого запуска удаляются."""
+    global _context_cache_registry
+    _context_cache_registry.clear()
+    _context_cache_registry = ContextCacheRegistry()
+    return _context_cache_registry
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from internship_analytics.conf import (
+    GEMINI_DEFAULT_QUOTA,
+    GEMINI_INITIAL_CONCURRENCY,
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_MIN_CONCURRENCY,
+    GEMINI_MODEL_QUOTAS,
+)
+from .config.logger_config import get_logger
+
+logger = get_logger("gemini_rate_limiter")
+
+WINDOW_SECONDS = 60.0
+
+
+class ModelRateLimiter:
+    """
+    Скользящее окно в одну минуту по числу запросов (RPM) и входных токенов (TPM) для одной модели.
+    acquire() блокирует поток, пока новый запрос не укладывается в квоту; acquire_async() — то же
+    для корутин, не блокируя событийный цикл.
+    """
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._events: deque = deque()  # (время, токены)
+        self._tokens_in_window = 0
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def _reserve(self, tokens: int) -> float:
+        """Занимает место в окне и возвращает 0 либо сколько секунд ждать до следующей попытки."""
+        # Запрос больше всей минутной квоты пропускаем одного в пустом окне, иначе он ждал бы вечно
+        tokens = min(tokens, self.tpm)
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self._events) < self.rpm and self._tokens_in_window + tokens <= self.tpm:
+                self._events.append((now, tokens))
+                self._tokens_in_window += tokens
+                return 0.0
+            wait = WINDOW_SECONDS - (now - self._events[0][0])
+        logger.info(f"Квота {self.model} исчерпана, ожидание {wait:.1f} с.")
+        return max(wait, 0.05)
+
+    def acquire(self, tokens: int) -> None:
+        while (wait := self._reserve(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int) -> None:
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD-лимит одновременных запросов к одной модели: каждый успешный ответ поднимает лимит
+    на 1/limit (примерно +1 за круг запросов), ошибка квоты (429) делит его пополам — не чаще раза
+    в DECREASE_COOLDOWN секунд, чтобы пачка 429 от уже отправленных запросов не обрушила его до минимума.
+    Параллелизм так устанавливается чуть ниже реальной квоты.
+    """
+
+    DECREASE_COOLDOWN = 5.0
+    ASYNC_POLL_INTERVAL = 0.05
+
+    def __init__(self, model: str, initial: int = GEMINI_INITIAL_CONCURRENCY,
+                 minimum: int = GEMINI_MIN_CONCURRENCY, maximum: int = GEMINI_MAX_CONCURRENCY):
+        self.model = model
+        self.minimum = minimum
+        self.maximum = maximum
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(self.minimum, int(self._limit))
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    async def acquire_async(self) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(self.ASYNC_POLL_INTERVAL)
+
+    def release(self, succeeded: bool = False, throttled: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.DECREASE_COOLDOWN:
+                    self._last_decrease = now
+                    self._limit = max(float(self.minimum), self._limit / 2)
+                    logger.info(f"Квота {self.model}: параллелизм снижен до {self.limit}.")
+            elif succeeded:
+                self._limit = min(float(self.maximum), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            quota = GEMINI_MODEL_QUOTAS.get(model, GEMINI_DEFAULT_QUOTA)
+            limiter = ModelRateLimiter(model, rpm=quota["rpm"], tpm=quota["tpm"])
+            _limiters[model] = limiter
+        return limiter
+
+
+_concurrency_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_concurrency_limiter(model: str) -> AdaptiveConcurrencyLimiter:
+    with _limiters_lock:
+        limiter = _concurrency_limiters.get(model)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(model)
+            _concurrency_limiters[model] = limiter
+        return limiter
@@ -0,0 +1,179 @@
+import asyncio
+import random
+import re
+import threading
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from internship_analytics.conf import GEMINI_RETRY_MAX_ATTEMPTS
+from .config.logger_config import get_logger
+
+logger = get_logger("gemini_retry")
+
+TRANSIENT = "transient"  # 5xx, таймауты, обрывы соединения — повторяем
+QUOTA = "quota"  # 429 / RESOURCE_EXHAUSTED — повторяем и снижаем параллелизм
+PERMANENT = "permanent"  # остальные 4xx и ошибки самого запроса — повтор не поможет
+
+_TRANSIENT_STATUS = {408, 500, 502, 503, 504}
+
+# Сетевые ошибки httpx/aiohttp/requests, которые не наследуют встроенные TimeoutError/ConnectionError
+_TRANSIENT_EXCEPTION_NAMES = {
+    "ConnectError", "ConnectTimeout", "ReadError", "ReadTimeout", "WriteTimeout", "PoolTimeout",
+    "RemoteProtocolError", "ServerDisconnectedError", "ClientConnectionError", "ChunkedEncodingError",
+}
+
+# RetryInfo в теле ответа 429: "retryDelay": "30s"
+_RETRY_DELAY_RE = re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+MAX_RECORDED_FAILURES = 100
+
+
+class GeminiCallError(Exception):
+    """Вызов Gemini окончательно не удался: постоянная ошибка или исчерпаны попытки."""
+
+    def __init__(self, model: str, kind: str, attempts: int, cause: BaseException):
+        super().__init__(f"{model}: {kind} ошибка после {attempts} попыток: {cause}")
+        self.model = model
+        self.kind = kind
+        self.attempts = attempts
+        self.cause = cause
+
+
+class GeminiStreamInterrupted(GeminiCallError):
+    """Потоковая генерация оборвалась после того, как часть ответа уже была отдана."""
+
+    def __init__(self, model: str, kind: str, attempts: int, cause: BaseException, partial_text: str):
+        super().__init__(model, kind, attempts, cause)
+        self.partial_text = partial_text
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    value = getattr(getattr(error, "response", None), "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def classify_error(error: BaseException) -> str:
+    status = _status_code(error)
+    if status == 429:
+        return QUOTA
+    if status in _TRANSIENT_STATUS:
+        return TRANSIENT
+    if status is not None:
+        return PERMANENT
+
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return TRANSIENT
+    if type(error).__name__ in _TRANSIENT_EXCEPTION_NAMES:
+        return TRANSIENT
+    if "RESOURCE_EXHAUSTED" in str(error):
+        return QUOTA
+    return PERMANENT
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Пауза, которую просит сервер: заголовок Retry-After (секунды или HTTP-дата) или retryDelay в теле."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    match = _RETRY_DELAY_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Повторы вызова Gemini: экспоненциальная пауза от initial_delay до max_delay со случайным
+    разбросом; если сервер указал Retry-After, ждём не меньше него. Постоянные ошибки не повторяются.
+    """
+    max_attempts: int = GEMINI_RETRY_MAX_ATTEMPTS
+    initial_delay: float = 2.0
+    multiplier: float = 2.0
+    max_delay: float = 60.0
+    jitter: float = 0.2
+
+    def should_retry(self, kind: str, attempt: int) -> bool:
+        return kind != PERMANENT and attempt < self.max_attempts
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        backoff = min(self.max_delay, self.initial_delay * self.multiplier ** (attempt - 1))
+        backoff *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Разброс только вверх, чтобы не прийти раньше, чем просил сервер
+            return max(backoff, retry_after * random.uniform(1, 1 + self.jitter))
+        return max(0.0, backoff)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class GeminiCallStats:
+    """Счётчики вызовов Gemini по моделям за запуск и список окончательных отказов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, int]] = {}
+        self.failures: List[Dict[str, Any]] = []
+
+    def _counters(self, model: str) -> Dict[str, int]:
+        return self._models.setdefault(model, {"succeeded": 0, "retries": 0, "quota_errors": 0, "failed": 0})
+
+    def record_success(self, model: str) -> None:
+        with self._lock:
+            self._counters(model)["succeeded"] += 1
+
+    def record_retry(self, model: str, kind: str) -> None:
+        with self._lock:
+            counters = self._counters(model)
+            counters["retries"] += 1
+            if kind == QUOTA:
+                counters["quota_errors"] += 1
+
+    def record_failure(self, error: GeminiCallError) -> None:
+        with self._lock:
+            counters = self._counters(error.model)
+            counters["failed"] += 1
+            if error.kind == QUOTA:
+                counters["quota_errors"] += 1
+            if len(self.failures) < MAX_RECORDED_FAILURES:
+                self.failures.append({
+                    "model": error.model,
+                    "kind": error.kind,
+                    "attempts": error.attempts,
+                    "error": str(error.cause)[:500],
+                })
+        logger.error(f"Запрос к {error.model} не выполнен ({error.kind}, попыток: {error.attempts}): {error.cause}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": {model: dict(counters) for model, counters in self._models.items()},
+                "failures": list(self.failures),
+            }
+
+
+_call_stats = GeminiCallStats()
+
+
+def get_gemini_call_stats() -> GeminiCallStats:
+    return _call_stats
+
+
+def reset_gemini_call_stats() -> GeminiCallStats:
+    global _call_stats
+    _call_stats = GeminiCallStats()
+    return _call_stats
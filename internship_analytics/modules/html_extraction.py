@@ -0,0 +1,267 @@
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config.logger_config import get_logger
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml опционален: без него используется движок на BeautifulSoup
+    lxml = None
+    etree = None
+
+logger = get_logger("html_extraction")
+
+
+@dataclass(frozen=True)
+class Selector:
+    tag: str
+    class_name: Optional[str] = None
+    attrs: Tuple[Tuple[str, str], ...] = ()
+
+    def to_xpath(self) -> str:
+        predicates = []
+        if self.class_name:
+            predicates.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {self.class_name} ')")
+        for name, value in self.attrs:
+            predicates.append(f"@{name}='{value}'")
+        return f"//{self.tag}" + "".join(f"[{p}]" for p in predicates)
+
+    def to_bs4_kwargs(self) -> Dict[str, str]:
+        kwargs = dict(self.attrs)
+        if self.class_name:
+            kwargs["class_"] = self.class_name
+        return kwargs
+
+
+# Домен (подстрока) -> селекторы тела статьи в порядке приоритета.
+# Порядок доменов важен: используется первый совпавший.
+DOMAIN_SELECTORS: List[Tuple[str, List[Selector]]] = [
+    ("rbc.ru", [Selector("div", "article__text"), Selector("div", "article__body")]),
+    ("kommersant.ru", [Selector("div", "article_text"), Selector("div", "js-article-text")]),
+    ("vedomosti.ru", [Selector("div", "article-body")]),
+    ("tass.ru", [Selector("div", "text-block")]),
+    ("ria.ru", [Selector("div", "article__body")]),
+    ("interfax.ru", [Selector("article", attrs=(("itemprop", "articleBody"),))]),
+    ("forbes.ru", [Selector("div", "article-body")]),
+]
+
+FALLBACK_TAGS = ["article", "main", "body"]
+
+AD_CLASSES = ["adv", "subscription-block", "banner"]
+
+# Теги, перед которыми libxml2 неявно закрывает открытый <p>, а html.parser — нет.
+# Такие страницы дают разные деревья, поэтому lxml-движок отдаёт их эталонному bs4.
+P_CLOSING_TAGS = {
+    "address", "article", "aside", "blockquote", "center", "dd", "dir", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup", "hr",
+    "li", "listing", "main", "menu", "nav", "ol", "p", "pre", "section", "table", "ul", "xmp",
+}
+
+# Текст этих элементов html.parser (BeautifulSoup.get_text) не возвращает
+NON_TEXT_TAGS = ("script", "style")
+
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)")
+# Комментарии и содержимое script/style — не разметка: теги в них не должны влиять на проверки
+_NON_MARKUP_RE = re.compile(r"<!--.*?-->|<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_BODY_TAG_RE = re.compile(r"<body[\s>/]", re.IGNORECASE)
+
+
+def selectors_for_domain(domain: str) -> List[Selector]:
+    for domain_part, selectors in DOMAIN_SELECTORS:
+        if domain_part in domain:
+            return selectors
+    return []
+
+
+def strip_non_markup(html: str) -> str:
+    """HTML без комментариев и содержимого script/style."""
+    return _NON_MARKUP_RE.sub("", html)
+
+
+def has_implicit_paragraph_close(html: str) -> bool:
+    """
+    Есть ли блочный тег внутри незакрытого <p> (libxml2 и html.parser построят разные деревья).
+    Ожидает разметку после strip_non_markup.
+    """
+    in_paragraph = False
+    for match in _TAG_RE.finditer(html):
+        closing, tag = match.group(1), match.group(2).lower()
+        if tag == "p":
+            if closing:
+                in_paragraph = False
+            elif in_paragraph:
+                return True
+            else:
+                in_paragraph = True
+        elif in_paragraph and not closing and tag in P_CLOSING_TAGS:
+            return True
+    return False
+
+
+def _join_paragraphs(paragraph_texts) -> Optional[str]:
+    full_text = "\n".join(text for text in paragraph_texts if text)
+    return full_text if full_text else None
+
+
+class Bs4ExtractionEngine:
+    """
+    Исходная реализация на BeautifulSoup с html.parser — эталон для сравнения и запасной вариант.
+    """
+    name = "bs4"
+
+    def extract(self, html: str, domain: str) -> Optional[str]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+
+        article_body = None
+        for selector in selectors_for_domain(domain):
+            article_body = soup.find(selector.tag, **selector.to_bs4_kwargs())
+            if article_body:
+                break
+
+        if not article_body:
+            article_body = soup.find('article') or soup.find('main') or soup.body
+
+        if not article_body:
+            return None
+
+        for ad_element in article_body.select(", ".join(f".{c}" for c in AD_CLASSES)):
+            ad_element.decompose()
+
+        return _join_paragraphs(
+            p.get_text(separator=' ', strip=True) for p in article_body.find_all('p', recursive=True)
+        )
+
+
+class LxmlExtractionEngine:
+    """
+    Движок на C-парсере lxml. XPath-выражения для всех доменов компилируются один раз при создании.
+    Результат совпадает с Bs4ExtractionEngine: страницы, где libxml2 иначе вкладывает <p>,
+    извлекаются эталонным движком, а <body>, который libxml2 достраивает сам, используется,
+    только если он есть в исходной странице (html.parser его не создаёт).
+    """
+    name = "lxml"
+
+    def __init__(self):
+        self._reference = Bs4ExtractionEngine()
+        self._domain_xpaths: List[Tuple[str, List[Callable]]] = [
+            (domain_part, [etree.XPath(selector.to_xpath()) for selector in selectors])
+            for domain_part, selectors in DOMAIN_SELECTORS
+        ]
+        self._fallback_xpaths = [(tag, etree.XPath(f"//{tag}")) for tag in FALLBACK_TAGS]
+        self._ads_xpath = etree.XPath(" | ".join(
+            f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {c} ')]" for c in AD_CLASSES
+        ))
+        self._paragraphs_xpath = etree.XPath(".//p")
+
+    def _xpaths_for_domain(self, domain: str) -> List[Callable]:
+        for domain_part, xpaths in self._domain_xpaths:
+            if domain_part in domain:
+                return xpaths
+        return []
+
+    @staticmethod
+    def _first(xpath: Callable, root):
+        found = xpath(root)
+        return found[0] if found else None
+
+    def extract(self, html: str, domain: str) -> Optional[str]:
+        if not html or not html.strip():
+            return None
+        markup = strip_non_markup(html)
+        if has_implicit_paragraph_close(markup):
+            return self._reference.extract(html, domain)
+        try:
+            root = lxml.html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            # ValueError: строка с XML-декларацией кодировки
+            root = lxml.html.document_fromstring(html.encode("utf-8"))
+
+        has_body = _BODY_TAG_RE.search(markup) is not None
+        xpaths = self._xpaths_for_domain(domain) + [
+            xpath for tag, xpath in self._fallback_xpaths if tag != "body" or has_body
+        ]
+        article_body = None
+        for xpath in xpaths:
+            article_body = self._first(xpath, root)
+            if article_body is not None:
+                break
+
+        if article_body is None:
+            return None
+
+        for ad_element in self._ads_xpath(article_body):
+            if ad_element.getparent() is not None:
+                ad_element.drop_tree()
+        for element in list(article_body.iter(*NON_TEXT_TAGS)):
+            if element.getparent() is not None:
+                element.drop_tree()
+
+        return _join_paragraphs(
+            " ".join(t.strip() for t in p.itertext() if t.strip()) for p in self._paragraphs_xpath(article_body)
+        )
+
+
+_engine = None
+
+
+def get_extraction_engine():
+    global _engine
+    if _engine is None:
+        _engine = LxmlExtractionEngine() if lxml is not None else Bs4ExtractionEngine()
+        logger.info(f"Движок извлечения HTML: {_engine.name}")
+    return _engine
+
+
+def extract_article_text(html: str, domain: str) -> Optional[str]:
+    return get_extraction_engine().extract(html, domain)
+
+
+def benchmark_extraction(fixtures_dir: str, repeats: int = 5) -> Dict[str, float]:
+    """
+    Сравнивает движки на сохранённых HTML-страницах и проверяет совпадение результата.
+    Имя файла фикстуры — '<домен>__<что угодно>.html', например 'rbc.ru__article_1.html'.
+
+    :return: среднее время извлечения одной страницы по каждому движку, сек.
+    """
+    fixtures = []
+    for file_name in sorted(os.listdir(fixtures_dir)):
+        if not file_name.endswith(".html"):
+            continue
+        with open(os.path.join(fixtures_dir, file_name), "r", encoding="utf-8") as f:
+            fixtures.append((file_name, file_name.split("__", 1)[0], f.read()))
+
+    if not fixtures:
+        logger.warning(f"В {fixtures_dir} нет HTML-фикстур.")
+        return {}
+
+    engines = [Bs4ExtractionEngine()]
+    if lxml is not None:
+        engines.append(LxmlExtractionEngine())
+
+    timings: Dict[str, float] = {}
+    outputs: Dict[str, List[Optional[str]]] = {}
+    for engine in engines:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            outputs[engine.name] = [engine.extract(html, domain) for _, domain, html in fixtures]
+        timings[engine.name] = (time.perf_counter() - started) / (repeats * len(fixtures))
+        logger.info(f"{engine.name}: {timings[engine.name] * 1000:.2f} мс на страницу")
+
+    reference = outputs[engines[0].name]
+    for engine in engines[1:]:
+        for (file_name, _, _), expected, actual in zip(fixtures, reference, outputs[engine.name]):
+            if expected != actual:
+                logger.warning(f"{engine.name}: текст отличается от эталона для {file_name}")
+
+    return timings
+
+
+if __name__ == "__main__":
+    benchmark_extraction(sys.argv[1])
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from internship_analytics.conf import LLM_CACHE_MAX_BYTES, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS
+from .config.logger_config import get_logger
+
+logger = get_logger("llm_cache")
+
+# Вытеснение запускается после стольких записей или после записи 1/20 лимита размера
+EVICT_EVERY_PUTS = 200
+
+
+def make_llm_key(model: str, prompt: str, config: Optional[Dict[str, Any]]) -> str:
+    payload = json.dumps([model, prompt, config or {}], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LlmCache:
+    """
+    Дисковый кэш ответов Gemini по хэшу (модель, промпт, параметры генерации).
+    Записи старше ttl не выдаются и удаляются, при превышении лимита размера
+    вытесняются давно не использованные (при открытии и периодически при записи).
+    Счётчики попаданий/промахов — для отчёта о запуске, reset_stats() обнуляет их.
+    """
+
+    def __init__(self,
+                 path: str = LLM_CACHE_PATH,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self._bytes_since_evict = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        if not response or not response.strip():
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, now, now, size)
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            self._bytes_since_evict += size
+            evict_now = (self._puts_since_evict >= EVICT_EVERY_PUTS
+                         or self._bytes_since_evict * 20 >= self.max_bytes)
+        if evict_now:
+            self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            self._puts_since_evict = 0
+            self._bytes_since_evict = 0
+            removed = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self._conn.execute(
+                        "SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total -= size
+                    removed += 1
+            self._conn.commit()
+
+        if removed:
+            logger.info(f"Из кэша ответов LLM удалено {removed} записей.")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self) -> None:
+        """Начинает отсчёт попаданий/промахов для нового запуска."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+_llm_cache: Optional[LlmCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LlmCache:
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LlmCache()
+        return _llm_cache
@@ -1,9 +1,15 @@
 from typing import Optional, Sequence
 
-from internship_analytics.conf import DOMAIN_WEIGHTS, MARKET_NEWS_OUTPUT_DIR, PAGES_TO_SEARCH_MARKET
+from internship_analytics.conf import (
+    DOMAIN_WEIGHTS,
+    MARKET_NEWS_OUTPUT_DIR,
+    PAGES_TO_SEARCH_MARKET,
+)
 from .config.logger_config import get_logger
 from .gemini_3_factor_process_data import run_gemini_processing_pipeline
-from .news import run_full_search_and_parse
+from .model_router import routed_call
+from .ndjson_stream import remove_stream, wait_for_first_record
+from .news import start_full_search_and_parse
 from .request_to_gemini_api import call_to_gemini_api
 
 logger = get_logger("market_digest")
@@ -32,29 +38,35 @@ def _sanitize_query_line(q: str) -> str:
     return q
 
 
+def _is_market_query(raw: str) -> bool:
+    return 5 <= len(_sanitize_query_line(raw).split()) <= 14
+
+
+def _market_query_from_response(raw: str) -> str:
+    query = _sanitize_query_line(raw)
+
+    word_count = len(query.split())
+    if not query or word_count < 5 or word_count > 14:
+        query = " ".join(query.split()[:12]).strip()
+    return query
+
+
 def generate_market_query_one(
         company_summary_text: str,
         *,
-        model: str = "models/gemini-1.5-flash-latest",
+        model: Optional[str] = None,
         max_output_tokens: int = 60,
 ) -> str:
     if not company_summary_text or not company_summary_text.strip():
         return ""
 
     prompt = PROMPT_MARKET_DIGEST_NEWS.format(company_summary=company_summary_text)
-    raw = call_to_gemini_api(
-        prompt,
-        model=model,
-        max_output_tokens=max_output_tokens,
-        temperature=0.4,
-        top_p=0.9,
-    )
-    query = _sanitize_query_line(raw)
-
-    word_count = len(query.split())
-    if not query or word_count < 5 or word_count > 14:
-        query = " ".join(query.split()[:12]).strip()
-    return query
+    generation = dict(max_output_tokens=max_output_tokens, temperature=0.4, top_p=0.9)
+    if model is None:
+        raw = routed_call(prompt, "market_query", validate=_is_market_query, **generation)
+    else:
+        raw = call_to_gemini_api(prompt, model=model, **generation)
+    return _market_query_from_response(raw)
 
 
 def get_market_digest(
@@ -85,14 +97,16 @@ def get_market_digest(
         except NameError:
             num_pages = 3
 
-    raw_json_path = run_full_search_and_parse(
+    raw_json_path, search_future = start_full_search_and_parse(
         user_search_query=query,
         domains_to_search=list(domains),
         num_pages=num_pages,
         path_to_output=MARKET_NEWS_OUTPUT_DIR,
     )
 
-    if not raw_json_path:
+    if not wait_for_first_record(raw_json_path):
+        search_future.result()
+        remove_stream(raw_json_path)
         logger.warning("Не удалось собрать новости для рыночного дайджеста.")
         return ""
 
@@ -102,6 +116,10 @@ def get_market_digest(
         processed_data_dir=MARKET_NEWS_OUTPUT_DIR,
     )
 
+    if not search_future.result():
+        logger.warning("Не удалось собрать новости для рыночного дайджеста.")
+        return ""
+
     if final_summary_path:
         logger.info(f"Финальное саммари по рынку сохранено: {final_summary_path}")
         return final_summary_path
@@ -1,7 +1,13 @@
 import os
-from typing import Optional
-
-from internship_analytics.modules.request_to_gemini_api import call_to_gemini_api
+from typing import Iterable, Optional
+
+from internship_analytics.conf import GEMINI_STREAMING_OUTPUT
+from internship_analytics.modules.model_router import routed_call, routed_call_stream
+from internship_analytics.modules.request_to_gemini_api import (
+    call_to_gemini_api,
+    stream_call_to_gemini_api,
+)
+from internship_analytics.modules.streaming_output import ProgressListener, stream_to_file
 from .config.logger_config import get_logger
 
 logger = get_logger("merge_summary")
@@ -63,6 +69,51 @@ PROMPT_FUSE = """
 """
 
 
+def _read(path: str) -> str:
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _fuse_prompt(
+        first_summary_path: str,
+        second_summary_path: str,
+        inn: Optional[str],
+        company_full_name: Optional[str],
+        seo_full_name: Optional[str],
+        city: Optional[str],
+) -> Optional[str]:
+    company_summary = _read(first_summary_path)
+    seo_summary = _read(second_summary_path)
+
+    if not company_summary and not seo_summary:
+        logger.error("Оба саммари пустые — нечего объединять.")
+        return None
+
+    return PROMPT_FUSE.format(
+        inn=inn or "",
+        company_full_name=company_full_name or "",
+        seo_full_name=seo_full_name or "",
+        city=city or "",
+        company_summary=company_summary or "—",
+        seo_summary=seo_summary or "—",
+    )
+
+
+def _save_fused(fused_text: str, output_path: str) -> Optional[str]:
+    if not fused_text.strip():
+        logger.error("Модель вернула пустой результат.")
+        return None
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(fused_text)
+
+    logger.info(f"Финальное саммари сохранено: {output_path}")
+    return output_path
+
+
 def fuse_summaries(
         first_summary_path: str,
         second_summary_path: str,
@@ -71,46 +122,41 @@ def fuse_summaries(
         company_full_name: Optional[str] = None,
         seo_full_name: Optional[str] = None,
         city: Optional[str] = None,
-        model: str = "models/gemini-2.5-pro",
-        max_output_tokens: int = 3000,
+        model: Optional[str] = None,
+        max_output_tokens: Optional[int] = None,
+        stream_output: bool = GEMINI_STREAMING_OUTPUT,
+        progress_listeners: Iterable[ProgressListener] = (),
 ) -> Optional[str]:
     """
     Синтезирует единый отчет на основе двух файлов-саммари.
+    Без model модель и лимит ответа выбирает маршрутизатор по политике этапа "fuse".
+
+    При stream_output отчёт пишется в файл по мере генерации, progress_listeners получают накопленный
+    текст; если поток оборвался, частичный отчёт остаётся в '<output_path>.partial'.
     """
     try:
-        def _read(path: str) -> str:
-            if not path or not os.path.exists(path):
-                return ""
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-
-        company_summary = _read(first_summary_path)
-        seo_summary = _read(second_summary_path)
-
-        if not company_summary and not seo_summary:
-            logger.error("Оба саммари пустые — нечего объединять.")
+        prompt = _fuse_prompt(first_summary_path, second_summary_path, inn, company_full_name, seo_full_name, city)
+        if prompt is None:
             return None
 
-        prompt = PROMPT_FUSE.format(
-            inn=inn or "",
-            company_full_name=company_full_name or "",
-            seo_full_name=seo_full_name or "",
-            city=city or "",
-            company_summary=company_summary or "—",
-            seo_summary=seo_summary or "—",
-        )
-
-        fused_text = call_to_gemini_api(prompt, model=model, max_output_tokens=max_output_tokens)
-        if not fused_text.strip():
-            logger.error("Модель вернула пустой результат.")
-            return None
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(fused_text)
-
-        logger.info(f"Финальное саммари сохранено: {output_path}")
-        return output_path
+        if stream_output:
+            def _generate(on_text, on_restart) -> str:
+                if model is None:
+                    return routed_call_stream(prompt, "fuse", on_text, on_restart=on_restart,
+                                              max_output_tokens=max_output_tokens)
+                return stream_call_to_gemini_api(prompt, model, on_text, max_output_tokens=max_output_tokens)
+
+            if stream_to_file(output_path, _generate, progress_listeners) is None:
+                logger.error("Модель не вернула полный результат.")
+                return None
+            logger.info(f"Финальное саммари сохранено: {output_path}")
+            return output_path
+
+        if model is None:
+            fused_text = routed_call(prompt, "fuse", max_output_tokens=max_output_tokens)
+        else:
+            fused_text = call_to_gemini_api(prompt, model=model, max_output_tokens=max_output_tokens)
+        return _save_fused(fused_text, output_path)
 
     except Exception as e:
         logger.error(f"Ошибка при объединении саммари: {e}")
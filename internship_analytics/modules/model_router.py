@@ -0,0 +1,235 @@
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from internship_analytics.conf import (
+    GEMINI_DEFAULT_PRICE,
+    GEMINI_MODEL_CASCADE,
+    GEMINI_MODEL_PRICES,
+    GEMINI_RUN_BUDGET_SECONDS,
+    GEMINI_RUN_BUDGET_USD,
+    GEMINI_STAGE_POLICIES,
+)
+from .config.logger_config import get_logger
+from .gemini_retry import GeminiStreamInterrupted
+from .request_to_gemini_api import async_call_to_gemini_api, call_to_gemini_api, stream_call_to_gemini_api
+from .token_budget import estimate_tokens
+
+logger = get_logger("model_router")
+
+
+@dataclass
+class StagePolicy:
+    first_tier: int = 0
+    last_tier: int = 0
+    large_input_tokens: Optional[int] = None
+    min_output_chars: int = 1
+    max_output_tokens: Optional[int] = None
+
+
+class ModelRouter:
+    """
+    Выбирает модель Gemini для вызова по этапу, размеру промпта и бюджету запуска.
+    Сначала пробуется самая дешёвая подходящая модель каскада; к более сильной переходим,
+    только если ответ пустой, короче min_output_chars этапа или не прошёл validate.
+
+    Отдельного сигнала уверенности нет: промпты этапов не просят у модели оценку уверенности,
+    а самооценка LLM плохо откалибрована. Её роль играет validate — разбор ответа этапа
+    (да/нет релевантности, JSON-вердикты пакета, длина запроса по рынку).
+
+    Для каждой модели копятся число вызовов, неудачных проверок, время и оценка токенов — по ним
+    подбираются политики. Вызовы из кэша ответов тоже попадают в статистику.
+    Бюджет времени — время по часам с создания маршрутизатора (reset_model_router в начале запуска).
+    """
+
+    def __init__(self,
+                 cascade: List[str] = GEMINI_MODEL_CASCADE,
+                 policies: Dict[str, Dict[str, Any]] = GEMINI_STAGE_POLICIES,
+                 budget_usd: float = GEMINI_RUN_BUDGET_USD,
+                 budget_seconds: float = GEMINI_RUN_BUDGET_SECONDS):
+        self.cascade = list(cascade)
+        self.policies = {stage: StagePolicy(**policy) for stage, policy in policies.items()}
+        self.budget_usd = budget_usd
+        self.budget_seconds = budget_seconds
+        self.spent_usd = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._usage: Dict[str, Dict[str, float]] = {}
+
+    def policy(self, stage: str) -> StagePolicy:
+        return self.policies.get(stage, StagePolicy())
+
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self._started
+
+    def over_budget(self) -> bool:
+        with self._lock:
+            spent_usd = self.spent_usd
+        return spent_usd >= self.budget_usd or self.elapsed_seconds() >= self.budget_seconds
+
+    def plan(self, stage: str, prompt_tokens: int) -> List[str]:
+        """Модели, которые будут пробоваться по порядку."""
+        policy = self.policy(stage)
+        last_tier = min(policy.last_tier, len(self.cascade) - 1)
+        first_tier = min(policy.first_tier, last_tier)
+
+        if self.over_budget():
+            return [self.cascade[first_tier]]
+
+        if policy.large_input_tokens is not None and prompt_tokens > policy.large_input_tokens:
+            first_tier += 1
+        first_tier = min(first_tier, last_tier)
+        return self.cascade[first_tier:last_tier + 1]
+
+    def _record(self, model: str, seconds: float, input_tokens: int, output_tokens: int, valid: bool) -> None:
+        price = GEMINI_MODEL_PRICES.get(model, GEMINI_DEFAULT_PRICE)
+        cost = (input_tokens * price["input"] + output_tokens * price["output"]) / 1_000_000
+        with self._lock:
+            usage = self._usage.setdefault(model, {
+                "calls": 0, "failed_validation": 0, "seconds": 0.0,
+                "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+            })
+            usage["calls"] += 1
+            usage["failed_validation"] += int(not valid)
+            usage["seconds"] += seconds
+            usage["input_tokens"] += input_tokens
+            usage["output_tokens"] += output_tokens
+            usage["cost_usd"] += cost
+            self.spent_usd += cost
+
+    def _is_valid(self, text: str, policy: StagePolicy, validate: Optional[Callable[[str], bool]]) -> bool:
+        if not text or len(text.strip()) < policy.min_output_chars:
+            return False
+        return validate is None or validate(text)
+
+    def _generation(self, policy: StagePolicy, generation: Dict[str, Any]) -> Dict[str, Any]:
+        if policy.max_output_tokens is not None and generation.get("max_output_tokens") is None:
+            generation = {**generation, "max_output_tokens": policy.max_output_tokens}
+        return generation
+
+    def _after_attempt(self, stage: str, model: str, models: List[str], started: float, input_tokens: int,
+                       text: str, valid: bool) -> bool:
+        """Записывает попытку; True — пора остановиться (ответ годен или эскалировать некуда)."""
+        self._record(model, time.perf_counter() - started, input_tokens, estimate_tokens(text), valid)
+        if valid:
+            return True
+        if model == models[-1]:
+            logger.warning(f"Этап {stage}: ответ {model} не прошёл проверку, сильнее моделей нет.")
+            return True
+        if self.over_budget():
+            logger.warning(f"Этап {stage}: бюджет запуска исчерпан, эскалация после {model} отменена.")
+            return True
+        logger.info(f"Этап {stage}: ответ {model} не прошёл проверку, пробую модель сильнее.")
+        return False
+
+    def call(self, prompt: str, stage: str,
+             validate: Optional[Callable[[str], bool]] = None, **generation) -> str:
+        """
+        Вызывает call_to_gemini_api с моделью по политике этапа и эскалацией по каскаду.
+        Если годного ответа нет, возвращается ответ последней опробованной модели.
+
+        :param validate: дополнительная проверка ответа (например, разбор JSON)
+        :param generation: параметры генерации call_to_gemini_api
+        """
+        policy = self.policy(stage)
+        generation = self._generation(policy, generation)
+        input_tokens = estimate_tokens(prompt + (generation.get("system_instruction") or ""))
+        models = self.plan(stage, input_tokens)
+        # Непрошедший проверку ответ не кэшируется, иначе он повторялся бы весь срок жизни кэша
+        is_valid = partial(self._is_valid, policy=policy, validate=validate)
+
+        text = ""
+        for model in models:
+            started = time.perf_counter()
+            text = call_to_gemini_api(prompt, model, cache_if=is_valid, **generation)
+            if self._after_attempt(stage, model, models, started, input_tokens, text,
+                                   is_valid(text)):
+                break
+        return text
+
+    async def call_async(self, prompt: str, stage: str,
+                         validate: Optional[Callable[[str], bool]] = None, **generation) -> str:
+        policy = self.policy(stage)
+        generation = self._generation(policy, generation)
+        input_tokens = estimate_tokens(prompt + (generation.get("system_instruction") or ""))
+        models = self.plan(stage, input_tokens)
+        is_valid = partial(self._is_valid, policy=policy, validate=validate)
+
+        text = ""
+        for model in models:
+            started = time.perf_counter()
+            text = await async_call_to_gemini_api(prompt, model, cache_if=is_valid, **generation)
+            if self._after_attempt(stage, model, models, started, input_tokens, text,
+                                   is_valid(text)):
+                break
+        return text
+
+    def call_stream(self, prompt: str, stage: str, on_text: Callable[[str], None],
+                    on_restart: Optional[Callable[[], None]] = None,
+                    validate: Optional[Callable[[str], bool]] = None, **generation) -> str:
+        """
+        Потоковый вариант call: фрагменты ответа идут в on_text. Перед эскалацией на следующую модель
+        вызывается on_restart, чтобы получатель отбросил уже показанный текст. Обрыв потока на середине
+        не эскалируется — GeminiStreamInterrupted доходит до вызывающего кода.
+        """
+        policy = self.policy(stage)
+        generation = self._generation(policy, generation)
+        input_tokens = estimate_tokens(prompt + (generation.get("system_instruction") or ""))
+        models = self.plan(stage, input_tokens)
+        is_valid = partial(self._is_valid, policy=policy, validate=validate)
+
+        text = ""
+        for position, model in enumerate(models):
+            if position and on_restart is not None:
+                on_restart()
+            started = time.perf_counter()
+            try:
+                text = stream_call_to_gemini_api(prompt, model, on_text, cache_if=is_valid, **generation)
+            except GeminiStreamInterrupted as e:
+                self._record(model, time.perf_counter() - started, input_tokens,
+                             estimate_tokens(e.partial_text), False)
+                raise
+            if self._after_attempt(stage, model, models, started, input_tokens, text,
+                                   is_valid(text)):
+                break
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "spent_usd": round(self.spent_usd, 4),
+                "elapsed_seconds": round(self.elapsed_seconds(), 1),
+                "models": {
+                    model: {key: round(value, 4) if isinstance(value, float) else value
+                            for key, value in usage.items()}
+                    for model, usage in self._usage.items()
+                },
+            }
+
+
+_model_router = ModelRouter()
+
+
+def get_model_router() -> ModelRouter:
+    return _model_router
+
+
+def reset_model_router() -> ModelRouter:
+    """Начинает новый запуск: бюджет и статистика обнуляются."""
+    global _model_router
+    _model_router = ModelRouter()
+    return _model_router
+
+
+def routed_call(prompt: str, stage: str, **kwargs) -> str:
+    return get_model_router().call(prompt, stage, **kwargs)
+
+
+def routed_call_stream(prompt: str, stage: str, on_text: Callable[[str], None], **kwargs) -> str:
+    return get_model_router().call_stream(prompt, stage, on_text, **kwargs)
+
+
+async def routed_call_async(prompt: str, stage: str, **kwargs) -> str:
+    return await get_model_router().call_async(prompt, stage, **kwargs)
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+from typing import Any, Dict, Iterator
+
+from .config.logger_config import get_logger
+
+logger = get_logger("ndjson_stream")
+
+DONE_MARKER_SUFFIX = ".done"
+
+
+def done_marker_path(file_path: str) -> str:
+    return file_path + DONE_MARKER_SUFFIX
+
+
+def append_record(f, record: Dict[str, Any], default=None) -> None:
+    """
+    Дописывает одну запись NDJSON и сразу сбрасывает буфер, чтобы читатель увидел её без задержки.
+    """
+    f.write(json.dumps(record, ensure_ascii=False, default=default) + "\n")
+    f.flush()
+
+
+def mark_complete(file_path: str) -> None:
+    """Сообщает читателям, что запись в файл завершена."""
+    with open(done_marker_path(file_path), "w", encoding="utf-8"):
+        pass
+
+
+def is_complete(file_path: str) -> bool:
+    return os.path.exists(done_marker_path(file_path))
+
+
+def wait_for_first_record(file_path: str, poll_interval: float = 0.5) -> bool:
+    """
+    Ждёт, пока в файле появятся данные или запись завершится.
+    False — запись завершена, а файл так и остался пустым (например, поиск ничего не нашёл).
+    """
+    while True:
+        complete = is_complete(file_path)
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            return True
+        if complete:
+            return False
+        time.sleep(poll_interval)
+
+
+def remove_stream(file_path: str) -> None:
+    """Удаляет NDJSON-файл вместе с маркером окончания записи."""
+    for path in (file_path, done_marker_path(file_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def follow_records(file_path: str, poll_interval: float = 0.5) -> Iterator[Dict[str, Any]]:
+    """
+    Читает NDJSON-файл по мере его записи (как tail -f) и завершается, когда появляется маркер
+    окончания записи. Неполная последняя строка ждёт своего перевода строки.
+    """
+    while not os.path.exists(file_path):
+        if is_complete(file_path):
+            return
+        time.sleep(poll_interval)
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = ""
+        while True:
+            # Маркер проверяется до чтения: всё, что записано до него, будет прочитано в этом проходе
+            complete = is_complete(file_path)
+            chunk = f.readline()
+            while chunk:
+                buffer += chunk
+                if buffer.endswith("\n"):
+                    line = buffer.strip()
+                    buffer = ""
+                    if line:
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError as e:
+                            logger.error(f"Повреждённая строка в {file_path}: {e}")
+                chunk = f.readline()
+
+            if complete:
+                if buffer.strip():
+                    logger.warning(f"Незавершённая последняя запись в {file_path} пропущена.")
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,123 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from internship_analytics.conf import NEAR_DUPLICATE_THRESHOLD
+from .config.logger_config import get_logger
+
+logger = get_logger("near_duplicates")
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_rng = random.Random(42)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower().replace("ё", "е"))
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+        for shingle in _shingles(text)
+    ]
+    if not hashes:
+        return tuple([_MAX_HASH] * NUM_PERMUTATIONS)
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimated_jaccard(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERMUTATIONS
+
+
+def _weight(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class NearDuplicateIndex:
+    """
+    Инкрементальный LSH-индекс MinHash-сигнатур: add() возвращает индексы ранее добавленных
+    текстов, похожих на новый не меньше порога.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.signatures: List[Tuple[int, ...]] = []
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+
+    def add(self, text: str) -> List[int]:
+        signature = minhash_signature(text)
+        index = len(self.signatures)
+        self.signatures.append(signature)
+
+        candidates = set()
+        for band in range(LSH_BANDS):
+            key = (band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            candidates.update(self._buckets[key])
+            self._buckets[key].append(index)
+
+        return sorted(
+            candidate for candidate in candidates
+            if estimated_jaccard(signature, self.signatures[candidate]) >= self.threshold
+        )
+
+
+def find_near_duplicate_clusters(texts: Iterable[Tuple[str, float]],
+                                 threshold: float = NEAR_DUPLICATE_THRESHOLD) -> Dict[int, List[int]]:
+    """
+    Кластеризует почти одинаковые тексты (MinHash по словесным 5-граммам + LSH по полосам).
+
+    :param texts: пары (текст, вес домена) в порядке потока
+    :return: {индекс представителя: [индексы всех членов кластера]}; представитель — член кластера
+             с наибольшим весом домена, при равенстве — встретившийся раньше
+    """
+    index = NearDuplicateIndex(threshold)
+    weights: List[float] = []
+    parent: List[int] = []
+
+    def _find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for position, (text, weight) in enumerate(texts):
+        weights.append(_weight(weight))
+        parent.append(position)
+        for match in index.add(text):
+            root_a, root_b = _find(position), _find(match)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    members: Dict[int, List[int]] = defaultdict(list)
+    for position in range(len(parent)):
+        members[_find(position)].append(position)
+
+    clusters = {}
+    for indices in members.values():
+        representative = max(indices, key=lambda i: (weights[i], -i))
+        clusters[representative] = indices
+    return clusters
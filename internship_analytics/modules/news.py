@@ -1,17 +1,27 @@
 import base64
 import json
 import os
+import random
+import re
+import threading
 import time
-import xml.etree.ElementTree as ET
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Iterator, Optional, Tuple
 
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
-from internship_analytics.conf import DOMAIN_WEIGHTS
+from internship_analytics.conf import ARTICLE_ALLOWED_CONTENT_TYPES, ARTICLE_MAX_BYTES
+from .article_cache import ArticleCache, CachedArticle, get_article_cache
 from .config.logger_config import get_logger
+from .html_extraction import extract_article_text
+from .ndjson_stream import append_record, mark_complete
+from .run_registry import get_run_registry
+from .search_cache import STALE, get_search_cache, make_search_key
+from .yandex_xml import parse_search_page
 
 load_dotenv()
 
@@ -20,21 +30,66 @@ logger = get_logger("news")
 IAM_TOKEN = os.environ["YC_IAM_TOKEN"]
 FOLDER_ID = os.environ["YC_FOLDER_ID"]
 
+# Увеличивать при изменении селекторов/логики извлечения текста:
+# закэшированные страницы будут переизвлечены из сохранённого HTML без сетевого запроса.
+EXTRACTION_VERSION = 2
+
+ARTICLE_REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+SEARCH_TYPE = "SEARCH_TYPE_RU"
+
+# charset из <meta charset=...> или <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+CHARSET_SNIFF_BYTES = 4096
+
+# Пауза перед каждым запросом статьи, секунды
+ARTICLE_REQUEST_DELAY = 1.0
+
+SEARCH_API_URL = "https://searchapi.api.cloud.yandex.net/v2/web/searchAsync"
+OPERATIONS_API_URL = "https://operation.api.cloud.yandex.net/operations"
+# Таймаут одного HTTP-запроса к Search API; при опросе он ещё ограничен остатком дедлайна
+SEARCH_API_REQUEST_TIMEOUT = 10.0
+
+
+@dataclass
+class PollingPolicy:
+    """
+    Параметры опроса операций Search API: первая проверка через initial_delay (типичное время
+    выполнения поиска), затем экспоненциальный рост интервала со случайным разбросом до max_delay.
+    Если операция не завершилась за deadline секунд — TimeoutError.
+    """
+    initial_delay: float = 5.0
+    multiplier: float = 1.5
+    max_delay: float = 30.0
+    jitter: float = 0.2
+    deadline: float = 300.0
+
+    def next_delay(self, delay: float) -> float:
+        return min(self.max_delay, delay * self.multiplier)
+
+    def with_jitter(self, delay: float) -> float:
+        return max(0.0, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+DEFAULT_POLLING_POLICY = PollingPolicy()
+
 
 def create_yandex_search_query(user_query: str, domains: List[str]) -> str:
     domain_filters = " | ".join([f"site:{domain}" for domain in domains])
     return f'"{user_query}" ({domain_filters})'
 
 
-def start_search_task(search_query: str, folder_id: str, iam_token: str, page: int = 0) -> str:
-    url = "https://searchapi.api.cloud.yandex.net/v2/web/searchAsync"
+def start_search_task(search_query: str, folder_id: str, iam_token: str, page: int = 0,
+                      search_url: str = SEARCH_API_URL) -> str:
     headers = {
         "Authorization": f"Bearer {iam_token}"
     }
     body = {
         "query": {
             "queryText": search_query,
-            "searchType": "SEARCH_TYPE_RU",
+            "searchType": SEARCH_TYPE,
             "page": str(page)
         },
         "folderId": folder_id,
@@ -42,7 +97,7 @@ def start_search_task(search_query: str, folder_id: str, iam_token: str, page: i
     }
 
     logger.info(f"1. Отправка запроса на запуск поиска (страница {page})...")
-    response = requests.post(url, headers=headers, json=body)
+    response = requests.post(search_url, headers=headers, json=body, timeout=SEARCH_API_REQUEST_TIMEOUT)
     response.raise_for_status()
 
     operation_id = response.json().get("id")
@@ -50,21 +105,72 @@ def start_search_task(search_query: str, folder_id: str, iam_token: str, page: i
     return operation_id
 
 
-def wait_for_result(operation_id: str, iam_token: str) -> Dict[str, Any]:
-    url = f"https://operation.api.cloud.yandex.net/operations/{operation_id}"
+def wait_for_result(operation_id: str, iam_token: str,
+                    policy: PollingPolicy = DEFAULT_POLLING_POLICY,
+                    base_url: str = OPERATIONS_API_URL) -> Dict[str, Any]:
+    for _, data in wait_for_results({0: operation_id}, iam_token, policy=policy, base_url=base_url):
+        return data
+
+
+def wait_for_results(operation_ids: Dict[int, str], iam_token: str,
+                     policy: PollingPolicy = DEFAULT_POLLING_POLICY,
+                     base_url: str = OPERATIONS_API_URL,
+                     poll_stats: Optional[Dict[str, int]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Опрашивает несколько операций поиска в одном цикле и отдаёт (страница, данные) по мере их завершения.
+    У каждой операции свой интервал опроса (см. PollingPolicy); при превышении дедлайна — TimeoutError.
+    Каждый GET ограничен остатком дедлайна, так что зависший запрос тоже не превысит его.
+
+    :param poll_stats: если передан, в него пишется число опросов каждой операции {operation_id: polls}
+    """
+    poll_stats = poll_stats if poll_stats is not None else {}
     headers = {
         "Authorization": f"Bearer {iam_token}"
     }
-    logger.info("2. Ожидание завершения операции...")
-    while True:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("done"):
-            logger.info("   ...Операция завершена.")
-            return data
-        logger.info("   ...Поиск еще выполняется, ожидание 15 секунд.")
-        time.sleep(15)
+    started_at = time.monotonic()
+    deadline_at = started_at + policy.deadline
+    pending = dict(operation_ids)
+    delays = {page: policy.initial_delay for page in pending}
+    next_poll_at = {page: started_at + policy.with_jitter(policy.initial_delay) for page in pending}
+
+    logger.info(f"2. Ожидание завершения операций ({len(pending)} шт.)...")
+    while pending:
+        now = time.monotonic()
+        wake_at = min(next_poll_at[page] for page in pending)
+        if wake_at > deadline_at:
+            raise TimeoutError(
+                f"Операции {list(pending.values())} не завершились за {policy.deadline:.0f} секунд."
+            )
+        if wake_at > now:
+            time.sleep(wake_at - now)
+
+        for page, operation_id in list(pending.items()):
+            if next_poll_at[page] > time.monotonic():
+                continue
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Операции {list(pending.values())} не завершились за {policy.deadline:.0f} секунд."
+                )
+            response = requests.get(f"{base_url}/{operation_id}", headers=headers,
+                                    timeout=min(remaining, SEARCH_API_REQUEST_TIMEOUT))
+            response.raise_for_status()
+            poll_stats[operation_id] = poll_stats.get(operation_id, 0) + 1
+            data = response.json()
+
+            if data.get("done"):
+                logger.info(
+                    f"   ...Операция для страницы {page} завершена за {time.monotonic() - started_at:.1f} с "
+                    f"({poll_stats[operation_id]} опросов)."
+                )
+                del pending[page]
+                yield page, data
+                continue
+
+            delays[page] = policy.next_delay(delays[page])
+            next_poll_at[page] = time.monotonic() + policy.with_jitter(delays[page])
+            logger.info(f"   ...Поиск для страницы {page} еще выполняется, повтор через {delays[page]:.1f} с.")
 
 
 def get_result_xml(operation_data: Dict[str, Any]) -> Optional[str]:
@@ -81,158 +187,291 @@ def get_result_xml(operation_data: Dict[str, Any]) -> Optional[str]:
         return None
 
 
-def parse_search_results(xml_content: Optional[str]) -> List[Dict[str, Any]]:
-    if not xml_content:
-        return []
+def parse_article_html(html: str, domain: str) -> Optional[str]:
+    return extract_article_text(html, domain)
+
+
+def extract_full_article_text(url: str, domain: str) -> Optional[str]:
+    """
+    Возвращает полный текст статьи, используя дисковый кэш: свежая запись отдаётся без сети,
+    устаревшая перепроверяется условным GET (If-None-Match / If-Modified-Since).
+    При смене EXTRACTION_VERSION текст переизвлекается из сохранённого HTML.
+    """
+    cache = get_article_cache()
+    cached = cache.get(url)
 
     try:
-        root = ET.fromstring(xml_content)
-    except ET.ParseError as e:
-        logger.error(f"Ошибка при парсинге XML: {e}")
-        return []
-
-    articles = []
-    grouping = root.find('.//grouping')
-    if grouping is None or not grouping.findall('.//doc'):
-        logger.info("   ...На этой странице релевантных документов не найдено.")
-        return []
-
-    for doc in root.findall('.//doc'):
-        title_element = doc.find('title')
-        passage_element = doc.find('.//passage')
-
-        if title_element is None or passage_element is None:
-            continue
+        if cached and cached.is_fresh():
+            logger.info(f"   ...Статья {url} взята из кэша.")
+            return _cached_article_text(cache, cached, domain)
+
+        headers = dict(ARTICLE_REQUEST_HEADERS)
+        if cached:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        # Пауза перед сетевым запросом, чтобы не нагружать сайты; из свежего кэша статья отдаётся без неё
+        time.sleep(ARTICLE_REQUEST_DELAY)
+        with requests.get(url, timeout=10, headers=headers, stream=True) as response:
+            if cached and response.status_code == 304:
+                logger.info(f"   ...Статья {url} не изменилась (304), используется кэш.")
+                cache.touch(url)
+                return _cached_article_text(cache, cached, domain)
+            response.raise_for_status()
+
+            html = _read_html_body(response, url)
+            if html is None:
+                return None
+
+        full_text = parse_article_html(html, domain)
+        cache.put(CachedArticle(
+            url=url,
+            html=html,
+            text=full_text,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            fetched_at=time.time(),
+            extraction_version=EXTRACTION_VERSION,
+        ))
+        return full_text
 
-        title = "".join(title_element.itertext()).strip()
-        passage = "".join(passage_element.itertext()).strip()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Ошибка при запросе к {url}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Ошибка при парсинге {url}: {e}")
+        return None
 
-        domain = doc.find('domain').text if doc.find('domain') is not None else "N/A"
-        url = doc.find('url').text if doc.find('url') is not None else "N/A"
 
-        modtime_str = doc.find('modtime').text if doc.find('modtime') is not None else ""
-        try:
-            date_obj = datetime.strptime(modtime_str, '%Y%m%dT%H%M%S')
-            date = date_obj.strftime('%Y-%m-%d')
-        except ValueError:
-            date = "N/A"
+def _read_html_body(response: requests.Response, url: str, max_bytes: int = ARTICLE_MAX_BYTES) -> Optional[str]:
+    """
+    Читает тело ответа потоком: не-HTML ответы (PDF, видео и т.п.) и страницы больше max_bytes
+    отбрасываются, не скачиваясь целиком. Кодировка берётся из заголовка или <meta>.
+    """
+    content_type = response.headers.get('Content-Type', '')
+    mime_type = content_type.split(';', 1)[0].strip().lower()
+    if mime_type and mime_type not in ARTICLE_ALLOWED_CONTENT_TYPES:
+        logger.warning(f"   ...Пропуск {url}: тип содержимого '{mime_type}' не HTML.")
+        return None
 
-        weight = DOMAIN_WEIGHTS.get(domain, "—")
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        logger.warning(f"   ...Пропуск {url}: размер {content_length} байт больше лимита {max_bytes}.")
+        return None
 
-        articles.append({
-            "date": date,
-            "title": title,
-            "summary": passage,
-            "source": domain,
-            "url": url,
-            "weight": weight,
-            "full_text": None
-        })
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            logger.warning(f"   ...Пропуск {url}: страница больше лимита {max_bytes} байт.")
+            return None
 
-    return articles
+    return _decode_html(bytes(body), content_type)
 
 
-def extract_full_article_text(url: str, domain: str) -> Optional[str]:
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        article_body = None
-        selectors = []
-
-        if "rbc.ru" in domain:
-            selectors = [
-                {'tag': 'div', 'class_': 'article__text'},
-                {'tag': 'div', 'class_': 'article__body'}
-            ]
-        elif "kommersant.ru" in domain:
-            selectors = [
-                {'tag': 'div', 'class_': 'article_text'},
-                {'tag': 'div', 'class_': 'js-article-text'}
-            ]
-        elif "vedomosti.ru" in domain:
-            selectors = [
-                {'tag': 'div', 'class_': 'article-body'}
-            ]
-        elif "tass.ru" in domain:
-            selectors = [
-                {'tag': 'div', 'class_': 'text-block'}
-            ]
-        elif "ria.ru" in domain:
-            selectors = [
-                {'tag': 'div', 'class_': 'article__body'}
-            ]
-        elif "interfax.ru" in domain:
-            selectors = [
-                {'tag': 'article', 'itemprop': 'articleBody'}
-            ]
-        elif "forbes.ru" in domain:
-            selectors = [
-                {'tag': 'div', 'class_': 'article-body'}
-            ]
-
-        for selector in selectors:
-            tag = selector.pop('tag', 'div')
-            if 'class_' in selector:
-                selector['class'] = selector.pop('class_')
-            article_body = soup.find(tag, **selector)
-            if article_body:
-                break
+def _decode_html(body: bytes, content_type: str) -> str:
+    charset = None
+    match = re.search(r'charset\s*=\s*["\']?([a-zA-Z0-9_\-]+)', content_type, re.IGNORECASE)
+    if match:
+        charset = match.group(1)
+    else:
+        meta_match = META_CHARSET_RE.search(body[:CHARSET_SNIFF_BYTES])
+        if meta_match:
+            charset = meta_match.group(1).decode('ascii')
 
-        if not article_body:
-            article_body = soup.find('article') or soup.find('main') or soup.body
+    for encoding in filter(None, [charset, 'utf-8']):
+        try:
+            return body.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    # Без объявленной кодировки и не UTF-8 — для русскоязычных СМИ почти всегда windows-1251
+    return body.decode('cp1251', errors='replace')
 
-        if article_body:
-            for ad_element in article_body.select('.adv, .subscription-block, .banner'):
-                ad_element.decompose()
 
-            paragraphs = article_body.find_all('p', recursive=True)
-            full_text = "\n".join([p.get_text(separator=' ', strip=True) for p in paragraphs if p.get_text(strip=True)])
-            return full_text if full_text else None
+def _cached_article_text(cache: ArticleCache, cached: CachedArticle, domain: str) -> Optional[str]:
+    if cached.extraction_version == EXTRACTION_VERSION:
+        return cached.text
 
-        return None
+    logger.info(f"   ...Переизвлечение текста {cached.url} (версия экстрактора {cached.extraction_version} "
+                f"-> {EXTRACTION_VERSION}).")
+    cached.text = parse_article_html(cached.html, domain)
+    cached.extraction_version = EXTRACTION_VERSION
+    cache.put(cached)
+    return cached.text
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Ошибка при запросе к {url}: {e}")
-        return None
+
+def _refresh_search_page(full_query: str, page_num: int, cache_key: str,
+                         search_url: str = SEARCH_API_URL, operations_url: str = OPERATIONS_API_URL) -> None:
+    """
+    Фоновое обновление устаревшей записи кэша поиска (stale-while-revalidate).
+    """
+    try:
+        op_id = start_search_task(full_query, FOLDER_ID, IAM_TOKEN, page=page_num, search_url=search_url)
+        if not op_id:
+            return
+        articles = parse_search_page(get_result_xml(wait_for_result(op_id, IAM_TOKEN, base_url=operations_url)))
+        if articles is not None:
+            get_search_cache().put(cache_key, full_query, page_num, articles)
+            logger.info(f"Кэш поиска для страницы {page_num} обновлён.")
     except Exception as e:
-        logger.error(f"Ошибка при парсинге {url}: {e}")
-        return None
+        logger.warning(f"Не удалось обновить кэш поиска для страницы {page_num}: {e}")
+
+
+def new_raw_output_path(path_to_output: str) -> str:
+    """
+    Уникальное имя NDJSON-файла: время с микросекундами (файлы сортируются по времени запуска)
+    и случайный суффикс, чтобы одновременные запуски не писали в один файл.
+    """
+    output_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}_parsed.ndjson"
+    return os.path.join(path_to_output, output_filename)
 
 
 def run_full_search_and_parse(user_search_query: str, domains_to_search: List[str], num_pages: int,
-                              path_to_output: str) -> str:
+                              path_to_output: str, output_filepath: Optional[str] = None,
+                              search_url: str = SEARCH_API_URL,
+                              operations_url: str = OPERATIONS_API_URL) -> Optional[str]:
+    """
+    Ищет статьи и дописывает каждую в NDJSON-файл сразу после извлечения полного текста.
+    По окончании (в том числе при ошибке) создаётся маркер '<файл>.done' для потоковых читателей.
+    Возвращает путь к файлу или None, если ничего не найдено.
+
+    :param search_url: адрес запуска поиска (для тестов — фейковый сервер)
+    :param operations_url: адрес опроса операций
+    """
+    output_filepath = output_filepath or new_raw_output_path(path_to_output)
+    try:
+        return _search_and_stream_articles(user_search_query, domains_to_search, num_pages, output_filepath,
+                                           search_url=search_url, operations_url=operations_url)
+    finally:
+        mark_complete(output_filepath)
+
+
+# Пул фоновых поисков создаётся при первом запуске, а не при импорте модуля
+BACKGROUND_SEARCH_WORKERS = 3
+_background_executor: Optional[ThreadPoolExecutor] = None
+_background_executor_lock = threading.Lock()
+
+
+def _get_background_executor() -> ThreadPoolExecutor:
+    global _background_executor
+    with _background_executor_lock:
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(max_workers=BACKGROUND_SEARCH_WORKERS,
+                                                      thread_name_prefix="news_search")
+        return _background_executor
+
+
+def start_full_search_and_parse(user_search_query: str, domains_to_search: List[str], num_pages: int,
+                                path_to_output: str, search_url: str = SEARCH_API_URL,
+                                operations_url: str = OPERATIONS_API_URL) -> Tuple[str, Future]:
+    """
+    Запускает run_full_search_and_parse в фоне. Возвращает путь к NDJSON-файлу, который можно
+    сразу читать потоково, и Future с итоговым результатом.
+    """
+    os.makedirs(path_to_output, exist_ok=True)
+    output_filepath = new_raw_output_path(path_to_output)
+    open(output_filepath, 'a', encoding='utf-8').close()
+    future = _get_background_executor().submit(
+        run_full_search_and_parse, user_search_query, domains_to_search, num_pages, path_to_output, output_filepath,
+        search_url, operations_url
+    )
+    return output_filepath, future
+
+
+def _search_and_stream_articles(user_search_query: str, domains_to_search: List[str], num_pages: int,
+                                output_filepath: str, search_url: str = SEARCH_API_URL,
+                                operations_url: str = OPERATIONS_API_URL) -> Optional[str]:
     full_query = create_yandex_search_query(user_search_query, domains_to_search)
     logger.info(f"Сформирован поисковый запрос: {full_query}\n")
 
     all_articles = []
-
+    pages_articles: Dict[int, List[Dict[str, Any]]] = {}
+    # Первая пустая страница: результаты со страниц после неё не учитываются
+    last_page = num_pages
+
+    search_cache = get_search_cache()
+    cache_keys = {
+        page_num: make_search_key(user_search_query, domains_to_search, page_num, SEARCH_TYPE)
+        for page_num in range(num_pages)
+    }
+    pages_to_search = []
     for page_num in range(num_pages):
-        try:
-            op_id = start_search_task(full_query, FOLDER_ID, IAM_TOKEN, page=page_num)
-            if op_id:
-                final_data = wait_for_result(op_id, IAM_TOKEN)
-                xml_data = get_result_xml(final_data)
-                parsed_page_data = parse_search_results(xml_data)
-
-                if not parsed_page_data:
-                    logger.info(f"На странице {page_num} больше нет результатов. Завершаю поиск.")
-                    break
+        cached = search_cache.get(cache_keys[page_num])
+        if cached is None:
+            pages_to_search.append(page_num)
+            continue
 
-                all_articles.extend(parsed_page_data)
-                time.sleep(2)
+        cached_articles, state = cached
+        logger.info(f"Страница {page_num} взята из кэша поиска ({state}).")
+        if state == STALE:
+            threading.Thread(
+                target=_refresh_search_page,
+                args=(full_query, page_num, cache_keys[page_num], search_url, operations_url),
+                daemon=True
+            ).start()
+        if not cached_articles:
+            last_page = min(last_page, page_num)
+        else:
+            pages_articles[page_num] = cached_articles
 
+    operation_ids: Dict[int, str] = {}
+    for page_num in pages_to_search:
+        if page_num >= last_page:
+            break
+        try:
+            op_id = start_search_task(full_query, FOLDER_ID, IAM_TOKEN, page=page_num, search_url=search_url)
         except requests.exceptions.HTTPError as e:
-            logger.error(f"Произошла ошибка HTTP: {e.response.status_code}")
+            logger.error(f"Произошла ошибка HTTP при запуске поиска страницы {page_num}: {e.response.status_code}")
             logger.error(f"Ответ сервера: {e.response.text}")
-            break
+            op_id = None
         except Exception as e:
-            logger.error(f"Произошла непредвиденная ошибка на странице {page_num}: {e}")
+            logger.error(f"Произошла непредвиденная ошибка при запуске поиска страницы {page_num}: {e}")
+            op_id = None
+        if not op_id:
+            # Как и при последовательном поиске, страницы после сбоя не учитываются,
+            # но уже запущенные операции дожидаемся
+            last_page = page_num
             break
+        operation_ids[page_num] = op_id
+
+    poll_stats: Dict[str, int] = {}
+    try:
+        for page_num, final_data in wait_for_results(operation_ids, IAM_TOKEN, base_url=operations_url,
+                                                     poll_stats=poll_stats):
+            parsed_page_data = parse_search_page(get_result_xml(final_data))
+            if parsed_page_data is not None:
+                search_cache.put(cache_keys[page_num], full_query, page_num, parsed_page_data)
+            else:
+                # Сбой страницы не кэшируется, но, как и раньше, обрывает выдачу на ней
+                parsed_page_data = []
+
+            if page_num >= last_page:
+                continue
+
+            if not parsed_page_data:
+                logger.info(f"На странице {page_num} больше нет результатов. Последующие страницы не учитываются.")
+                last_page = page_num
+            else:
+                pages_articles[page_num] = parsed_page_data
+
+            if all(p in pages_articles or p not in operation_ids for p in range(last_page)):
+                break
+
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"Произошла ошибка HTTP: {e.response.status_code}")
+        logger.error(f"Ответ сервера: {e.response.text}")
+    except Exception as e:
+        logger.error(f"Произошла непредвиденная ошибка при поиске: {e}")
+
+    polls = [poll_stats.get(op_id, 0) for op_id in operation_ids.values()]
+    if polls:
+        logger.info(f"Опросов операций поиска: всего {sum(polls)}, максимум на операцию {max(polls)}.")
+
+    for page_num in sorted(pages_articles):
+        if page_num < last_page:
+            all_articles.extend(pages_articles[page_num])
 
     if not all_articles:
         logger.info("Поиск не дал результатов.")
@@ -241,28 +480,28 @@ def run_full_search_and_parse(user_search_query: str, domains_to_search: List[st
     logger.info(
         f"Всего найдено {len(all_articles)} статей на {num_pages} страницах. Начинаю извлечение полного текста...")
 
+    os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
+
+    # Как и до потоковой записи: порядок — по первому появлению URL, данные — из последней записи с ним
     unique_articles = list({article['url']: article for article in all_articles}.values())
-    logger.info(f"После удаления дубликатов осталось {len(unique_articles)} уникальных статей.")
 
+    registry = get_run_registry()
     processed_count = 0
-    for article in unique_articles:
-        logger.info(f"Обработка статьи: {article['url']}")
-        time.sleep(1)
-        article['full_text'] = extract_full_article_text(article['url'], article['source'])
-        if article['full_text']:
-            logger.info(f"   ...Полный текст извлечен для {article['url']}")
-            processed_count += 1
-        else:
-            logger.warning(f"   ...Не удалось извлечь полный текст для {article['url']}")
-
-    output_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_parsed.json"
-    output_filepath = os.path.join(path_to_output, output_filename)
-
-    os.makedirs(path_to_output, exist_ok=True)
-
-    with open(output_filepath, 'w', encoding='utf-8') as f:
-        json.dump(unique_articles, f, ensure_ascii=False, indent=2)
-
+    with open(output_filepath, 'a', encoding='utf-8') as f:
+        for article in unique_articles:
+            logger.info(f"Обработка статьи: {article['url']}")
+            article['full_text'] = registry.fetch_text(
+                article['url'], lambda: extract_full_article_text(article['url'], article['source'])
+            )
+            if article['full_text']:
+                logger.info(f"   ...Полный текст извлечен для {article['url']}")
+                processed_count += 1
+            else:
+                logger.warning(f"   ...Не удалось извлечь полный текст для {article['url']}")
+            append_record(f, article)
+
+    logger.info(f"После удаления дубликатов осталось {len(unique_articles)} уникальных статей, "
+                f"полный текст извлечен для {processed_count}.")
     logger.info(f"Результат сохранен в файл: {output_filepath}")
 
     return output_filepath
@@ -0,0 +1,200 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from internship_analytics.conf import (
+    PREFILTER_ACCEPT_MIN_NAME_TERMS,
+    PREFILTER_ACCEPT_SCORE,
+    PREFILTER_REJECT_SCORE,
+    PREFILTER_SHADOW_MODE,
+)
+from .config.logger_config import get_logger
+
+logger = get_logger("relevance_prefilter")
+
+ACCEPT = "accept"
+REJECT = "reject"
+ASK_LLM = "llm"
+
+_WORD_RE = re.compile(r"[0-9a-zа-яё]+", re.IGNORECASE)
+
+# Организационно-правовые формы и служебные слова, которые не помогают опознать компанию
+_NAME_STOP_WORDS = {
+    "ооо", "ао", "пао", "зао", "оао", "нко", "ип", "гуп", "муп", "фгуп",
+    "общество", "ограниченной", "ответственностью", "акционерное", "публичное", "закрытое",
+    "открытое", "непубличное", "компания", "группа", "г", "гор",
+}
+
+# Окончания для лёгкого стемминга русских слов (от длинных к коротким)
+_RU_ENDINGS = sorted([
+    "иями", "ями", "ами", "иях", "ях", "ах", "ией", "ей", "ой", "ий", "ый", "ая", "яя", "ое", "ее",
+    "ого", "его", "ому", "ему", "ыми", "ими", "ым", "им", "ых", "их", "ую", "юю", "ом", "ем",
+    "ов", "ев", "ам", "ям", "ию", "ия", "ие", "ья", "ье", "ью", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+
+_MIN_STEM_LENGTH = 3
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def stem(word: str) -> str:
+    word = word.lower().replace("ё", "е")
+    if not word.isalpha():
+        return word
+    for ending in _RU_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def stemmed_tokens(text: str) -> List[str]:
+    return [stem(token) for token in _WORD_RE.findall(text or "")]
+
+
+# Токены наименования сравниваются после стемминга, поэтому и стоп-слова храним в той же форме
+_NAME_STOP_STEMS = frozenset(stem(word) for word in _NAME_STOP_WORDS)
+
+
+def _name_terms(name: str) -> List[str]:
+    return [token for token in stemmed_tokens(name) if len(token) > 1 and token not in _NAME_STOP_STEMS]
+
+
+@dataclass
+class RelevanceHints:
+    """
+    Что известно об объекте поиска: точные идентификаторы (ИНН, ОГРН) и варианты наименования
+    (полное и краткое название компании, ФИО руководителя).
+    """
+    identifiers: List[str] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+
+
+class RelevancePrefilter:
+    """
+    Дешёвая локальная оценка релевантности до Gemini: точное совпадение ИНН/ОГРН, совпадение
+    наименований после стемминга и BM25 по контекстному запросу. Очевидные совпадения принимаются,
+    очевидные промахи отбрасываются, в LLM идёт только неоднозначная середина.
+    Без LLM принимается только статья с ИНН/ОГРН или с полным наименованием хотя бы
+    из accept_min_name_terms значимых слов; остальные высокие оценки тоже уходят в LLM.
+
+    В теневом режиме (shadow) решения только записываются, а в LLM идёт всё — так отчёт
+    показывает, насколько автоматические решения совпадают с ответами модели.
+    """
+
+    def __init__(self, hints: RelevanceHints, context_query: str,
+                 accept_score: float = PREFILTER_ACCEPT_SCORE,
+                 reject_score: float = PREFILTER_REJECT_SCORE,
+                 shadow: bool = PREFILTER_SHADOW_MODE,
+                 accept_min_name_terms: int = PREFILTER_ACCEPT_MIN_NAME_TERMS):
+        self.identifiers = [i for i in hints.identifiers if i]
+        self.name_terms = [terms for terms in (_name_terms(name) for name in hints.names if name) if terms]
+        self.query_terms = list(dict.fromkeys(_name_terms(context_query)))
+        self.accept_score = accept_score
+        self.reject_score = reject_score
+        self.shadow = shadow
+        self.accept_min_name_terms = accept_min_name_terms
+        self._identifier_res = [re.compile(rf"(?<!\d){re.escape(i)}(?!\d)") for i in self.identifiers]
+        self._total_length = 0
+        self._documents = 0
+        self.records: List[Dict[str, Any]] = []
+
+    def _bm25(self, tokens: List[str]) -> float:
+        """
+        BM25 по терминам запроса без IDF (корпус статей заранее неизвестен), нормированный в [0, 1].
+        Средняя длина документа накапливается по уже оценённым статьям.
+        """
+        if not self.query_terms or not tokens:
+            return 0.0
+        self._documents += 1
+        self._total_length += len(tokens)
+        avg_length = self._total_length / self._documents
+
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / avg_length)
+        score = sum(
+            counts.get(term, 0) * (BM25_K1 + 1) / (counts.get(term, 0) + norm)
+            for term in self.query_terms
+        )
+        return score / (len(self.query_terms) * (BM25_K1 + 1))
+
+    def _name_score(self, token_set: set) -> float:
+        if not self.name_terms:
+            return 0.0
+        return max(sum(1 for term in terms if term in token_set) / len(terms) for terms in self.name_terms)
+
+    def _distinctive_name_match(self, token_set: set) -> bool:
+        return any(len(terms) >= self.accept_min_name_terms and all(term in token_set for term in terms)
+                   for terms in self.name_terms)
+
+    def decide(self, item: dict) -> str:
+        text = item.get('cleaned_text', '') or ''
+        tokens = stemmed_tokens(text)
+
+        identifier_match = any(regex.search(text) for regex in self._identifier_res)
+        token_set = set(tokens)
+        name_score = self._name_score(token_set)
+        bm25_score = self._bm25(tokens)
+        score = 1.0 if identifier_match else max(name_score, bm25_score)
+        can_accept = identifier_match or self._distinctive_name_match(token_set)
+
+        if score >= self.accept_score and can_accept:
+            decision = ACCEPT
+        elif score <= self.reject_score:
+            decision = REJECT
+        else:
+            decision = ASK_LLM
+
+        self.records.append({
+            "url": item.get('url'),
+            "decision": decision,
+            "score": round(score, 3),
+            "identifier_match": identifier_match,
+            "can_accept": can_accept,
+            "name_score": round(name_score, 3),
+            "bm25_score": round(bm25_score, 3),
+            "llm_relevant": None,
+        })
+        return ASK_LLM if self.shadow else decision
+
+    def record_llm_verdict(self, url: Optional[str], relevant: bool) -> None:
+        for record in reversed(self.records):
+            if record["url"] == url:
+                record["llm_relevant"] = relevant
+                return
+
+    def report(self) -> Dict[str, Any]:
+        counts = {ACCEPT: 0, REJECT: 0, ASK_LLM: 0}
+        agreement = {ACCEPT: [0, 0], REJECT: [0, 0]}  # [совпало с LLM, проверено LLM]
+        for record in self.records:
+            counts[record["decision"]] += 1
+            if record["decision"] in agreement and record["llm_relevant"] is not None:
+                expected = record["decision"] == ACCEPT
+                agreement[record["decision"]][0] += int(record["llm_relevant"] == expected)
+                agreement[record["decision"]][1] += 1
+
+        return {
+            "thresholds": {"accept_score": self.accept_score, "reject_score": self.reject_score},
+            "shadow": self.shadow,
+            "total": len(self.records),
+            "decisions": counts,
+            "llm_calls_saved": 0 if self.shadow else counts[ACCEPT] + counts[REJECT],
+            "agreement_with_llm": {
+                decision: {"agreed": agreed, "checked": checked}
+                for decision, (agreed, checked) in agreement.items()
+            },
+            "items": self.records,
+        }
+
+    def write_report(self, path: str) -> None:
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(
+            f"Предфильтр: принято {report['decisions'][ACCEPT]}, отклонено {report['decisions'][REJECT]}, "
+            f"в LLM {report['decisions'][ASK_LLM]} из {report['total']}. Отчёт: {path}"
+        )
@@ -1,12 +1,124 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
 from dotenv import load_dotenv
 
-from .config.gemini_config import get_gemini_config
+from internship_analytics.conf import GEMINI_CALL_TIMEOUT_SECONDS, GEMINI_THINKING_MODELS, LLM_CACHE_ENABLED
+
+from .config.gemini_config import GeminiConfigError, get_gemini_config
 from .config.logger_config import get_logger
+from .gemini_context_cache import get_context_cache_registry
+from .gemini_rate_limiter import get_concurrency_limiter, get_rate_limiter
+from .gemini_retry import (
+    DEFAULT_RETRY_POLICY,
+    QUOTA,
+    GeminiCallError,
+    GeminiStreamInterrupted,
+    classify_error,
+    get_gemini_call_stats,
+)
+from .llm_cache import get_llm_cache, make_llm_key
+from .token_budget import estimate_tokens
 
 load_dotenv()
 logger = get_logger("request_to_gemini_api")
 
 
+def generation_config(
+        max_output_tokens: int | None,
+        temperature: float | None,
+        top_p: float | None,
+        top_k: int | None,
+        system_instruction: str | None,
+        response_mime_type: str | None,
+        response_schema: dict | None,
+        model: str | None = None,
+        thinking_budget: int | None = None,
+) -> dict:
+    config: dict = {}
+    if max_output_tokens is not None:
+        config["max_output_tokens"] = max_output_tokens
+    if temperature is not None:
+        config["temperature"] = temperature
+    if top_p is not None:
+        config["top_p"] = top_p
+    if top_k is not None:
+        config["top_k"] = top_k
+    if system_instruction is not None:
+        config["system_instruction"] = system_instruction
+    if response_mime_type is not None:
+        config["response_mime_type"] = response_mime_type
+    if response_schema is not None:
+        config["response_schema"] = response_schema
+    # Модели без размышлений параметр не принимают; у остальных бюджет не ниже допустимого минимума
+    if thinking_budget is not None and model in GEMINI_THINKING_MODELS:
+        config["thinking_config"] = {"thinking_budget": max(thinking_budget, GEMINI_THINKING_MODELS[model])}
+    return config
+
+
+def _retry_or_fail(model: str, error: Exception, attempt: int) -> float:
+    """Решает судьбу неудачной попытки: возвращает паузу перед повтором или бросает GeminiCallError."""
+    kind = classify_error(error)
+    if not DEFAULT_RETRY_POLICY.should_retry(kind, attempt):
+        failure = GeminiCallError(model, kind, attempt, error)
+        get_gemini_call_stats().record_failure(failure)
+        raise failure from error
+
+    delay = DEFAULT_RETRY_POLICY.delay(attempt, error)
+    get_gemini_call_stats().record_retry(model, kind)
+    logger.warning(f"{model}: {kind} ошибка ({error}), попытка {attempt}/{DEFAULT_RETRY_POLICY.max_attempts}, "
+                   f"повтор через {delay:.1f} с.")
+    return delay
+
+
+def _generate_with_retries(gemini_client, model: str, prompt: str, config: dict, tokens: int):
+    request_config = get_context_cache_registry().request_config(model, config)
+    concurrency = get_concurrency_limiter(model)
+    attempt = 0
+    while True:
+        attempt += 1
+        get_rate_limiter(model).acquire(tokens)
+        concurrency.acquire()
+        try:
+            response = gemini_client.models.generate_content(model=model, contents=prompt,
+                                                             config=request_config or None)
+        except Exception as e:
+            concurrency.release(throttled=classify_error(e) == QUOTA)
+            time.sleep(_retry_or_fail(model, e, attempt))
+            continue
+        concurrency.release(succeeded=True)
+        get_gemini_call_stats().record_success(model)
+        return response
+
+
+async def _generate_with_retries_async(gemini_client, model: str, prompt: str, config: dict, tokens: int,
+                                       timeout: float | None):
+    request_config = await asyncio.to_thread(get_context_cache_registry().request_config, model, config)
+    concurrency = get_concurrency_limiter(model)
+    attempt = 0
+    while True:
+        attempt += 1
+        await get_rate_limiter(model).acquire_async(tokens)
+        await concurrency.acquire_async()
+        try:
+            response = await asyncio.wait_for(
+                gemini_client.aio.models.generate_content(model=model, contents=prompt,
+                                                          config=request_config or None),
+                timeout=timeout,
+            )
+        except asyncio.CancelledError:
+            concurrency.release()
+            raise
+        except Exception as e:
+            concurrency.release(throttled=classify_error(e) == QUOTA)
+            await asyncio.sleep(_retry_or_fail(model, e, attempt))
+            continue
+        concurrency.release(succeeded=True)
+        get_gemini_call_stats().record_success(model)
+        return response
+
+
 def call_to_gemini_api(
         prompt: str,
         model: str,
@@ -15,35 +127,190 @@ def call_to_gemini_api(
         top_p: float | None = None,
         top_k: int | None = None,
         system_instruction: str | None = None,
+        response_mime_type: str | None = None,
+        response_schema: dict | None = None,
+        thinking_budget: int | None = None,
+        use_cache: bool = LLM_CACHE_ENABLED,
+        refresh_cache: bool = False,
+        cache_if: Optional[Callable[[str], bool]] = None,
 ) -> str:
     """
-    Вызов Gemini API (google-genai). Поддерживает ограничение длины ответа и базовые параметры генерации.
+    Вызов Gemini API (google-genai). Поддерживает ограничение длины ответа и базовые параметры генерации,
+    а также структурированный ответ (response_mime_type='application/json' + response_schema).
+
+    Временные ошибки (429, 5xx, сетевые) повторяются с экспоненциальной паузой и учётом Retry-After,
+    число одновременных запросов к модели подстраивается по AIMD. Постоянные ошибки и исчерпанные попытки
+    попадают в get_gemini_call_stats() и возвращают пустую строку.
+
+    Длинный system_instruction регистрируется как кэш контекста (get_context_cache_registry()), и запрос
+    ссылается на него вместо повторной передачи инструкции; ключ кэша ответов от этого не меняется.
+
+    :param thinking_budget: бюджет токенов размышления (для моделей из GEMINI_THINKING_MODELS)
+    :param use_cache: брать ответ из дискового кэша по (модель, промпт, параметры), если он там есть
+    :param refresh_cache: не читать кэш, но сохранить в него новый ответ
+    :param cache_if: сохранять в кэш только ответы, прошедшие эту проверку
+    :raises GeminiConfigError: клиент Gemini не настроен
     """
-    gemini_client = get_gemini_config()
     try:
-        config: dict = {}
-        if max_output_tokens is not None:
-            config["max_output_tokens"] = max_output_tokens
-        if temperature is not None:
-            config["temperature"] = temperature
-        if top_p is not None:
-            config["top_p"] = top_p
-        if top_k is not None:
-            config["top_k"] = top_k
-        if system_instruction is not None:
-            config["system_instruction"] = system_instruction
-
-        response = gemini_client.models.generate_content(
-            model=model,
-            contents=prompt,
-            config=config or None,
-        )
-
-        return (getattr(response, "text", "") or "").strip()
+        config = generation_config(max_output_tokens, temperature, top_p, top_k,
+                                    system_instruction, response_mime_type, response_schema,
+                                    model, thinking_budget)
+
+        cache_key = make_llm_key(model, prompt, config)
+        if use_cache and not refresh_cache:
+            cached = get_llm_cache().get(cache_key)
+            if cached is not None:
+                return cached
 
+        response = _generate_with_retries(get_gemini_config(), model, prompt, config,
+                                          estimate_tokens(prompt + (system_instruction or "")))
+
+        text = (getattr(response, "text", "") or "").strip()
+        if use_cache and (cache_if is None or cache_if(text)):
+            get_llm_cache().put(cache_key, model, text)
+        return text
+
+    except GeminiConfigError:
+        raise
+    except GeminiCallError:
+        return ""
     except ValueError:
         logger.warning(f"Получен пустой или заблокированный ответ от модели {model}.")
         return ""
     except Exception as e:
         logger.error(f"Ошибка при вызове API Gemini для модели {model}: {e}")
         return ""
+
+
+async def async_call_to_gemini_api(
+        prompt: str,
+        model: str,
+        max_output_tokens: int | None = None,
+        temperature: float | None = None,
+        top_p: float | None = None,
+        top_k: int | None = None,
+        system_instruction: str | None = None,
+        response_mime_type: str | None = None,
+        response_schema: dict | None = None,
+        thinking_budget: int | None = None,
+        use_cache: bool = LLM_CACHE_ENABLED,
+        refresh_cache: bool = False,
+        cache_if: Optional[Callable[[str], bool]] = None,
+        timeout: float | None = GEMINI_CALL_TIMEOUT_SECONDS,
+) -> str:
+    """
+    Асинхронный вариант call_to_gemini_api на client.aio: один событийный цикл держит в полёте
+    сотни запросов без пула потоков. Параметры, кэш и квоты — те же.
+
+    Отмена задачи прерывает запрос (CancelledError не перехватывается); попытка, не получившая ответа
+    за timeout секунд, считается временной ошибкой и повторяется.
+    """
+    try:
+        config = generation_config(max_output_tokens, temperature, top_p, top_k,
+                                    system_instruction, response_mime_type, response_schema,
+                                    model, thinking_budget)
+
+        cache_key = make_llm_key(model, prompt, config)
+        if use_cache and not refresh_cache:
+            cached = get_llm_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        response = await _generate_with_retries_async(get_gemini_config(), model, prompt, config,
+                                                      estimate_tokens(prompt + (system_instruction or "")), timeout)
+
+        text = (getattr(response, "text", "") or "").strip()
+        if use_cache and (cache_if is None or cache_if(text)):
+            get_llm_cache().put(cache_key, model, text)
+        return text
+
+    except GeminiConfigError:
+        raise
+    except GeminiCallError:
+        return ""
+    except ValueError:
+        logger.warning(f"Получен пустой или заблокированный ответ от модели {model}.")
+        return ""
+    except Exception as e:
+        logger.error(f"Ошибка при вызове API Gemini для модели {model}: {e}")
+        return ""
+
+
+def stream_call_to_gemini_api(
+        prompt: str,
+        model: str,
+        on_text: Callable[[str], None],
+        max_output_tokens: int | None = None,
+        temperature: float | None = None,
+        top_p: float | None = None,
+        top_k: int | None = None,
+        system_instruction: str | None = None,
+        use_cache: bool = LLM_CACHE_ENABLED,
+        refresh_cache: bool = False,
+        cache_if: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Потоковый вариант call_to_gemini_api: фрагменты ответа передаются в on_text по мере генерации,
+    возвращается весь текст. Ответ из кэша отдаётся одним фрагментом.
+
+    Ошибки до первого фрагмента повторяются как обычно. Если поток оборвался после того, как часть
+    ответа уже отдана, повтора нет: бросается GeminiStreamInterrupted с накопленным текстом.
+    Исключение из on_text — ошибка получателя, а не Gemini: оно не повторяется и доходит до вызывающего кода.
+
+    :raises GeminiConfigError: клиент Gemini не настроен
+    :raises GeminiStreamInterrupted: поток оборвался на середине
+    """
+    config = generation_config(max_output_tokens, temperature, top_p, top_k, system_instruction, None, None)
+    cache_key = make_llm_key(model, prompt, config)
+    if use_cache and not refresh_cache:
+        cached = get_llm_cache().get(cache_key)
+        if cached is not None:
+            on_text(cached)
+            return cached
+
+    gemini_client = get_gemini_config()
+    request_config = get_context_cache_registry().request_config(model, config)
+    tokens = estimate_tokens(prompt + (system_instruction or ""))
+    concurrency = get_concurrency_limiter(model)
+    parts: list[str] = []
+    attempt = 0
+    while True:
+        attempt += 1
+        get_rate_limiter(model).acquire(tokens)
+        concurrency.acquire()
+        callback_error = None
+        try:
+            for chunk in gemini_client.models.generate_content_stream(
+                    model=model, contents=prompt, config=request_config or None):
+                piece = getattr(chunk, "text", None) or ""
+                if piece:
+                    parts.append(piece)
+                    try:
+                        on_text(piece)
+                    except Exception as e:
+                        callback_error = e
+                        break
+        except Exception as e:
+            kind = classify_error(e)
+            concurrency.release(throttled=kind == QUOTA)
+            if parts:
+                failure = GeminiStreamInterrupted(model, kind, attempt, e, "".join(parts))
+                get_gemini_call_stats().record_failure(failure)
+                raise failure from e
+            try:
+                delay = _retry_or_fail(model, e, attempt)
+            except GeminiCallError:
+                return ""
+            time.sleep(delay)
+            continue
+        if callback_error is not None:
+            concurrency.release()
+            raise callback_error
+        concurrency.release(succeeded=True)
+        get_gemini_call_stats().record_success(model)
+        break
+
+    text = "".join(parts).strip()
+    if use_cache and (cache_if is None or cache_if(text)):
+        get_llm_cache().put(cache_key, model, text)
+    return text
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from .config.logger_config import get_logger
+
+logger = get_logger("run_registry")
+
+
+class RunRegistry:
+    """
+    Общий для одного запуска реестр по URL: полный текст статей и результат очистки Уровня 1.
+    Блоки компании, руководителя и рынка работают через него, поэтому статья, найденная
+    несколькими запросами, скачивается и очищается Gemini один раз. Одновременные запросы
+    одного URL ждут первый.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._full_texts: Dict[str, Future] = {}
+        self._cleaned_texts: Dict[str, Future] = {}
+        self.fetch_hits = 0
+        self.clean_hits = 0
+
+    def _claim(self, store: Dict[str, Future], key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = store.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                store[key] = future
+        return future, owner
+
+    def _fail(self, store: Dict[str, Future], key: str, future: Future, error: BaseException) -> None:
+        with self._lock:
+            store.pop(key, None)
+        future.set_exception(error)
+
+    def _settle(self, store: Dict[str, Future], key: str, future: Future, value: Optional[str]) -> None:
+        if not value:
+            # Пустой результат не запоминаем: другой блок попробует ещё раз
+            with self._lock:
+                store.pop(key, None)
+        future.set_result(value)
+
+    def _get_or_compute(self, store: Dict[str, Future], key: str,
+                        compute: Callable[[], Optional[str]]) -> Tuple[Optional[str], bool]:
+        future, owner = self._claim(store, key)
+        if not owner:
+            return future.result(), True
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self._fail(store, key, future, e)
+            raise
+        self._settle(store, key, future, value)
+        return value, False
+
+    async def _get_or_compute_async(self, store: Dict[str, Future], key: str,
+                                    compute: Callable[[], Awaitable[Optional[str]]]) -> Tuple[Optional[str], bool]:
+        future, owner = self._claim(store, key)
+        if not owner:
+            return await asyncio.wrap_future(future), True
+
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._fail(store, key, future, e)
+            raise
+        self._settle(store, key, future, value)
+        return value, False
+
+    def fetch_text(self, url: str, fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        value, hit = self._get_or_compute(self._full_texts, url, fetch)
+        if hit:
+            self.fetch_hits += 1
+            logger.info(f"   ...Полный текст {url} уже получен в этом запуске.")
+        return value
+
+    def cleaned_text(self, url: str, clean: Callable[[], Optional[str]]) -> Optional[str]:
+        value, hit = self._get_or_compute(self._cleaned_texts, url, clean)
+        if hit:
+            self.clean_hits += 1
+            logger.info(f"Очищенный текст {url} уже получен в этом запуске.")
+        return value
+
+    async def cleaned_text_async(self, url: str, clean: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        value, hit = await self._get_or_compute_async(self._cleaned_texts, url, clean)
+        if hit:
+            self.clean_hits += 1
+            logger.info(f"Очищенный текст {url} уже получен в этом запуске.")
+        return value
+
+
+_run_registry = RunRegistry()
+
+
+def get_run_registry() -> RunRegistry:
+    return _run_registry
+
+
+def reset_run_registry() -> RunRegistry:
+    """Начинает новый запуск: прежние тексты больше не переиспользуются."""
+    global _run_registry
+    _run_registry = RunRegistry()
+    return _run_registry
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from internship_analytics.conf import SEARCH_CACHE_PATH, SEARCH_CACHE_STALE_SECONDS, SEARCH_CACHE_TTL_SECONDS
+from .config.logger_config import get_logger
+
+logger = get_logger("search_cache")
+
+# Просроченные записи удаляются при открытии и после стольких записей
+EVICT_EVERY_PUTS = 200
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+def make_search_key(query_text: str, domains: Iterable[str], page: int, search_type: str) -> str:
+    """
+    Ключ кэша: текст запроса, множество доменов (без учёта порядка), страница и тип поиска.
+    """
+    payload = json.dumps([query_text, sorted(set(domains)), page, search_type], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    Дисковый кэш разобранных результатов Yandex Search API (вывод parse_search_results) с TTL.
+    Запись младше ttl — свежая, младше ttl + stale — устаревшая, но пригодная к выдаче,
+    пока её обновляет фоновый запрос; более старые записи удаляются.
+    """
+
+    def __init__(self,
+                 path: str = SEARCH_CACHE_PATH,
+                 ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+                 stale_seconds: float = SEARCH_CACHE_STALE_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                query_text TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                articles TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+        """
+        Возвращает (статьи, FRESH | STALE) или None, если записи нет или она слишком старая.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT articles, stored_at FROM search_results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        articles, stored_at = row
+        age = time.time() - stored_at
+        if age < self.ttl_seconds:
+            return json.loads(articles), FRESH
+        if age < self.ttl_seconds + self.stale_seconds:
+            return json.loads(articles), STALE
+        return None
+
+    def put(self, key: str, query_text: str, page: int, articles: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (key, query_text, page, articles, stored_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, query_text, page, json.dumps(articles, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            evict_now = self._puts_since_evict >= EVICT_EVERY_PUTS
+        if evict_now:
+            self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            self._puts_since_evict = 0
+            removed = self._conn.execute(
+                "DELETE FROM search_results WHERE stored_at < ?",
+                (time.time() - self.ttl_seconds - self.stale_seconds,)
+            ).rowcount
+            self._conn.commit()
+
+        if removed:
+            logger.info(f"Из кэша поиска удалено {removed} записей.")
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
@@ -0,0 +1,94 @@
+import os
+from typing import Callable, Iterable, Optional
+
+from .config.logger_config import get_logger
+from .gemini_retry import GeminiStreamInterrupted
+
+logger = get_logger("streaming_output")
+
+# Слушатель прогресса получает весь накопленный на данный момент текст
+ProgressListener = Callable[[str], None]
+
+PARTIAL_SUFFIX = ".partial"
+
+
+class StreamingTextFile:
+    """
+    Пишет ответ модели в '<path>.partial' по мере генерации и сообщает слушателям накопленный текст.
+    commit() переносит файл в path. Если генерация оборвалась, '.partial' остаётся с частичным
+    результатом; пустой незавершённый файл удаляется.
+    """
+
+    def __init__(self, path: str, listeners: Iterable[ProgressListener] = ()):
+        self.path = path
+        self.partial_path = path + PARTIAL_SUFFIX
+        self.listeners = list(listeners)
+        self.text = ""
+        self._file = None
+        self._committed = False
+
+    def __enter__(self) -> "StreamingTextFile":
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.partial_path, "w", encoding="utf-8")
+        return self
+
+    def write(self, chunk: str) -> None:
+        self._file.write(chunk)
+        self._file.flush()
+        self.text += chunk
+        for listener in self.listeners:
+            try:
+                listener(self.text)
+            except Exception as e:
+                logger.warning(f"Ошибка слушателя прогресса: {e}")
+
+    def restart(self) -> None:
+        """Начинает текст заново (например, при переходе на другую модель)."""
+        self._file.seek(0)
+        self._file.truncate()
+        self.text = ""
+
+    def commit(self) -> str:
+        self._file.close()
+        os.replace(self.partial_path, self.path)
+        self._committed = True
+        return self.path
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if not self._committed and not self.text.strip() and os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+
+def stream_to_file(path: str, generate: Callable[[Callable[[str], None], Callable[[], None]], str],
+                   listeners: Iterable[ProgressListener] = ()) -> Optional[str]:
+    """
+    Запускает generate(on_text, on_restart) и пишет ответ в path по мере генерации.
+    Возвращает текст, если он получен целиком и не пуст; при обрыве потока — None,
+    а частичный результат остаётся в '<path>.partial'.
+    """
+    with StreamingTextFile(path, listeners) as out:
+        try:
+            text = generate(out.write, out.restart)
+        except GeminiStreamInterrupted as e:
+            logger.error(f"Генерация оборвалась ({e.kind}): частичный результат ({len(out.text)} символов) "
+                         f"сохранён в {out.partial_path}")
+            return None
+        if not text.strip():
+            return None
+        out.commit()
+        return text
+
+
+def log_progress(label: str, every_chars: int = 2000) -> ProgressListener:
+    """Слушатель, который пишет в лог объём сгенерированного текста каждые every_chars символов."""
+    last_reported: Optional[int] = None
+
+    def _listener(text: str) -> None:
+        nonlocal last_reported
+        if last_reported is None or len(text) < last_reported or len(text) - last_reported >= every_chars:
+            last_reported = len(text)
+            logger.info(f"{label}: получено {len(text)} символов...")
+
+    return _listener
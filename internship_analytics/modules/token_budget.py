@@ -0,0 +1,45 @@
+import re
+from typing import Optional
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Быстрая локальная оценка числа токенов Gemini без токенизатора.
+    Кириллица в среднем ~3 символа на токен, латиница и цифры ~4; доля кириллицы
+    оценивается по длине в UTF-8 (кириллический символ занимает 2 байта).
+    """
+    if not text:
+        return 0
+    chars = len(text)
+    two_byte_chars = min(chars, len(text.encode("utf-8")) - chars)
+    return max(1, int(two_byte_chars / 3 + (chars - two_byte_chars) / 4) + 1)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Обрезает текст до max_tokens по границе предложения; если уже первое предложение
+    не помещается — режет его по оценочной длине в символах.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # Срез исходного текста до конца последнего поместившегося предложения — разделители
+    # между предложениями (в том числе переносы абзацев) сохраняются как есть
+    kept_end = 0
+    used = 0
+    start = 0
+    bounds = [(m.start(), m.end()) for m in _SENTENCE_END_RE.finditer(text)]
+    bounds.append((len(text), len(text)))
+    for end, next_start in bounds:
+        sentence_tokens = estimate_tokens(text[start:end])
+        if used + sentence_tokens > max_tokens:
+            break
+        kept_end = end
+        used += sentence_tokens
+        start = next_start
+
+    if kept_end:
+        return text[:kept_end]
+    return text[:max(0, max_tokens * 3)]
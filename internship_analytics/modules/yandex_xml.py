@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from internship_analytics.conf import DOMAIN_WEIGHTS
+from .config.logger_config import get_logger
+
+logger = get_logger("yandex_xml")
+
+
+def _doc_to_article(doc: ET.Element) -> Optional[Dict[str, Any]]:
+    title_element = None
+    domain = url = modtime_str = None
+    for child in doc:
+        if child.tag == 'title':
+            title_element = child
+        elif child.tag == 'domain':
+            domain = child.text
+        elif child.tag == 'url':
+            url = child.text
+        elif child.tag == 'modtime':
+            modtime_str = child.text
+
+    passage_element = doc.find('.//passage')
+    if title_element is None or passage_element is None:
+        return None
+
+    domain = domain or "N/A"
+    try:
+        date = datetime.strptime(modtime_str or "", '%Y%m%dT%H%M%S').strftime('%Y-%m-%d')
+    except ValueError:
+        date = "N/A"
+
+    return {
+        "date": date,
+        "title": "".join(title_element.itertext()).strip(),
+        "summary": "".join(passage_element.itertext()).strip(),
+        "source": domain,
+        "url": url or "N/A",
+        "weight": DOMAIN_WEIGHTS.get(domain, "—"),
+        "full_text": None
+    }
+
+
+# <error code="15"> — «по запросу ничего не найдено»: обычная пустая страница, а не сбой
+NO_RESULTS_ERROR_CODE = "15"
+
+
+# Ответ подаётся парсеру кусками, без копии всей страницы в байтах
+PARSE_CHUNK_CHARS = 64 * 1024
+
+
+def _iter_events(xml_content: str) -> Iterator[Tuple[str, ET.Element]]:
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    for offset in range(0, len(xml_content), PARSE_CHUNK_CHARS):
+        parser.feed(xml_content[offset:offset + PARSE_CHUNK_CHARS])
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def _iter_page(xml_content: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Один потоковый проход по ответу: ("error", (код, текст)) для <error> и ("article", статья)
+    для каждого <doc> внутри <grouping>. Закрытые элементы вне <doc> сразу удаляются из дерева,
+    так что память не растёт с размером страницы.
+    """
+    parents: List[ET.Element] = []
+    open_docs = 0
+    for event, elem in _iter_events(xml_content):
+        if event == 'start':
+            parents.append(elem)
+            open_docs += elem.tag == 'doc'
+            continue
+
+        parents.pop()
+        if elem.tag == 'doc':
+            open_docs -= 1
+            if any(parent.tag == 'grouping' for parent in parents):
+                article = _doc_to_article(elem)
+                if article is not None:
+                    yield "article", article
+        elif open_docs:
+            # Дочерние элементы <doc> нужны, пока не закрылся сам документ
+            continue
+        elif elem.tag == 'error':
+            yield "error", (elem.get('code'), (elem.text or '').strip())
+
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+
+def iter_search_results(xml_content: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Потоково разбирает XML-ответ Yandex Search API: статья отдаётся, как только закрывается её <doc>,
+    после чего элемент удаляется из дерева, так что память не растёт с размером страницы.
+    Учитываются только документы внутри <grouping>. Некорректный XML — ET.ParseError; чтобы не получить
+    часть страницы, используйте parse_search_results / parse_search_page.
+    """
+    if not xml_content:
+        return
+
+    for kind, value in _iter_page(xml_content):
+        if kind == "article":
+            yield value
+
+
+def parse_search_page(xml_content: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Как parse_search_results, но отличает пустую страницу ([]) от сбоя (None): нет XML,
+    XML не разбирается или Yandex вернул <error> (кроме «ничего не найдено»).
+    Страница разбирается целиком или никак: при ошибке разбора частичный список не возвращается.
+    Кэшировать можно только результат, отличный от None.
+    """
+    if not xml_content:
+        return None
+
+    articles: List[Dict[str, Any]] = []
+    try:
+        for kind, value in _iter_page(xml_content):
+            if kind == "article":
+                articles.append(value)
+                continue
+            code, text = value
+            if code != NO_RESULTS_ERROR_CODE:
+                logger.error(f"Yandex Search API вернул ошибку {code}: {text}")
+                return None
+    except ET.ParseError as e:
+        logger.error(f"Ошибка при парсинге XML: {e}")
+        return None
+
+    if not articles:
+        logger.info("   ...На этой странице релевантных документов не найдено.")
+    return articles
+
+
+def parse_search_results(xml_content: Optional[str]) -> List[Dict[str, Any]]:
+    return parse_search_page(xml_content) or []
+
+
+def benchmark_search_parsing(responses_dir: str, repeats: int = 20) -> Dict[str, Dict[str, float]]:
+    """
+    Микро-бенчмарк разбора на записанных XML-ответах (*.xml): время и пик памяти
+    parse_search_page (разбор, который использует поиск) против построения полного дерева через ET.fromstring.
+    """
+    responses = []
+    for file_name in sorted(os.listdir(responses_dir)):
+        if file_name.endswith(".xml"):
+            with open(os.path.join(responses_dir, file_name), "r", encoding="utf-8") as f:
+                responses.append(f.read())
+
+    if not responses:
+        logger.warning(f"В {responses_dir} нет XML-ответов.")
+        return {}
+
+    def _full_tree(xml_content: str) -> int:
+        return len(ET.fromstring(xml_content).findall('.//doc'))
+
+    def _search_page(xml_content: str) -> int:
+        return len(parse_search_page(xml_content) or [])
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, parse in (("fromstring", _full_tree), ("parse_search_page", _search_page)):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for xml_content in responses:
+                parse(xml_content)
+        elapsed = (time.perf_counter() - started) / (repeats * len(responses))
+
+        tracemalloc.start()
+        for xml_content in responses:
+            parse(xml_content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {"seconds_per_response": elapsed, "peak_bytes": peak}
+        logger.info(f"{name}: {elapsed * 1000:.2f} мс на ответ, пик памяти {peak / 1024:.0f} КБ")
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_search_parsing(sys.argv[1])
@@ -0,0 +1,100 @@
+import inspect
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# news.py читает учётные данные Search API при импорте; в тестах сеть Яндекса не используется
+os.environ.setdefault("YC_IAM_TOKEN", "test-token")
+os.environ.setdefault("YC_FOLDER_ID", "test-folder")
+
+
+class FakeGeminiClient:
+    """
+    Замена google.genai.Client без сети: responder(модель, промпт, config) даёт текст ответа
+    (или бросает ошибку; в client.aio может быть корутиной), stream_responder — фрагменты потока.
+    """
+
+    def __init__(self, responder=None, stream_responder=None):
+        self.responder = responder or (lambda model, contents, config: "ok")
+        self.stream_responder = stream_responder or (lambda model, contents, config: ["ok"])
+        self.calls = []
+        self.models = SimpleNamespace(generate_content=self._generate,
+                                      generate_content_stream=self._generate_stream)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_async))
+
+    def _generate(self, model, contents, config=None):
+        self.calls.append((model, contents, config))
+        return SimpleNamespace(text=self.responder(model, contents, config))
+
+    def _generate_stream(self, model, contents, config=None):
+        self.calls.append((model, contents, config))
+        for piece in self.stream_responder(model, contents, config):
+            yield SimpleNamespace(text=piece)
+
+    async def _generate_async(self, model, contents, config=None):
+        self.calls.append((model, contents, config))
+        text = self.responder(model, contents, config)
+        if inspect.isawaitable(text):
+            text = await text
+        return SimpleNamespace(text=text)
+
+
+class FakeHttpResponse:
+    """Ответ requests.get(..., stream=True) без сети: тело отдаётся кусками по chunk_size байт."""
+
+    def __init__(self, status_code=200, body=b"", headers=None, chunk_size=1024):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        import requests
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), self.chunk_size):
+            chunk = self.body[start:start + self.chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+@pytest.fixture
+def fake_gemini(tmp_path, monkeypatch):
+    """Подставляет FakeGeminiClient, пустой кэш ответов и быстрые повторы; состояние запуска сбрасывается."""
+    from internship_analytics.modules import gemini_rate_limiter, llm_cache, request_to_gemini_api
+    from internship_analytics.modules.config.gemini_config import reset_gemini_clients, set_gemini_client
+    from internship_analytics.modules.gemini_retry import RetryPolicy, reset_gemini_call_stats
+    from internship_analytics.modules.model_router import reset_model_router
+    from internship_analytics.modules.run_registry import reset_run_registry
+
+    client = FakeGeminiClient()
+    set_gemini_client(client)
+    monkeypatch.setattr(llm_cache, "_llm_cache", llm_cache.LlmCache(path=str(tmp_path / "llm.sqlite")))
+    monkeypatch.setattr(request_to_gemini_api, "DEFAULT_RETRY_POLICY",
+                        RetryPolicy(max_attempts=3, initial_delay=0.01, max_delay=0.05, jitter=0.0))
+    monkeypatch.setattr(gemini_rate_limiter, "_limiters", {})
+    monkeypatch.setattr(gemini_rate_limiter, "_concurrency_limiters", {})
+    reset_gemini_call_stats()
+    reset_model_router()
+    reset_run_registry()
+    yield client
+    reset_gemini_clients()
+    reset_run_registry()
+    reset_model_router()
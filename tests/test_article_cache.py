@@ -0,0 +1,141 @@
+import os
+import time
+
+import pytest
+
+from conftest import FakeHttpResponse
+from internship_analytics.modules import article_cache, news
+from internship_analytics.modules.article_cache import ArticleCache, CachedArticle
+
+URL = "https://example.org/news/1"
+HTML = "<html><body><p>Текст статьи</p></body></html>"
+
+
+class FakeSession:
+    """Подмена requests.get: отдаёт заранее заданные ответы и запоминает заголовки запросов."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ArticleCache(path=os.path.join(tmp_path, "articles.sqlite"))
+    monkeypatch.setattr(news, "get_article_cache", lambda: cache)
+    monkeypatch.setattr(news, "ARTICLE_REQUEST_DELAY", 0)
+    extractions = []
+    monkeypatch.setattr(news, "parse_article_html",
+                        lambda html, domain: extractions.append(html) or f"текст v{news.EXTRACTION_VERSION}")
+    cache.extractions = extractions
+    return cache
+
+
+def _use_session(monkeypatch, session):
+    monkeypatch.setattr(news.requests, "get", session.get)
+
+
+def _stale(cache, **fields):
+    article = CachedArticle(url=URL, html=HTML, text="старый текст", etag=None, last_modified=None,
+                            fetched_at=time.time() - 10 * 24 * 60 * 60, extraction_version=news.EXTRACTION_VERSION)
+    for name, value in fields.items():
+        setattr(article, name, value)
+    cache.put(article)
+    return article
+
+
+def test_first_fetch_stores_validators(cache, monkeypatch):
+    session = FakeSession(FakeHttpResponse(body=HTML.encode("utf-8"), headers={
+        "Content-Type": "text/html; charset=utf-8", "ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"
+    }))
+    _use_session(monkeypatch, session)
+
+    assert news.extract_full_article_text(URL, "example.org") == f"текст v{news.EXTRACTION_VERSION}"
+
+    cached = cache.get(URL)
+    assert (cached.html, cached.etag, cached.last_modified) == (HTML, '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")
+    assert "If-None-Match" not in session.requests[0][1]
+
+
+def test_fresh_entry_is_served_without_network(cache, monkeypatch):
+    _stale(cache, fetched_at=time.time())
+    session = FakeSession()
+    _use_session(monkeypatch, session)
+
+    assert news.extract_full_article_text(URL, "example.org") == "старый текст"
+    assert session.requests == []
+
+
+def test_stale_entry_sends_conditional_get_and_touches_on_304(cache, monkeypatch):
+    old = _stale(cache, etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    session = FakeSession(FakeHttpResponse(status_code=304))
+    _use_session(monkeypatch, session)
+
+    assert news.extract_full_article_text(URL, "example.org") == "старый текст"
+
+    headers = session.requests[0][1]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    # 304 продлевает свежесть записи без переизвлечения текста
+    refreshed = cache.get(URL)
+    assert refreshed.fetched_at > old.fetched_at and refreshed.is_fresh()
+    assert cache.extractions == []
+
+
+def test_stale_entry_is_replaced_on_200(cache, monkeypatch):
+    _stale(cache, etag='"v1"')
+    new_html = "<html><body><p>Обновлённый текст</p></body></html>"
+    session = FakeSession(FakeHttpResponse(body=new_html.encode("utf-8"),
+                                           headers={"Content-Type": "text/html", "ETag": '"v2"'}))
+    _use_session(monkeypatch, session)
+
+    news.extract_full_article_text(URL, "example.org")
+
+    cached = cache.get(URL)
+    assert (cached.html, cached.etag) == (new_html, '"v2"')
+    assert cache.extractions == [new_html]
+
+
+def test_extraction_version_bump_reextracts_from_stored_html(cache, monkeypatch):
+    _stale(cache, fetched_at=time.time(), extraction_version=news.EXTRACTION_VERSION)
+    monkeypatch.setattr(news, "EXTRACTION_VERSION", news.EXTRACTION_VERSION + 1)
+    session = FakeSession()
+    _use_session(monkeypatch, session)
+
+    assert news.extract_full_article_text(URL, "example.org") == f"текст v{news.EXTRACTION_VERSION}"
+    assert session.requests == []
+    assert cache.extractions == [HTML]
+    assert cache.get(URL).extraction_version == news.EXTRACTION_VERSION
+
+    # Повторный запрос берёт уже переизвлечённый текст
+    news.extract_full_article_text(URL, "example.org")
+    assert len(cache.extractions) == 1
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(article_cache, "EVICT_EVERY_PUTS", 1)
+    cache = ArticleCache(path=os.path.join(tmp_path, "articles.sqlite"), max_bytes=350)
+    for i in range(3):
+        cache.put(CachedArticle(url=f"u{i}", html="x" * 100, text=None, etag=None, last_modified=None,
+                                fetched_at=time.time(), extraction_version=1))
+        time.sleep(0.01)
+    cache.get("u0")
+    time.sleep(0.01)
+    cache.put(CachedArticle(url="u3", html="x" * 100, text=None, etag=None, last_modified=None,
+                            fetched_at=time.time(), extraction_version=1))
+
+    assert [url for url in ("u0", "u1", "u2", "u3") if cache.get(url)] == ["u0", "u2", "u3"]
+
+
+def test_old_entries_are_evicted_by_age(tmp_path):
+    path = os.path.join(tmp_path, "articles.sqlite")
+    cache = ArticleCache(path=path, max_age_seconds=60)
+    cache.put(CachedArticle(url="old", html="x", text=None, etag=None, last_modified=None,
+                            fetched_at=time.time() - 120, extraction_version=1))
+    cache.evict()
+
+    assert cache.get("old") is None
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from internship_analytics.modules.boilerplate_cleaner import benchmark_pre_clean, pre_clean
+
+PRECLEAN_DIR = os.path.join(FIXTURES_DIR, "preclean")
+FIXTURE_NAMES = sorted(f[:-len(".raw.txt")] for f in os.listdir(PRECLEAN_DIR) if f.endswith(".raw.txt"))
+
+
+def _read(name: str, kind: str) -> str:
+    with open(os.path.join(PRECLEAN_DIR, f"{name}.{kind}.txt"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("name", FIXTURE_NAMES)
+def test_pre_clean_matches_expected(name):
+    result = pre_clean(_read(name, "raw"))
+    assert result.text == _read(name, "expected").strip()
+
+
+def test_short_content_lines_are_kept():
+    # Строки таблицы, подписи к рисункам и список после двоеточия — содержимое, а не меню
+    text = _read("results_table", "raw")
+    result = pre_clean(text)
+    assert "Чистая прибыль — 1,3 млрд" in result.text
+    assert "Рис. 4 Capex" in result.text
+    assert "link_list" not in result.removed
+
+
+def test_navigation_run_is_removed():
+    result = pre_clean(_read("interview_short_lines", "raw"))
+    assert "Курс рубля на завтра" not in result.text
+    assert result.removed["link_list"] == 5
+
+
+def test_benchmark_pre_clean():
+    summary = benchmark_pre_clean(PRECLEAN_DIR)
+    assert summary["f1"] == pytest.approx(1.0)
+    assert summary["saved"] > 0.1
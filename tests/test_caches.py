@@ -0,0 +1,36 @@
+import os
+
+from internship_analytics.modules import llm_cache, search_cache
+from internship_analytics.modules.llm_cache import LlmCache
+from internship_analytics.modules.search_cache import SearchCache
+
+
+def test_llm_cache_reset_stats(tmp_path):
+    cache = LlmCache(path=os.path.join(tmp_path, "llm.sqlite"))
+    cache.put("k", "model", "ответ")
+    assert cache.get("k") == "ответ"
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+    cache.reset_stats()
+    assert cache.stats() == {"hits": 0, "misses": 0}
+
+
+def test_llm_cache_evicts_on_put(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "EVICT_EVERY_PUTS", 5)
+    cache = LlmCache(path=os.path.join(tmp_path, "llm.sqlite"), max_bytes=1000)
+    for i in range(50):
+        cache.put(f"k{i}", "model", "x" * 100)
+
+    size = cache._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    assert size <= 1000 + 5 * 100
+    assert cache.get("k49") is not None
+
+
+def test_search_cache_evicts_expired_on_put(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_cache, "EVICT_EVERY_PUTS", 2)
+    cache = SearchCache(path=os.path.join(tmp_path, "search.sqlite"), ttl_seconds=-1, stale_seconds=0)
+    cache.put("k0", "запрос", 0, [{"url": "https://example.org"}])
+    cache.put("k1", "запрос", 1, [])
+
+    assert cache._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0] == 0
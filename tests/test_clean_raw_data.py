@@ -0,0 +1,77 @@
+import json
+import time
+
+import pytest
+
+from internship_analytics.modules import gemini_3_factor_process_data
+from internship_analytics.modules.gemini_3_factor_process_data import clean_raw_data
+from internship_analytics.modules.run_registry import reset_run_registry
+
+URLS = [f"https://example.org/{i}" for i in range(8)]
+
+
+@pytest.fixture
+def raw_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(gemini_3_factor_process_data, "PRECLEAN_ENABLED", False)
+    reset_run_registry()
+    path = tmp_path / "raw.json"
+    path.write_text(json.dumps([
+        {"title": f"Статья {i}", "full_text": f"Текст статьи {i}", "url": url} for i, url in enumerate(URLS)
+    ], ensure_ascii=False), encoding="utf-8")
+    yield str(path)
+    reset_run_registry()
+
+
+def _article_number(prompt: str) -> int:
+    return int(prompt.rsplit(" ", 1)[-1])
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_results_keep_input_order_under_concurrency(raw_path, tmp_path, monkeypatch):
+    def _routed_call(prompt, stage, **kwargs):
+        number = _article_number(prompt)
+        # Первые статьи очищаются дольше последних
+        time.sleep(0.01 * (len(URLS) - number))
+        return f"очищено {number}"
+
+    monkeypatch.setattr(gemini_3_factor_process_data, "routed_call", _routed_call)
+    output_path = str(tmp_path / "level_1.json")
+
+    clean_raw_data(raw_path, output_path, max_concurrency=4)
+
+    items = _read(output_path)
+    assert [item["url"] for item in items] == URLS
+    assert [item["cleaned_text"] for item in items] == [f"очищено {i}" for i in range(len(URLS))]
+
+
+def test_failing_item_is_skipped(raw_path, tmp_path, monkeypatch):
+    def _routed_call(prompt, stage, **kwargs):
+        if _article_number(prompt) == 3:
+            raise RuntimeError("сбой очистки")
+        return "очищено"
+
+    monkeypatch.setattr(gemini_3_factor_process_data, "routed_call", _routed_call)
+    output_path = str(tmp_path / "level_1.json")
+
+    clean_raw_data(raw_path, output_path, max_concurrency=4)
+
+    assert [item["url"] for item in _read(output_path)] == URLS[:3] + URLS[4:]
+
+
+def test_writer_failure_keeps_completed_items(raw_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(gemini_3_factor_process_data, "routed_call", lambda prompt, stage, **kwargs: "очищено")
+    output_path = str(tmp_path / "level_1.json")
+    received = []
+
+    def _on_item(item):
+        received.append(item)
+        if len(received) == 3:
+            raise OSError("получатель недоступен")
+
+    clean_raw_data(raw_path, output_path, max_concurrency=2, on_item=_on_item)
+
+    assert [item["url"] for item in _read(output_path)] == URLS[:3]
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from internship_analytics.modules import gemini_3_factor_process_data
+from internship_analytics.modules.gemini_3_factor_process_data import clean_raw_data_async
+from internship_analytics.modules.gemini_rate_limiter import get_concurrency_limiter
+from internship_analytics.modules.gemini_retry import TRANSIENT, get_gemini_call_stats
+from internship_analytics.modules.request_to_gemini_api import async_call_to_gemini_api
+
+MODEL = "models/gemini-2.5-flash"
+
+
+def test_async_call_returns_text(fake_gemini):
+    fake_gemini.responder = lambda model, contents, config: f"ответ на {contents}"
+
+    text = asyncio.run(async_call_to_gemini_api("вопрос", MODEL, temperature=0.0, use_cache=False))
+
+    assert text == "ответ на вопрос"
+    assert fake_gemini.calls[0][2] == {"temperature": 0.0}
+
+
+def test_async_call_timeout_is_retried_then_gives_up(fake_gemini):
+    async def _hang(model, contents, config):
+        await asyncio.sleep(10)
+
+    fake_gemini.responder = _hang
+
+    text = asyncio.run(async_call_to_gemini_api("вопрос", MODEL, use_cache=False, timeout=0.05))
+
+    assert text == ""
+    assert len(fake_gemini.calls) == 3
+    failure = get_gemini_call_stats().snapshot()["failures"][0]
+    assert failure["kind"] == TRANSIENT and failure["attempts"] == 3
+    assert get_concurrency_limiter(MODEL)._in_flight == 0
+
+
+def test_async_call_recovers_after_timeout(fake_gemini):
+    async def _slow_first(model, contents, config):
+        if len(fake_gemini.calls) == 1:
+            await asyncio.sleep(10)
+        return "готово"
+
+    fake_gemini.responder = _slow_first
+
+    assert asyncio.run(async_call_to_gemini_api("вопрос", MODEL, use_cache=False, timeout=0.05)) == "готово"
+
+
+def test_cancellation_propagates_and_releases_the_slot(fake_gemini):
+    started = asyncio.Event()
+
+    async def _hang(model, contents, config):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def _run():
+        fake_gemini.responder = _hang
+        task = asyncio.create_task(async_call_to_gemini_api("вопрос", MODEL, use_cache=False, timeout=None))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_run())
+    assert get_concurrency_limiter(MODEL)._in_flight == 0
+    assert get_gemini_call_stats().snapshot()["failures"] == []
+
+
+def test_wait_for_around_the_call_cancels_it(fake_gemini):
+    async def _hang(model, contents, config):
+        await asyncio.sleep(10)
+
+    fake_gemini.responder = _hang
+
+    async def _run():
+        return await asyncio.wait_for(async_call_to_gemini_api("вопрос", MODEL, use_cache=False, timeout=None), 0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_run())
+    assert get_concurrency_limiter(MODEL)._in_flight == 0
+
+
+def test_level_1_async_keeps_order_and_runs_on_item_off_the_loop(fake_gemini, tmp_path, monkeypatch):
+    monkeypatch.setattr(gemini_3_factor_process_data, "PRECLEAN_ENABLED", False)
+
+    async def _respond(model, contents, config):
+        # Первые статьи отвечают дольше последних, чтобы порядок завершения отличался от входного
+        await asyncio.sleep(0.01 * (5 - len(fake_gemini.calls) % 5))
+        return "очищено: " + contents.splitlines()[-1]
+
+    fake_gemini.responder = _respond
+    raw_path = tmp_path / "raw.json"
+    raw_path.write_text(json.dumps([
+        {"title": f"Статья {i}", "full_text": f"Текст статьи номер {i}", "url": f"https://example.org/{i}"}
+        for i in range(5)
+    ], ensure_ascii=False), encoding="utf-8")
+    output_path = tmp_path / "level_1.json"
+
+    loop_threads, item_threads = [], []
+
+    def _on_item(item):
+        item_threads.append(threading.get_ident())
+
+    async def _run():
+        loop_threads.append(threading.get_ident())
+        await clean_raw_data_async(str(raw_path), str(output_path), max_concurrency=5, on_item=_on_item)
+
+    asyncio.run(_run())
+
+    items = json.loads(output_path.read_text(encoding="utf-8"))
+    assert [item["url"] for item in items] == [f"https://example.org/{i}" for i in range(5)]
+    assert len(item_threads) == 5 and loop_threads[0] not in item_threads
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from internship_analytics.modules import gemini_3_factor_process_data, gemini_batch, llm_cache, model_router
+from internship_analytics.modules.gemini_batch import BulkJob, FakeBatchBackend, load_bulk_jobs, run_bulk_pipeline
+from internship_analytics.modules.llm_cache import LlmCache
+
+ARTICLES = [
+    ("Ромашка построит завод упаковки", "Компания Ромашка объявила о строительстве завода упаковки в Калуге"),
+    ("Ромашка увеличила выручку", "Выручка группы Ромашка выросла на восемнадцать процентов за год"),
+    ("Директор Ромашки об экспорте", "Генеральный директор рассказал о поставках продукции в Казахстан"),
+]
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """Пайплайн без сети: любой онлайн-вызов Gemini записывается и проваливает тест."""
+    online_calls = []
+
+    def _online(*args, **kwargs):
+        online_calls.append(args[:2])
+        raise AssertionError("онлайн-вызов Gemini в офлайн-режиме")
+
+    monkeypatch.setattr(gemini_3_factor_process_data, "routed_call", _online)
+    monkeypatch.setattr(model_router, "call_to_gemini_api", _online)
+    monkeypatch.setattr(gemini_batch, "BATCH_JOBS_DIR", str(tmp_path / "batch"))
+    monkeypatch.setattr(llm_cache, "_llm_cache", LlmCache(path=str(tmp_path / "llm.sqlite")))
+    return online_calls
+
+
+def _write_raw(path, articles):
+    items = [
+        {"title": title, "summary": "", "full_text": f"{text}. " * 3, "url": f"https://example.org/{i}",
+         "source": "example.org", "weight": 0.5, "date": "2025-01-01"}
+        for i, (title, text) in enumerate(articles)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False)
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_bulk_pipeline_runs_without_online_calls(tmp_path, offline):
+    raw_path = str(tmp_path / "romashka.json")
+    _write_raw(raw_path, ARTICLES)
+    job = BulkJob(raw_json_file_path=raw_path, context_query="Ромашка", processed_data_dir=str(tmp_path / "out"))
+
+    outputs = run_bulk_pipeline([job], backend=FakeBatchBackend(), run_level_3=False, poll_seconds=0)
+
+    assert offline == []
+    level_2 = _read(outputs[0])
+    assert [item["url"] for item in level_2] == [f"https://example.org/{i}" for i in range(len(ARTICLES))]
+
+
+def test_missing_level_1_answers_are_cleaned_online(tmp_path, offline, monkeypatch):
+    raw_path = str(tmp_path / "romashka.json")
+    _write_raw(raw_path, ARTICLES)
+    job = BulkJob(raw_json_file_path=raw_path, context_query="Ромашка", processed_data_dir=str(tmp_path / "out"))
+    monkeypatch.setattr(gemini_3_factor_process_data, "routed_call", lambda prompt, stage, **kwargs: "онлайн")
+    os.makedirs(job.processed_data_dir)
+
+    gemini_batch._write_level_1(0, job, {})
+
+    level_1 = _read(gemini_3_factor_process_data.level_output_paths(raw_path, job.processed_data_dir)[0])
+    assert [item["cleaned_text"] for item in level_1] == ["онлайн"] * len(ARTICLES)
+
+
+def test_load_bulk_jobs(tmp_path):
+    jobs_path = tmp_path / "jobs.json"
+    jobs_path.write_text(json.dumps([
+        {"raw_json_file_path": "a.json", "context_query": "Ромашка", "processed_data_dir": "out",
+         "relevance_hints": {"identifiers": ["7700000000"], "names": ["ООО Ромашка"]}},
+        {"raw_json_file_path": "b.json", "context_query": "Лютик", "processed_data_dir": "out"},
+    ], ensure_ascii=False), encoding="utf-8")
+
+    jobs = load_bulk_jobs(str(jobs_path))
+
+    assert jobs[0].relevance_hints.names == ["ООО Ромашка"]
+    assert jobs[1].relevance_hints is None
+    assert os.path.basename(jobs[1].raw_json_file_path) == "b.json"
@@ -0,0 +1,50 @@
+import pytest
+
+from internship_analytics.modules.config.gemini_config import (
+    GeminiConfigError,
+    get_gemini_config,
+    reset_gemini_clients,
+    set_gemini_client,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_clients():
+    reset_gemini_clients()
+    yield
+    reset_gemini_clients()
+
+
+def test_injected_client_without_api_key(monkeypatch):
+    monkeypatch.delenv("GENAI_API_KEY", raising=False)
+    fake = object()
+    set_gemini_client(fake)
+
+    assert get_gemini_config() is fake
+
+
+def test_injected_client_takes_precedence_over_env_key(monkeypatch):
+    monkeypatch.setenv("GENAI_API_KEY", "env-key")
+    fake = object()
+    set_gemini_client(fake)
+
+    assert get_gemini_config() is fake
+
+
+def test_injected_client_for_explicit_key(monkeypatch):
+    monkeypatch.delenv("GENAI_API_KEY", raising=False)
+    fake = object()
+    set_gemini_client(fake, api_key="test-key")
+
+    assert get_gemini_config("test-key") is fake
+    with pytest.raises(GeminiConfigError):
+        get_gemini_config()
+
+
+def test_missing_key_after_reset(monkeypatch):
+    monkeypatch.delenv("GENAI_API_KEY", raising=False)
+    set_gemini_client(object())
+    reset_gemini_clients()
+
+    with pytest.raises(GeminiConfigError):
+        get_gemini_config()
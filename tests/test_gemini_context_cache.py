@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import pytest
+
+from internship_analytics.conf import GEMINI_MODEL_CASCADE
+from internship_analytics.modules import gemini_3_factor_process_data, request_to_gemini_api
+from internship_analytics.modules.gemini_3_factor_process_data import (
+    PROMPT_1,
+    PROMPT_2_BATCH_SYSTEM_TEMPLATE,
+    PROMPT_2_SYSTEM_TEMPLATE,
+    PROMPT_3_FINAL_SUMMARY_SYSTEM_TEMPLATE,
+    PROMPT_3_MERGE_SUMMARIES_SYSTEM_TEMPLATE,
+    PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE,
+)
+from internship_analytics.modules.gemini_context_cache import ContextCacheRegistry
+from internship_analytics.modules.request_to_gemini_api import call_to_gemini_api
+
+CONTEXT_QUERY = "ООО Ромашка"
+MODEL = "models/gemini-2.5-flash"
+INSTRUCTIONS = [
+    PROMPT_1,
+    PROMPT_2_SYSTEM_TEMPLATE.format(context_query=CONTEXT_QUERY),
+    PROMPT_2_BATCH_SYSTEM_TEMPLATE.format(context_query=CONTEXT_QUERY),
+    PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE.format(context_query=CONTEXT_QUERY),
+    PROMPT_3_MERGE_SUMMARIES_SYSTEM_TEMPLATE.format(context_query=CONTEXT_QUERY),
+    PROMPT_3_FINAL_SUMMARY_SYSTEM_TEMPLATE.format(context_query=CONTEXT_QUERY),
+]
+
+
+class FakeCaches:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+
+    def create(self, model, config):
+        self.created.append((model, config["system_instruction"]))
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+@pytest.fixture
+def registry(fake_gemini, monkeypatch):
+    fake_gemini.caches = FakeCaches()
+    registry = ContextCacheRegistry(min_tokens={MODEL: 10})
+    monkeypatch.setattr(request_to_gemini_api, "get_context_cache_registry", lambda: registry)
+    return registry
+
+
+def test_current_instructions_stay_below_explicit_cache_threshold():
+    registry = ContextCacheRegistry()
+
+    for model in GEMINI_MODEL_CASCADE:
+        for instruction in INSTRUCTIONS:
+            assert registry.cached_content(model, instruction) is None
+    assert registry.stats() == {"created": 0, "hits": 0}
+
+
+def test_stage_instruction_is_sent_as_system_instruction(fake_gemini):
+    gemini_3_factor_process_data._summarize_chunk(["[SRC:a]\nТекст статьи"], CONTEXT_QUERY)
+
+    _, contents, config = fake_gemini.calls[0]
+    assert config["system_instruction"] == PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE.format(
+        context_query=CONTEXT_QUERY)
+    assert "Текст статьи" in contents
+    assert config["system_instruction"] not in contents
+
+
+def test_long_instruction_is_replaced_by_cached_content(registry, fake_gemini):
+    instruction = PROMPT_1
+    call_to_gemini_api("первая статья", MODEL, system_instruction=instruction)
+    call_to_gemini_api("вторая статья", MODEL, system_instruction=instruction)
+
+    assert fake_gemini.caches.created == [(MODEL, instruction)]
+    for _, _, config in fake_gemini.calls:
+        assert config["cached_content"] == "cachedContents/1"
+        assert "system_instruction" not in config
+    assert registry.stats() == {"created": 1, "hits": 1}
+
+    registry.clear()
+    assert fake_gemini.caches.deleted == ["cachedContents/1"]
+
+
+def test_models_below_threshold_keep_inline_instruction(registry, fake_gemini):
+    call_to_gemini_api("статья", GEMINI_MODEL_CASCADE[0], system_instruction=PROMPT_1)
+
+    _, _, config = fake_gemini.calls[0]
+    assert config["system_instruction"] == PROMPT_1
+    assert fake_gemini.caches.created == []
+
+
+def test_cached_content_does_not_change_response_cache_key(registry, fake_gemini):
+    call_to_gemini_api("статья", MODEL, system_instruction=PROMPT_1)
+    registry.enabled = False
+    assert call_to_gemini_api("статья", MODEL, system_instruction=PROMPT_1) == "ok"
+
+    assert len(fake_gemini.calls) == 1
@@ -0,0 +1,134 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from internship_analytics.modules import gemini_rate_limiter
+from internship_analytics.modules.gemini_rate_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from internship_analytics.modules.gemini_retry import (
+    PERMANENT,
+    QUOTA,
+    TRANSIENT,
+    RetryPolicy,
+    classify_error,
+    get_gemini_call_stats,
+    retry_after_seconds,
+)
+from internship_analytics.modules.request_to_gemini_api import call_to_gemini_api
+
+MODEL = "models/gemini-1.5-flash-latest"
+
+
+class ApiError(Exception):
+    def __init__(self, code=None, message="", headers=None):
+        super().__init__(message)
+        self.code = code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class ReadTimeout(Exception):
+    """Имя как у сетевой ошибки httpx."""
+
+
+@pytest.mark.parametrize("error, kind", [
+    (ApiError(429), QUOTA),
+    (ApiError(None, "429 RESOURCE_EXHAUSTED"), QUOTA),
+    (ApiError(500), TRANSIENT),
+    (ApiError(503), TRANSIENT),
+    (ApiError(408), TRANSIENT),
+    (TimeoutError(), TRANSIENT),
+    (ConnectionResetError(), TRANSIENT),
+    (ReadTimeout(), TRANSIENT),
+    (ApiError(400, "INVALID_ARGUMENT"), PERMANENT),
+    (ApiError(403), PERMANENT),
+    (ValueError("bad prompt"), PERMANENT),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_retry_after_header_and_body():
+    assert retry_after_seconds(ApiError(429, headers={"retry-after": "7"})) == 7.0
+    http_date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= retry_after_seconds(ApiError(429, headers={"retry-after": http_date})) <= 30
+    assert retry_after_seconds(ApiError(429, '{"retryDelay": "12s"}')) == 12.0
+    assert retry_after_seconds(ApiError(429)) is None
+
+
+def test_delay_is_never_shorter_than_retry_after():
+    policy = RetryPolicy(initial_delay=1.0, max_delay=60.0, jitter=0.2)
+    for attempt in range(1, 4):
+        assert policy.delay(attempt, ApiError(429, headers={"retry-after": "20"})) >= 20
+    assert policy.delay(1, ApiError(500)) <= 1.2
+    assert policy.delay(10, ApiError(500)) <= 60 * 1.2
+
+
+def test_permanent_errors_are_not_retried():
+    policy = RetryPolicy(max_attempts=3)
+    assert not policy.should_retry(PERMANENT, 1)
+    assert policy.should_retry(QUOTA, 2)
+    assert not policy.should_retry(TRANSIENT, 3)
+
+
+def test_aimd_halves_on_quota_and_grows_back(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(gemini_rate_limiter.time, "monotonic", lambda: clock[0])
+    limiter = AdaptiveConcurrencyLimiter("m", initial=8, minimum=1, maximum=16)
+
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+
+    # Пачка 429 от уже отправленных запросов в пределах cooldown не снижает лимит повторно
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+
+    # Аддитивный рост: примерно +1 за круг из limit успешных ответов
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(succeeded=True)
+    assert limiter.limit == 5
+
+    for _ in range(5):
+        clock[0] += AdaptiveConcurrencyLimiter.DECREASE_COOLDOWN
+        limiter.acquire()
+        limiter.release(throttled=True)
+    assert limiter.limit == 1
+
+
+def test_concurrency_limit_blocks_extra_requests():
+    limiter = AdaptiveConcurrencyLimiter("m", initial=2, minimum=1, maximum=4)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
+
+def test_call_retries_quota_errors_then_succeeds(fake_gemini):
+    errors = [ApiError(429, headers={"retry-after": "0"}), ApiError(503)]
+
+    def _respond(model, contents, config):
+        if errors:
+            raise errors.pop(0)
+        return "готово"
+
+    fake_gemini.responder = _respond
+
+    assert call_to_gemini_api("вопрос", MODEL, use_cache=False) == "готово"
+    counters = get_gemini_call_stats().snapshot()["models"][MODEL]
+    assert counters == {"succeeded": 1, "retries": 2, "quota_errors": 1, "failed": 0}
+    assert get_concurrency_limiter(MODEL).limit < 4
+
+
+def test_call_does_not_retry_permanent_errors(fake_gemini):
+    def _respond(model, contents, config):
+        raise ApiError(400, "INVALID_ARGUMENT")
+
+    fake_gemini.responder = _respond
+
+    assert call_to_gemini_api("вопрос", MODEL, use_cache=False) == ""
+    assert len(fake_gemini.calls) == 1
+    failure = get_gemini_call_stats().snapshot()["failures"][0]
+    assert failure["kind"] == PERMANENT and failure["attempts"] == 1
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from internship_analytics.modules.html_extraction import (
+    DOMAIN_SELECTORS,
+    Bs4ExtractionEngine,
+    LxmlExtractionEngine,
+    benchmark_extraction,
+    has_implicit_paragraph_close,
+    strip_non_markup,
+)
+
+pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+
+HTML_FIXTURES_DIR = os.path.join(FIXTURES_DIR, "html")
+FIXTURES = sorted(f for f in os.listdir(HTML_FIXTURES_DIR) if f.endswith(".html"))
+
+
+def _read(file_name: str) -> str:
+    with open(os.path.join(HTML_FIXTURES_DIR, file_name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_every_selector_domain_has_a_fixture():
+    fixture_domains = {file_name.split("__", 1)[0] for file_name in FIXTURES}
+    assert {domain for domain, _ in DOMAIN_SELECTORS} <= fixture_domains
+
+
+@pytest.mark.parametrize("file_name", FIXTURES)
+def test_lxml_output_matches_bs4(file_name):
+    html = _read(file_name)
+    domain = file_name.split("__", 1)[0]
+
+    expected = Bs4ExtractionEngine().extract(html, domain)
+
+    assert expected or "without_body" in file_name
+    assert LxmlExtractionEngine().extract(html, domain) == expected
+
+
+def test_ads_scripts_and_navigation_are_not_extracted():
+    text = LxmlExtractionEngine().extract(_read("rbc.ru__article.html"), "rbc.ru")
+
+    assert "Подпишитесь" not in text
+    assert "rbc.counter" not in text
+    assert "Главная" not in text
+    assert text.startswith("Выручка ООО\xa0«Ромашка»")
+
+
+def test_block_inside_paragraph_is_detected():
+    assert has_implicit_paragraph_close(strip_non_markup(_read("rbc.ru__block_inside_paragraph.html")))
+    assert not has_implicit_paragraph_close(strip_non_markup(_read("tass.ru__article.html")))
+
+
+def test_markup_in_scripts_and_comments_keeps_the_fast_path(monkeypatch):
+    html = _read("example.org__markup_in_script_and_comments.html")
+    assert has_implicit_paragraph_close(html)
+    assert not has_implicit_paragraph_close(strip_non_markup(html))
+
+    engine = LxmlExtractionEngine()
+    monkeypatch.setattr(engine, "_reference", None)
+    assert engine.extract(html, "example.org").startswith("ООО «Ромашка» открыло")
+
+
+def test_fragment_without_body_gives_nothing():
+    assert LxmlExtractionEngine().extract("<div><p>Hello world</p></div>", "example.org") is None
+    assert LxmlExtractionEngine().extract("<article><p>Hello world</p></article>", "example.org") == "Hello world"
+
+
+def test_benchmark_reports_both_engines():
+    assert set(benchmark_extraction(HTML_FIXTURES_DIR, repeats=1)) == {"bs4", "lxml"}
@@ -0,0 +1,18 @@
+import time
+
+from internship_analytics.modules.model_router import ModelRouter
+
+POLICIES = {"map": {"first_tier": 0, "last_tier": 1}}
+
+
+def test_time_budget_is_wall_clock():
+    router = ModelRouter(cascade=["lite", "pro"], policies=POLICIES, budget_usd=100.0, budget_seconds=0.2)
+    # Параллельные вызовы по секунде каждый не должны исчерпывать бюджет времени
+    for _ in range(5):
+        router._record("lite", 1.0, 10, 10, True)
+    assert not router.over_budget()
+    assert router.plan("map", 10) == ["lite", "pro"]
+
+    time.sleep(0.25)
+    assert router.over_budget()
+    assert router.plan("map", 10) == ["lite"]
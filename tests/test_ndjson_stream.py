@@ -0,0 +1,40 @@
+import os
+import threading
+
+from internship_analytics.modules.ndjson_stream import (
+    append_record,
+    done_marker_path,
+    follow_records,
+    mark_complete,
+    remove_stream,
+    wait_for_first_record,
+)
+
+
+def test_empty_finished_stream_is_reported_and_removed(tmp_path):
+    path = str(tmp_path / "raw.ndjson")
+    open(path, "w").close()
+    mark_complete(path)
+
+    assert wait_for_first_record(path, poll_interval=0.01) is False
+
+    remove_stream(path)
+    assert not os.path.exists(path)
+    assert not os.path.exists(done_marker_path(path))
+
+
+def test_first_record_unblocks_reader_before_stream_completes(tmp_path):
+    path = str(tmp_path / "raw.ndjson")
+    open(path, "w").close()
+
+    def _write():
+        with open(path, "a", encoding="utf-8") as f:
+            append_record(f, {"url": "https://example.org/1"})
+
+    writer = threading.Timer(0.05, _write)
+    writer.start()
+    assert wait_for_first_record(path, poll_interval=0.01) is True
+    writer.join()
+
+    mark_complete(path)
+    assert [r["url"] for r in follow_records(path, poll_interval=0.01)] == ["https://example.org/1"]
@@ -0,0 +1,119 @@
+import json
+import random
+
+from internship_analytics.modules.gemini_3_factor_process_data import filter_and_deduplicate_data
+from internship_analytics.modules.near_duplicates import (
+    NearDuplicateIndex,
+    estimated_jaccard,
+    find_near_duplicate_clusters,
+    minhash_signature,
+)
+
+_rng = random.Random(7)
+VOCABULARY = [f"слово{i}" for i in range(2000)]
+
+
+def _article(length: int = 150) -> str:
+    return " ".join(_rng.choice(VOCABULARY) for _ in range(length)) + "."
+
+
+def _wire_reprint(text: str, edits: int = 2) -> str:
+    """Перепечатка ленты: пара заменённых слов, другой заголовок и подпись агентства."""
+    words = text.split()
+    for position in _rng.sample(range(len(words)), edits):
+        words[position] = "правка"
+    return "Заголовок перепечатки. " + " ".join(words) + " Источник: Интерфакс."
+
+
+def test_minhash_estimates_jaccard_of_reprints():
+    original = _article()
+
+    assert estimated_jaccard(minhash_signature(original), minhash_signature(original)) == 1.0
+    assert estimated_jaccard(minhash_signature(original), minhash_signature(_wire_reprint(original))) >= 0.7
+    assert estimated_jaccard(minhash_signature(original), minhash_signature(_article())) < 0.2
+
+
+def test_lsh_recalls_wire_reprints_without_merging_different_stories():
+    originals = [_article() for _ in range(30)]
+    texts = [(text, 1) for text in originals] + [(_wire_reprint(text), 1) for text in originals]
+
+    clusters = find_near_duplicate_clusters(texts)
+
+    assert len(clusters) == len(originals)
+    for story in range(len(originals)):
+        assert sorted(clusters[story]) == [story, story + len(originals)]
+
+
+def test_representative_has_highest_source_weight():
+    original = _article()
+    texts = [(original, 1), (_wire_reprint(original), 5), (_wire_reprint(original), "3")]
+
+    assert find_near_duplicate_clusters(texts) == {1: [0, 1, 2]}
+
+
+def test_non_numeric_weight_counts_as_zero():
+    original = _article()
+    texts = [(original, "—"), (_wire_reprint(original), None), (_wire_reprint(original), 0.5)]
+
+    assert find_near_duplicate_clusters(texts) == {2: [0, 1, 2]}
+
+
+def test_equal_weights_keep_the_earliest_article():
+    original = _article()
+    texts = [(_article(), 2), (original, "—"), (_wire_reprint(original), "—")]
+
+    assert find_near_duplicate_clusters(texts) == {0: [0], 1: [1, 2]}
+
+
+def test_online_index_reports_earlier_matches():
+    index = NearDuplicateIndex()
+    first, other = _article(), _article()
+
+    assert index.add(first) == []
+    assert index.add(other) == []
+    assert index.add(_wire_reprint(first)) == [0]
+    assert index.add(_wire_reprint(other)) == [1]
+
+
+def test_streaming_level_2_keeps_first_article_of_each_story(tmp_path):
+    first, other = _article(), _article()
+    items = [
+        {"url": "https://a.example/1", "source": "a", "weight": 1, "cleaned_text": first},
+        {"url": "https://b.example/1", "source": "b", "weight": "—", "cleaned_text": other},
+        {"url": "https://c.example/1", "source": "c", "weight": 10, "cleaned_text": _wire_reprint(first)},
+    ]
+    checked = []
+
+    def relevance_checker(batch, context_query):
+        checked.extend(item["url"] for item in batch)
+        return [True] * len(batch)
+
+    output_path = tmp_path / "filtered.json"
+    filter_and_deduplicate_data("", str(output_path), "ООО Ромашка", items=iter(items),
+                                relevance_checker=relevance_checker)
+
+    result = json.loads(output_path.read_text(encoding="utf-8"))
+    # Второго прохода в потоковом режиме нет: остаётся первая статья, а не самая весомая
+    assert [item["url"] for item in result] == ["https://a.example/1", "https://b.example/1"]
+    # Перепечатка приходит уже после записи первой статьи, поэтому near_duplicates не заполняется
+    assert "near_duplicates" not in result[0]
+    assert checked == ["https://a.example/1", "https://b.example/1"]
+
+
+def test_file_level_2_keeps_heaviest_article_of_each_story(tmp_path):
+    first, other = _article(), _article()
+    items = [
+        {"url": "https://a.example/1", "source": "a", "weight": "—", "cleaned_text": first},
+        {"url": "https://b.example/1", "source": "b", "weight": 1, "cleaned_text": other},
+        {"url": "https://c.example/1", "source": "c", "weight": 10, "cleaned_text": _wire_reprint(first)},
+    ]
+    input_path = tmp_path / "cleaned.json"
+    input_path.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+
+    output_path = tmp_path / "filtered.json"
+    filter_and_deduplicate_data(str(input_path), str(output_path), "ООО Ромашка",
+                                relevance_checker=lambda batch, context_query: [True] * len(batch))
+
+    result = json.loads(output_path.read_text(encoding="utf-8"))
+    assert [item["url"] for item in result] == ["https://b.example/1", "https://c.example/1"]
+    assert result[1]["near_duplicates"] == [{"source": "a", "url": "https://a.example/1", "weight": "—"}]
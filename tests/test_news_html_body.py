@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import FakeHttpResponse
+from internship_analytics.modules.news import _decode_html, _read_html_body
+
+URL = "https://example.org/news/1"
+TEXT = "Новости компании"
+
+
+def test_content_length_over_cap_is_skipped_without_reading():
+    response = FakeHttpResponse(body=b"x" * 200, headers={"Content-Type": "text/html", "Content-Length": "200"})
+
+    assert _read_html_body(response, URL, max_bytes=100) is None
+    assert response.bytes_read == 0
+
+
+def test_body_over_cap_stops_streaming_early():
+    response = FakeHttpResponse(body=b"x" * 10_000, headers={"Content-Type": "text/html"}, chunk_size=100)
+
+    assert _read_html_body(response, URL, max_bytes=1_000) is None
+    assert response.bytes_read <= 1_100
+
+
+def test_body_at_cap_is_read():
+    body = b"<p>" + b"x" * 93 + b"</p>"
+    response = FakeHttpResponse(body=body, headers={"Content-Type": "text/html"}, chunk_size=7)
+
+    assert _read_html_body(response, URL, max_bytes=len(body)) == body.decode("ascii")
+
+
+@pytest.mark.parametrize("content_type", ["application/pdf", "video/mp4", "image/jpeg; charset=binary"])
+def test_non_html_content_types_are_rejected(content_type):
+    response = FakeHttpResponse(body=b"%PDF-1.4", headers={"Content-Type": content_type})
+
+    assert _read_html_body(response, URL) is None
+    assert response.bytes_read == 0
+
+
+@pytest.mark.parametrize("content_type", ["", "text/html", "TEXT/HTML; charset=utf-8", "application/xhtml+xml"])
+def test_html_and_missing_content_types_are_accepted(content_type):
+    response = FakeHttpResponse(body=TEXT.encode("utf-8"), headers={"Content-Type": content_type})
+
+    assert _read_html_body(response, URL) == TEXT
+
+
+def test_charset_from_header_wins_over_meta():
+    body = f'<meta charset="utf-8"><p>{TEXT}</p>'.encode("koi8-r")
+
+    assert TEXT in _decode_html(body, "text/html; charset=koi8-r")
+
+
+@pytest.mark.parametrize("meta", [
+    '<meta charset="windows-1251">',
+    "<meta charset=windows-1251>",
+    '<meta http-equiv="Content-Type" content="text/html; charset=windows-1251">',
+])
+def test_charset_from_meta_when_header_has_none(meta):
+    body = f"<html><head>{meta}</head><body>{TEXT}</body></html>".encode("cp1251")
+
+    assert TEXT in _decode_html(body, "text/html")
+
+
+def test_meta_charset_is_sniffed_only_in_the_head_of_the_page():
+    body = b" " * 5000 + '<meta charset="koi8-r">'.encode("ascii") + TEXT.encode("utf-8")
+
+    assert TEXT in _decode_html(body, "text/html")
+
+
+def test_utf8_is_used_without_declared_charset():
+    assert _decode_html(TEXT.encode("utf-8"), "text/html") == TEXT
+
+
+def test_cp1251_fallback_when_not_utf8():
+    assert _decode_html(TEXT.encode("cp1251"), "") == TEXT
+
+
+def test_unknown_declared_charset_falls_back_to_utf8():
+    assert _decode_html(TEXT.encode("utf-8"), "text/html; charset=x-unknown") == TEXT
@@ -0,0 +1,130 @@
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from internship_analytics.modules import news
+from internship_analytics.modules.news import PollingPolicy
+from internship_analytics.modules.run_registry import reset_run_registry
+from internship_analytics.modules.search_cache import FRESH
+
+FAST_POLICY = PollingPolicy(initial_delay=0.01, multiplier=1.0, max_delay=0.01, jitter=0.0, deadline=5.0)
+
+
+class FakeSearchApi(BaseHTTPRequestHandler):
+    """Search API: POST /searchAsync запускает операцию, GET /operations/<id> готов со второго опроса."""
+    polls = {}
+    hang_seconds = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self._reply({"id": f"op-{request['query']['page']}"})
+
+    def do_GET(self):
+        if self.hang_seconds:
+            time.sleep(self.hang_seconds)
+        operation_id = self.path.rsplit("/", 1)[-1]
+        self.polls[operation_id] = self.polls.get(operation_id, 0) + 1
+        if self.polls[operation_id] < 2:
+            self._reply({"id": operation_id, "done": False})
+            return
+        raw = base64.b64encode(f"<yandexsearch>{operation_id}</yandexsearch>".encode("utf-8")).decode("ascii")
+        self._reply({"id": operation_id, "done": True, "response": {"rawData": raw}})
+
+
+@pytest.fixture
+def fake_api():
+    handler = type("Handler", (FakeSearchApi,), {"polls": {}, "hang_seconds": 0.0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pages_are_polled_together_against_fake_endpoint(fake_api):
+    _, base_url = fake_api
+    operation_ids = {
+        page: news.start_search_task("query", "folder", "token", page=page, search_url=f"{base_url}/searchAsync")
+        for page in range(3)
+    }
+    poll_stats = {}
+
+    results = dict(news.wait_for_results(operation_ids, "token", policy=FAST_POLICY,
+                                         base_url=f"{base_url}/operations", poll_stats=poll_stats))
+
+    assert sorted(results) == [0, 1, 2]
+    assert news.get_result_xml(results[1]) == "<yandexsearch>op-1</yandexsearch>"
+    assert poll_stats == {"op-0": 2, "op-1": 2, "op-2": 2}
+
+
+def test_stalled_poll_does_not_outlive_deadline(fake_api):
+    handler, base_url = fake_api
+    handler.hang_seconds = 3.0
+    policy = PollingPolicy(initial_delay=0.01, multiplier=1.0, max_delay=0.01, jitter=0.0, deadline=0.5)
+
+    started = time.monotonic()
+    with pytest.raises((TimeoutError, requests.exceptions.Timeout)):
+        list(news.wait_for_results({0: "op-0"}, "token", policy=policy, base_url=f"{base_url}/operations"))
+    assert time.monotonic() - started < 2.0
+
+
+def test_raw_output_paths_are_unique_within_one_second(tmp_path):
+    paths = [news.new_raw_output_path(str(tmp_path)) for _ in range(200)]
+
+    assert len(set(paths)) == len(paths)
+    assert all(path.startswith(str(tmp_path)) and path.endswith("_parsed.ndjson") for path in paths)
+
+
+def test_duplicate_urls_keep_first_position_and_last_record(tmp_path, monkeypatch):
+    pages = {
+        0: [{"url": "https://a.example/1", "source": "a.example", "title": "старый заголовок"},
+            {"url": "https://b.example/1", "source": "b.example", "title": "b"}],
+        1: [{"url": "https://a.example/1", "source": "a.example", "title": "новый заголовок"}],
+    }
+
+    class FakeSearchCache:
+        def get(self, key):
+            return [dict(article) for article in pages[int(key)]], FRESH
+
+    monkeypatch.setattr(news, "get_search_cache", lambda: FakeSearchCache())
+    monkeypatch.setattr(news, "make_search_key", lambda query, domains, page, search_type: str(page))
+    monkeypatch.setattr(news, "extract_full_article_text", lambda url, domain: f"текст {url}")
+    reset_run_registry()
+
+    output_path = str(tmp_path / "raw.ndjson")
+    news._search_and_stream_articles("Ромашка", ["a.example", "b.example"], 2, output_path)
+
+    reset_run_registry()
+    with open(output_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [(r["url"], r["title"]) for r in records] == [
+        ("https://a.example/1", "новый заголовок"),
+        ("https://b.example/1", "b"),
+    ]
+
+
+def test_background_executor_is_created_lazily(monkeypatch):
+    monkeypatch.setattr(news, "_background_executor", None)
+
+    executor = news._get_background_executor()
+    try:
+        assert news._get_background_executor() is executor
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,67 @@
+import json
+
+from internship_analytics.modules.gemini_3_factor_process_data import (
+    check_relevance_batch,
+    parse_batch_verdicts,
+    relevance_batch_request,
+)
+from internship_analytics.modules.llm_cache import get_llm_cache
+
+ITEMS = [
+    {"url": f"https://example.org/{i}", "source": "example.org", "weight": 0.9, "cleaned_text": f"Статья {i}"}
+    for i in range(3)
+]
+IDS = ["A1", "A2", "A3"]
+
+
+def _answer(*verdicts):
+    return json.dumps([{"id": article_id, "relevant": relevant} for article_id, relevant in zip(IDS, verdicts)])
+
+
+def test_parse_batch_verdicts_keeps_request_order():
+    response = json.dumps([{"id": "A3", "relevant": False}, {"id": "A1", "relevant": True},
+                           {"id": "A2", "relevant": True}])
+    assert parse_batch_verdicts(response, IDS) == [True, True, False]
+
+
+def test_parse_batch_verdicts_rejects_malformed_answers():
+    assert parse_batch_verdicts("не JSON", IDS) is None
+    assert parse_batch_verdicts(None, IDS) is None
+    assert parse_batch_verdicts('{"id": "A1", "relevant": true}', IDS) is None
+    assert parse_batch_verdicts(_answer(True, True), IDS) is None
+    assert parse_batch_verdicts(_answer(True, True, "да"), IDS) is None
+    assert parse_batch_verdicts(_answer(True, True, True).replace("A3", "A4"), IDS) is None
+
+
+def test_batch_request_disables_thinking():
+    _, article_ids, generation = relevance_batch_request(ITEMS, "Ромашка")
+    assert article_ids == IDS
+    assert generation["thinking_budget"] == 0
+
+
+def test_thinking_config_only_for_thinking_models(fake_gemini):
+    fake_gemini.responder = lambda model, contents, config: _answer(True, False, True)
+
+    assert check_relevance_batch(ITEMS, "Ромашка") == [True, False, True]
+
+    model, _, config = fake_gemini.calls[0]
+    assert model == "models/gemini-1.5-flash-latest"
+    assert "thinking_config" not in config
+
+
+def test_malformed_batch_falls_back_to_single_checks_and_is_not_cached(fake_gemini):
+    def _respond(model, contents, config):
+        if config.get("response_schema"):
+            return '[{"id": "A1", "relevant": true}'
+        return "Да" if "Статья 1" in contents else "Нет"
+
+    fake_gemini.responder = _respond
+
+    assert check_relevance_batch(ITEMS, "Ромашка") == [False, True, False]
+
+    batch_calls = [call for call in fake_gemini.calls if call[2].get("response_schema")]
+    # Эскалация на модель с размышлениями идёт без них, лимит ответа остаётся только под JSON
+    assert [call[0] for call in batch_calls] == ["models/gemini-1.5-flash-latest", "models/gemini-2.5-flash"]
+    assert batch_calls[1][2]["thinking_config"] == {"thinking_budget": 0}
+    cached = get_llm_cache()._conn.execute("SELECT response FROM responses").fetchall()
+    assert all(not response.startswith("[") for (response,) in cached)
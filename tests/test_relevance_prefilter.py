@@ -0,0 +1,55 @@
+from internship_analytics.modules.relevance_prefilter import (
+    ACCEPT,
+    ASK_LLM,
+    RelevanceHints,
+    RelevancePrefilter,
+    _name_terms,
+)
+
+
+def test_name_terms_drop_legal_forms():
+    assert _name_terms("Общество с ограниченной ответственностью «Ромашка»") == ["ромашк"]
+    assert _name_terms("АО «Группа компаний Альфа»") == ["альф"]
+    assert _name_terms("ООО Ромашка") == ["ромашк"]
+
+
+def test_legal_form_alone_does_not_match_name():
+    prefilter = RelevancePrefilter(
+        RelevanceHints(names=["Общество с ограниченной ответственностью «Ромашка»", "ООО Ромашка"]),
+        context_query="",
+        shadow=False,
+    )
+
+    other = {"url": "a", "cleaned_text": "Общество с ограниченной ответственностью «Лютик» открыло завод."}
+    prefilter.decide(other)
+    assert prefilter.records[-1]["name_score"] == 0.0
+
+    target = {"url": "b", "cleaned_text": "ООО «Ромашка» открыло завод."}
+    prefilter.decide(target)
+    assert prefilter.records[-1]["name_score"] == 1.0
+
+
+def test_one_word_name_match_goes_to_llm():
+    prefilter = RelevancePrefilter(RelevanceHints(names=["ООО Ромашка"]), context_query="ООО Ромашка",
+                                   shadow=False)
+
+    article = {"url": "a", "cleaned_text": "Ромашка аптечная зацвела в парке. Ромашка, ромашки, ромашку."}
+    assert prefilter.decide(article) == ASK_LLM
+    assert prefilter.records[-1]["name_score"] == 1.0
+    assert prefilter.records[-1]["can_accept"] is False
+
+
+def test_one_word_name_is_accepted_with_identifier():
+    prefilter = RelevancePrefilter(RelevanceHints(identifiers=["7701234567"], names=["ООО Ромашка"]),
+                                   context_query="ООО Ромашка", shadow=False)
+
+    assert prefilter.decide({"url": "a", "cleaned_text": "ООО «Ромашка» (ИНН 7701234567) открыло завод."}) == ACCEPT
+    assert prefilter.decide({"url": "b", "cleaned_text": "ООО «Ромашка» (ИНН 77012345678) открыло завод."}) == ASK_LLM
+
+
+def test_multi_word_name_is_accepted_without_identifier():
+    prefilter = RelevancePrefilter(RelevanceHints(names=["ПАО «Северная звезда»"]), context_query="",
+                                   shadow=False)
+
+    assert prefilter.decide({"url": "a", "cleaned_text": "ПАО «Северная звезда» открыло завод."}) == ACCEPT
+    assert prefilter.decide({"url": "b", "cleaned_text": "Северная часть города осталась без света."}) == ASK_LLM
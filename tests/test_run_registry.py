@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from internship_analytics.modules.run_registry import RunRegistry
+
+URL = "https://example.org/news/1"
+
+
+def test_concurrent_fetches_of_one_url_share_a_future():
+    registry = RunRegistry()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(threading.current_thread().name)
+        started.set()
+        release.wait(5)
+        return "полный текст"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        owner = executor.submit(registry.fetch_text, URL, fetch)
+        started.wait(5)
+        waiters = [executor.submit(registry.fetch_text, URL, fetch) for _ in range(3)]
+        release.set()
+        results = [owner.result()] + [waiter.result() for waiter in waiters]
+
+    assert results == ["полный текст"] * 4
+    assert len(calls) == 1
+    assert registry.fetch_hits == 3
+
+
+def test_failed_fetch_is_not_cached_for_the_run():
+    registry = RunRegistry()
+    attempts = []
+
+    def failing_fetch():
+        attempts.append("fail")
+        raise ConnectionError("сеть недоступна")
+
+    with pytest.raises(ConnectionError):
+        registry.fetch_text(URL, failing_fetch)
+
+    assert registry.fetch_text(URL, lambda: attempts.append("ok") or "текст") == "текст"
+    assert attempts == ["fail", "ok"]
+    assert registry.fetch_hits == 0
+
+
+def test_empty_result_is_not_cached_for_the_run():
+    registry = RunRegistry()
+
+    assert registry.fetch_text(URL, lambda: None) is None
+    assert registry.fetch_text(URL, lambda: "текст") == "текст"
+    assert registry.fetch_text(URL, lambda: "другой текст") == "текст"
+    assert registry.fetch_hits == 1
+
+
+def test_waiters_see_the_owner_failure_and_next_call_retries():
+    registry = RunRegistry()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_fetch():
+        started.set()
+        release.wait(5)
+        raise ConnectionError("таймаут")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owner = executor.submit(registry.fetch_text, URL, failing_fetch)
+        started.wait(5)
+        waiter = executor.submit(registry.fetch_text, URL, lambda: "не должен вызываться")
+        # Даём ожидающему дойти до Future владельца, пока тот ещё не завершился
+        time.sleep(0.05)
+        release.set()
+        with pytest.raises(ConnectionError):
+            owner.result()
+        with pytest.raises(ConnectionError):
+            waiter.result()
+
+    assert registry.fetch_text(URL, lambda: "текст") == "текст"
+
+
+def test_async_cleaning_shares_one_future_with_sync_callers():
+    registry = RunRegistry()
+    calls = []
+
+    async def clean():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "очищено"
+
+    async def run():
+        return await asyncio.gather(*(registry.cleaned_text_async(URL, clean) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["очищено"] * 3
+    assert len(calls) == 1
+    assert registry.cleaned_text(URL, lambda: "другое") == "очищено"
+    assert registry.clean_hits == 3
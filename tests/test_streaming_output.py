@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from internship_analytics.modules.gemini_rate_limiter import get_concurrency_limiter
+from internship_analytics.modules.gemini_retry import GeminiStreamInterrupted
+from internship_analytics.modules.request_to_gemini_api import stream_call_to_gemini_api
+from internship_analytics.modules.streaming_output import PARTIAL_SUFFIX, stream_to_file
+
+MODEL = "models/gemini-1.5-flash-latest"
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_partial_file_is_written_incrementally_and_renamed(tmp_path):
+    path = str(tmp_path / "summary.txt")
+    seen_on_disk = []
+    progress = []
+
+    def _generate(on_text, on_restart):
+        for piece in ("Первая часть. ", "Вторая часть."):
+            on_text(piece)
+            seen_on_disk.append(_read(path + PARTIAL_SUFFIX))
+        return "Первая часть. Вторая часть."
+
+    assert stream_to_file(path, _generate, listeners=[progress.append]) == "Первая часть. Вторая часть."
+
+    assert seen_on_disk == ["Первая часть. ", "Первая часть. Вторая часть."]
+    assert progress == seen_on_disk
+    assert _read(path) == "Первая часть. Вторая часть."
+    assert not os.path.exists(path + PARTIAL_SUFFIX)
+
+
+def test_restart_discards_text_of_the_previous_model(tmp_path):
+    path = str(tmp_path / "summary.txt")
+
+    def _generate(on_text, on_restart):
+        on_text("черновик слабой модели")
+        on_restart()
+        on_text("ответ")
+        return "ответ"
+
+    stream_to_file(path, _generate)
+    assert _read(path) == "ответ"
+
+
+def test_interrupted_stream_keeps_partial_file(tmp_path):
+    path = str(tmp_path / "summary.txt")
+
+    def _generate(on_text, on_restart):
+        on_text("Начало отчёта")
+        raise GeminiStreamInterrupted(MODEL, "transient", 1, ConnectionError("reset"), "Начало отчёта")
+
+    assert stream_to_file(path, _generate) is None
+    assert _read(path + PARTIAL_SUFFIX) == "Начало отчёта"
+    assert not os.path.exists(path)
+
+
+def test_failure_before_any_text_removes_partial_file(tmp_path):
+    path = str(tmp_path / "summary.txt")
+
+    assert stream_to_file(path, lambda on_text, on_restart: "") is None
+    assert not os.path.exists(path + PARTIAL_SUFFIX)
+    assert not os.path.exists(path)
+
+
+def test_stream_call_passes_chunks_and_returns_text(fake_gemini):
+    fake_gemini.stream_responder = lambda model, contents, config: ["раз ", "два"]
+    pieces = []
+
+    assert stream_call_to_gemini_api("вопрос", MODEL, pieces.append, use_cache=False) == "раз два"
+    assert pieces == ["раз ", "два"]
+
+
+def test_stream_error_before_first_chunk_is_retried(fake_gemini):
+    def _stream(model, contents, config):
+        if len(fake_gemini.calls) == 1:
+            raise ConnectionError("reset")
+        yield "ответ"
+
+    fake_gemini.stream_responder = _stream
+
+    assert stream_call_to_gemini_api("вопрос", MODEL, lambda piece: None, use_cache=False) == "ответ"
+    assert len(fake_gemini.calls) == 2
+
+
+def test_stream_error_after_first_chunk_is_not_retried(fake_gemini):
+    def _stream(model, contents, config):
+        yield "начало"
+        raise ConnectionError("reset")
+
+    fake_gemini.stream_responder = _stream
+
+    with pytest.raises(GeminiStreamInterrupted) as info:
+        stream_call_to_gemini_api("вопрос", MODEL, lambda piece: None, use_cache=False)
+    assert info.value.partial_text == "начало"
+    assert len(fake_gemini.calls) == 1
+
+
+def test_callback_error_propagates_without_retry(fake_gemini):
+    fake_gemini.stream_responder = lambda model, contents, config: ["раз", "два"]
+
+    def _on_text(piece):
+        raise OSError("диск заполнен")
+
+    with pytest.raises(OSError, match="диск заполнен"):
+        stream_call_to_gemini_api("вопрос", MODEL, _on_text, use_cache=False)
+    assert len(fake_gemini.calls) == 1
+    assert get_concurrency_limiter(MODEL)._in_flight == 0
@@ -0,0 +1,123 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from internship_analytics.modules import gemini_3_factor_process_data
+from internship_analytics.modules.gemini_3_factor_process_data import (
+    PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE,
+    PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE,
+    SUMMARY_SEPARATOR,
+    _group_by_budget,
+    _tree_reduce,
+    summarize_final_data,
+)
+from internship_analytics.modules.token_budget import estimate_tokens, truncate_to_tokens
+
+CONTEXT_QUERY = "ООО Ромашка"
+
+
+def test_truncate_keeps_paragraph_breaks():
+    text = "Первое предложение.\n\nВторое предложение!\nТретье предложение? " + "Длинный хвост. " * 50
+    truncated = truncate_to_tokens(text, estimate_tokens("Первое предложение. Второе предложение! Третье"))
+
+    assert truncated == "Первое предложение.\n\nВторое предложение!"
+
+
+def test_truncate_cuts_by_sentence_boundary():
+    text = " ".join(f"Предложение номер {i}." for i in range(100))
+    truncated = truncate_to_tokens(text, 50)
+
+    assert estimate_tokens(truncated) <= 50
+    assert truncated.endswith(".")
+    assert text.startswith(truncated)
+
+
+def test_truncate_cuts_first_oversized_sentence_by_chars():
+    text = "слово " * 200 + "."
+    truncated = truncate_to_tokens(text, 10)
+
+    assert truncated == text[:30]
+
+
+def test_group_by_budget_packs_greedily_with_at_least_two_texts():
+    texts = ["а" * 30] * 7  # ~11 токенов каждый
+    groups = _group_by_budget(texts, 25)
+
+    assert sum(groups, []) == texts
+    assert all(len(group) >= 2 for group in groups)
+    # Одиночный хвост присоединяется к последней группе, а не уходит отдельным запросом
+    assert [len(group) for group in groups] == [2, 2, 3]
+
+
+def test_map_chunks_fit_budget_including_template_overhead(tmp_path, monkeypatch):
+    template_tokens = estimate_tokens(
+        PROMPT_3_SUMMARIZE_CHUNK_TEMPLATE.format(chunk_texts="")
+        + PROMPT_3_SUMMARIZE_CHUNK_SYSTEM_TEMPLATE.format(context_query=CONTEXT_QUERY)
+    )
+    chunk_token_budget = template_tokens + 300
+    calls = []
+
+    def _routed_call(prompt, stage, system_instruction=None, **kwargs):
+        calls.append((stage, prompt, system_instruction))
+        return f"сводка {len(calls)}"
+
+    monkeypatch.setattr(gemini_3_factor_process_data, "routed_call", _routed_call)
+    items = [{"source": "src", "weight": 1, "url": f"https://example.org/{i}", "date": "2024-01-01",
+              "cleaned_text": "Новость о компании. " * (20 + i * 30)} for i in range(6)]
+
+    summarize_final_data("", str(tmp_path / "summary.md"), CONTEXT_QUERY, chunk_token_budget=chunk_token_budget,
+                         max_concurrency=2, items=items, stream_output=False)
+
+    map_calls = [(prompt, system) for stage, prompt, system in calls if stage == "map"]
+    assert len(map_calls) > 1
+    for prompt, system in map_calls:
+        assert estimate_tokens(prompt) + estimate_tokens(system) <= chunk_token_budget
+    # Каждая статья попала ровно в один чанк, длинные — обрезанными
+    assert sum(prompt.count("[SRC:") for prompt, _ in map_calls) == len(items)
+    assert (tmp_path / "summary.md").read_text(encoding="utf-8").startswith("сводка")
+
+
+def test_tree_reduce_fan_in_and_depth(monkeypatch):
+    merges = []
+
+    def _merge_summaries(group, context_query):
+        merges.append(len(group))
+        return "с" * 60  # ~21 токен, как одна исходная сводка
+
+    monkeypatch.setattr(gemini_3_factor_process_data, "_merge_summaries", _merge_summaries)
+    summaries = ["с" * 60] * 32
+    token_budget = 100
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        reduced = _tree_reduce(summaries, CONTEXT_QUERY, token_budget, executor)
+
+    assert estimate_tokens(SUMMARY_SEPARATOR.join(reduced)) <= token_budget
+    assert all(fan_in >= 2 for fan_in in merges)
+    assert sum(merges) - len(merges) == len(summaries) - len(reduced)
+    # Каждый уровень хотя бы вдвое сокращает число сводок
+    assert len(merges) < len(summaries)
+
+
+def test_tree_reduce_depth_is_logarithmic(monkeypatch):
+    levels = []
+
+    def _merge_summaries(group, context_query):
+        return "с" * 60
+
+    monkeypatch.setattr(gemini_3_factor_process_data, "_merge_summaries", _merge_summaries)
+    monkeypatch.setattr(gemini_3_factor_process_data, "_group_by_budget",
+                        lambda texts, budget: levels.append(len(texts)) or _group_by_budget(texts, budget))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        _tree_reduce(["с" * 60] * 64, CONTEXT_QUERY, 50, executor)
+
+    assert levels[0] == 64
+    assert len(levels) <= math.ceil(math.log2(64))
+    assert all(later <= earlier // 2 for earlier, later in zip(levels, levels[1:]))
+
+
+def test_tree_reduce_skips_when_summaries_fit(monkeypatch):
+    monkeypatch.setattr(gemini_3_factor_process_data, "_merge_summaries",
+                        lambda group, context_query: (_ for _ in ()).throw(AssertionError("лишнее слияние")))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert _tree_reduce(["коротко", "тоже"], CONTEXT_QUERY, 1000, executor) == ["коротко", "тоже"]
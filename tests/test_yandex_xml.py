@@ -0,0 +1,99 @@
+import os
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from internship_analytics.modules.yandex_xml import (
+    benchmark_search_parsing,
+    iter_search_results,
+    parse_search_page,
+    parse_search_results,
+)
+
+XML_FIXTURES_DIR = os.path.join(FIXTURES_DIR, "yandex_xml")
+
+
+def _read(file_name: str) -> str:
+    with open(os.path.join(XML_FIXTURES_DIR, file_name), "r", encoding="utf-8") as f:
+        return f.read()
+
+PAGE = """<?xml version="1.0" encoding="utf-8"?>
+<yandexsearch version="1.0"><response><results><grouping>
+<group><doc><url>https://www.rbc.ru/a</url><domain>www.rbc.ru</domain><title>Заголовок</title>
+<modtime>20240105T120000</modtime><passages><passage>Текст</passage></passages></doc></group>
+</grouping></results></response></yandexsearch>"""
+
+
+def test_search_page_distinguishes_empty_page_from_failure():
+    assert [a["url"] for a in parse_search_page(PAGE)] == ["https://www.rbc.ru/a"]
+    no_results = '<yandexsearch><response><error code="15">Sorry, there are no results</error></response></yandexsearch>'
+    assert parse_search_page(no_results) == []
+
+    failure = '<yandexsearch><response><error code="32">Limit exceeded</error></response></yandexsearch>'
+    assert parse_search_page(failure) is None
+    assert parse_search_page(PAGE[:-40]) is None
+    assert parse_search_page(None) is None
+    assert parse_search_results(failure) == []
+
+
+def test_recorded_page_is_parsed_like_a_full_tree():
+    xml_content = _read("page_full.xml")
+    root = ET.fromstring(xml_content)
+    expected_urls = [doc.find("url").text for doc in root.findall(".//grouping//doc")
+                     if doc.find(".//passage") is not None]
+
+    articles = parse_search_results(xml_content)
+
+    assert [a["url"] for a in articles] == expected_urls
+    assert len(articles) == 9
+    assert articles[0]["title"] == "Компания «Ромашка» — новость 0"
+    assert articles[0]["summary"].startswith("ООО «Ромашка» (ИНН 7701234567)")
+    assert articles[0]["date"] == "2024-01-01"
+
+
+def test_no_results_response_is_an_empty_page():
+    assert parse_search_page(_read("page_no_results.xml")) == []
+
+
+def test_malformed_xml_gives_nothing_rather_than_a_partial_page():
+    truncated = _read("page_full.xml")[:-2000]
+
+    assert parse_search_results(truncated) == []
+    with pytest.raises(ET.ParseError):
+        list(iter_search_results(truncated))
+
+
+def test_docs_outside_grouping_are_ignored():
+    xml_content = "<yandexsearch><response><doc><url>u</url><title>t</title><passage>p</passage></doc></response></yandexsearch>"
+    assert parse_search_results(xml_content) == []
+
+
+def test_benchmark_runs_on_recorded_responses():
+    assert set(benchmark_search_parsing(XML_FIXTURES_DIR, repeats=1)) == {"fromstring", "parse_search_page"}
+
+
+def _peak_bytes(parse, xml_content: str) -> int:
+    tracemalloc.start()
+    parse(xml_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def test_search_page_parses_in_one_flat_pass():
+    doc = ("<group><doc><url>https://www.rbc.ru/{0}</url><domain>www.rbc.ru</domain><title>Заголовок {0}</title>"
+           "<modtime>20240105T120000</modtime><passages><passage>" + "Текст статьи. " * 40 +
+           "</passage></passages></doc></group>")
+    xml_content = ("<yandexsearch><response><found>1000</found><results><grouping>" +
+                   "".join(doc.format(i) for i in range(1000)) + "</grouping></results></response></yandexsearch>")
+
+    assert len(parse_search_page(xml_content)) == 1000
+    assert _peak_bytes(parse_search_page, xml_content) < _peak_bytes(ET.fromstring, xml_content) / 2
+
+
+def test_error_after_results_is_detected():
+    failure = PAGE.replace("</response>", '<error code="32">Limit exceeded</error></response>')
+    assert parse_search_page(failure) is None
+    assert [a["url"] for a in iter_search_results(failure)] == ["https://www.rbc.ru/a"]